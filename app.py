@@ -1,10 +1,68 @@
 """
 博客來 LLM 書籍管理系統 - 主程式
+
+不帶參數執行時進入互動式選單；帶子命令時以非互動方式執行後結束，方便排程與腳本呼叫：
+    python app.py update [--engine http] [--full] [--no-page-cache] [--keyword LLM ...] [--keywords-file FILE]
+    python app.py update --engine cache   # 不連線，從頁面快取重播並重新擷取
+    python app.py enrich [--force] [--limit N] [--workers N]   # 擷取書籍詳細頁（ISBN、出版社等）
+    python app.py search [--title T] [--author A] [--min-price N] [--max-price N] [--sort price] [--limit N]
+    python app.py search --keywords-file FILE [--by author] [--title T | --author A] [--min-price N] ...
+    python app.py export [--format jsonl] [--output books.json]
+    python app.py serve [--host 127.0.0.1] [--port 8080] [--workers N]   # 唯讀 HTTP/JSON 查詢服務
+search 與 export 的結果以 JSON 輸出到標準輸出（或 --output 指定的檔案），update 與 enrich 完成後輸出統計結果的 JSON；
+進度訊息寫到標準錯誤。
 """
 
-from typing import Optional
+import argparse
+import contextlib
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, TextIO
 import database
+import enrichment
+import incremental
+import page_cache
+import metrics
+import pipeline
+import profiling
+import query_service
 import scraper
+from timing import PhaseTimer
+
+
+# 更新資料庫時使用的爬蟲引擎：'auto'、'http' 或 'selenium'
+SCRAPE_ENGINE = scraper.ENGINE_AUTO
+
+# 更新資料庫時是否使用頁面快取（page_cache.PAGE_CACHE_PATH），內容未變動的頁面不重新擷取與寫入
+USE_PAGE_CACHE = os.environ.get('BOOKS_PAGE_CACHE', '1') != '0'
+
+# 更新資料庫後是否接著擷取書籍詳細頁（ISBN、出版社、出版日期、頁數），可用環境變數 BOOKS_ENRICH_DETAILS=1 啟用
+ENRICH_DETAILS = os.environ.get('BOOKS_ENRICH_DETAILS', '0') == '1'
+
+# 更新資料庫時爬取的搜尋關鍵字
+SEARCH_KEYWORDS = ['LLM']
+
+# 進階查詢每頁顯示的筆數
+RESULTS_PAGE_SIZE = 20
+
+# 進階查詢的排序選項：(說明, 排序鍵, 是否遞減)
+SORT_OPTIONS = {
+    '1': ('書名', 'title', False),
+    '2': ('作者', 'author', False),
+    '3': ('價格（低到高）', 'price', False),
+    '4': ('價格（高到低）', 'price', True),
+    '5': ('最新加入', 'recency', True),
+}
+
+# 環境變數 BOOKS_PROFILE 設為 cpu、memory 或 cpu,memory 時，更新資料庫時以 cProfile / tracemalloc 分析
+PROFILE_MODES = {mode.strip() for mode in os.environ.get('BOOKS_PROFILE', '').split(',') if mode.strip()}
+
+# 非互動 search 子命令未指定 --limit 時回傳的最多筆數（0 表示不限制）
+CLI_SEARCH_LIMIT = 100
+
+# 環境變數 BOOKS_METRICS_PATH 指定時，每次更新資料庫後將指標寫入該檔案（.prom 為 Prometheus 格式，其餘為 JSON）
+METRICS_PATH = os.environ.get('BOOKS_METRICS_PATH')
 
 
 def show_main_menu() -> None:
@@ -21,31 +79,124 @@ def show_search_menu() -> None:
     print("\n--- 查詢書籍 ---")
     print("a. 依書名查詢")
     print("b. 依作者查詢")
-    print("c. 返回主選單")
+    print("c. 進階查詢（篩選、排序、分頁）")
+    print("d. 返回主選單")
     print("---------------")
 
 
-def update_database() -> None:
+def update_database(engine: Optional[str] = None, incremental_mode: bool = True,
+                    keywords: Optional[List[str]] = None,
+                    use_page_cache: Optional[bool] = None,
+                    enrich_details: Optional[bool] = None) -> Optional[Dict[str, Any]]:
     """
     更新書籍資料庫。
     
-    爬取博客來網站的最新書籍資料，並將資料存入資料庫。
+    爬取博客來網站各搜尋關鍵字的最新書籍資料，並將資料存入資料庫。
+    多個關鍵字找到的同一本書只寫入一次，並記錄所有找到它的關鍵字。
+    每爬完一頁就寫入資料庫並記錄進度，中斷後再次更新會從未完成的頁面續跑。
+    
+    增量模式下，連續數頁沒有新書或異動時提前停止翻頁；
+    但距離上次完整爬取超過 incremental.FULL_CRAWL_INTERVAL 時，仍會完整爬取所有頁面。
+    
+    使用頁面快取時，內容與上次下載相同且資料庫已是最新的頁面不重新擷取也不寫入；
+    engine 為 'cache' 時不連線，從頁面快取重播所有已下載的頁面並重新擷取寫入。
+    
+    啟用詳細頁擷取時，更新完成後接著擷取新書與書目變動的書籍詳細頁（見 enrich_database）。
+    
+    參數:
+        engine: 爬蟲引擎（'auto'、'http'、'selenium' 或 'cache'），未指定時使用 SCRAPE_ENGINE
+        incremental_mode: 是否使用增量模式（從快取重播時一律處理所有頁面）
+        keywords: 搜尋關鍵字列表，未指定時使用 SEARCH_KEYWORDS
+        use_page_cache: 是否使用頁面快取，未指定時使用 USE_PAGE_CACHE
+        enrich_details: 是否接著擷取書籍詳細頁，未指定時使用 ENRICH_DETAILS（從快取重播時不擷取）
+    
+    回傳:
+        Optional[Dict[str, Any]]: pipeline.run_pipeline 的統計結果，另含 timing（PhaseTimer.report() 的耗時報告），
+        更新失敗時回傳 None
     """
+    engine = engine or SCRAPE_ENGINE
+    replay = engine == scraper.ENGINE_CACHE
+    cache = None
     try:
-        print("開始從網路爬取最新書籍資料...")
+        if replay or (USE_PAGE_CACHE if use_page_cache is None else use_page_cache):
+            cache = page_cache.PageCache()
         
-        books = scraper.scrape_books()
-        total_scraped = len(books)
+        full_crawl = replay or not incremental_mode or incremental.needs_full_crawl()
+        early_stop = None
+        if replay:
+            print("開始從頁面快取重播已下載的頁面...")
+        elif full_crawl:
+            print("開始從網路爬取最新書籍資料（完整爬取）...")
+        else:
+            print("開始從網路爬取最新書籍資料（增量模式）...")
+            early_stop = incremental.EarlyStop(database.count_new_or_changed)
         
-        inserted_count = database.insert_books(books)
+        timer = PhaseTimer()
+        summary = pipeline.run_pipeline(
+            engine=engine,
+            timer=timer,
+            early_stop=early_stop,
+            full_crawl=full_crawl,
+            keywords=keywords or SEARCH_KEYWORDS,
+            page_cache=cache
+        )
         
-        print(f"資料庫更新完成！共爬取 {total_scraped} 筆資料，新增了 {inserted_count} 筆新書記錄。")
+        if summary['full_crawl'] and (summary['pages'] or summary['skipped_pages']) and not replay:
+            incremental.record_full_crawl()
+        
+        print(f"資料庫更新完成！共爬取 {summary['scraped']} 筆資料（{summary['duplicates']} 筆與其他關鍵字重複），"
+              f"新增了 {summary['inserted']} 筆新書記錄，更新了 {summary['updated']} 筆，{summary['unchanged']} 筆未變動。")
+        if summary['skipped_pages']:
+            print(f"{summary['skipped_pages']} 頁內容與上次下載相同，略過擷取與寫入。")
+        print(timer.format_report())
+        summary['timing'] = timer.report()
+        
+        if (ENRICH_DETAILS if enrich_details is None else enrich_details) and not replay:
+            summary['enrichment'] = enrich_database()
+        return summary
         
     except Exception as e:
         print(f"更新資料庫時發生錯誤：{e}")
+        return None
+    
+    finally:
+        if cache is not None:
+            cache.close()
+        if METRICS_PATH:
+            metrics.dump(METRICS_PATH)
 
 
-
+def enrich_database(limit: Optional[int] = None, force: bool = False,
+                    max_workers: int = enrichment.DEFAULT_MAX_WORKERS) -> Optional[Dict[str, int]]:
+    """
+    擷取書籍詳細頁，將 ISBN、出版社、出版日期與頁數寫回資料庫。
+    
+    只處理尚未擷取、或作者與商品編號在擷取後變動的書籍（force 為 True 時全部重新擷取）。
+    
+    參數:
+        limit: 最多處理的書籍數，None 表示全部
+        force: 是否重新擷取已擷取過的書籍
+        max_workers: 同時下載的頁面數上限
+    
+    回傳:
+        Optional[Dict[str, int]]: enrichment.enrich_books 的統計結果，擷取失敗時回傳 None
+    """
+    try:
+        timer = PhaseTimer()
+        summary = enrichment.enrich_books(max_workers=max_workers, limit=limit, force=force, timer=timer)
+        if not summary['pending']:
+            print("所有書籍的詳細資料皆為最新，不需擷取。")
+            return summary
+        
+        print(f"書籍詳細頁擷取完成！{summary['pending']} 本待擷取，解析 {summary['enriched']} 本，"
+              f"{summary['not_found']} 本詳細頁不存在，{summary['failed']} 本下載失敗（下次更新時重試），"
+              f"寫回 {summary['written']} 本。")
+        print(timer.format_report())
+        return summary
+        
+    except Exception as e:
+        print(f"擷取書籍詳細頁時發生錯誤：{e}")
+        return None
 
 
 def search_books() -> None:
@@ -56,7 +207,7 @@ def search_books() -> None:
     """
     while True:
         show_search_menu()
-        choice = input("請選擇查詢方式 (a-c): ").strip().lower()
+        choice = input("請選擇查詢方式 (a-d): ").strip().lower()
         
         if choice == 'a':
             keyword = input("請輸入關鍵字: ").strip()
@@ -75,12 +226,62 @@ def search_books() -> None:
                 print(f"查詢時發生錯誤：{e}")
         
         elif choice == 'c':
+            try:
+                advanced_search()
+            except Exception as e:
+                print(f"查詢時發生錯誤：{e}")
+        
+        elif choice == 'd':
             break
         
         else:
             print("無效選項，請重新輸入。")
 
 
+def advanced_search() -> None:
+    """
+    進階查詢功能。
+    
+    可同時指定書名、作者關鍵字與價格範圍，選擇排序方式，
+    結果以 keyset 分頁每次顯示 RESULTS_PAGE_SIZE 筆。
+    """
+    title = input("書名關鍵字（可留空）: ").strip() or None
+    author = input("作者關鍵字（可留空）: ").strip() or None
+    try:
+        min_price = _read_price("最低價格（可留空）: ")
+        max_price = _read_price("最高價格（可留空）: ")
+    except ValueError:
+        print("價格需為整數。")
+        return
+    
+    print("排序方式：" + "、".join(f"{key}. {label}" for key, (label, _, _) in SORT_OPTIONS.items()))
+    _, sort, descending = SORT_OPTIONS.get(input("請選擇排序方式 (1-5，預設 1): ").strip(), SORT_OPTIONS['1'])
+    
+    after = None
+    shown = 0
+    while True:
+        rows = database.query_books(title=title, author=author, min_price=min_price, max_price=max_price,
+                                    sort=sort, descending=descending, limit=RESULTS_PAGE_SIZE, after=after)
+        if not rows and shown:
+            print("\n已顯示全部結果。")
+            return
+        
+        display_search_results(rows)
+        shown += len(rows)
+        if len(rows) < RESULTS_PAGE_SIZE:
+            return
+        
+        if input(f"已顯示 {shown} 筆，按 Enter 顯示下一頁，輸入 q 結束: ").strip().lower() == 'q':
+            return
+        after = database.book_cursor(rows[-1], sort)
+
+
+def _read_price(prompt: str) -> Optional[int]:
+    """讀取價格輸入，空白時回傳 None，不是整數時拋出 ValueError。"""
+    text = input(prompt).strip()
+    return int(text) if text else None
+
+
 def display_search_results(results: list) -> None:
     """
     顯示查詢結果。
@@ -100,20 +301,258 @@ def display_search_results(results: list) -> None:
         print(f"{'=' * 80}")
 
 
-def main() -> None:
-    """主程式進入點。"""
+def build_arg_parser() -> argparse.ArgumentParser:
+    """建立非互動子命令（update、enrich、search、export、history、drops、serve）的參數解析器。"""
+    parser = argparse.ArgumentParser(description='博客來 LLM 書籍管理系統（不帶子命令時進入互動式選單）')
+    commands = parser.add_subparsers(dest='command', metavar='{update,enrich,search,export,history,drops,serve}')
+    
+    update_parser = commands.add_parser('update', help='爬取最新書籍資料並更新資料庫')
+    update_parser.add_argument('--engine', choices=scraper.ENGINES,
+                               help=f'爬蟲引擎（預設 {SCRAPE_ENGINE}；cache 為不連線、從頁面快取重播）')
+    update_parser.add_argument('--full', action='store_true', help='完整爬取所有頁面（不使用增量模式）')
+    update_parser.add_argument('--no-page-cache', action='store_true',
+                               help='不使用頁面快取，所有頁面都重新擷取與寫入')
+    update_parser.add_argument('--enrich', action='store_true',
+                               help='更新後接著擷取新書與書目變動的書籍詳細頁（ISBN、出版社、出版日期、頁數）')
+    _add_keyword_arguments(update_parser)
+    
+    enrich_parser = commands.add_parser('enrich', help='擷取書籍詳細頁（ISBN、出版社、出版日期、頁數）')
+    enrich_parser.add_argument('--force', action='store_true', help='重新擷取所有書籍（包含已擷取過的書籍）')
+    enrich_parser.add_argument('--limit', type=int, help='最多處理的書籍數')
+    enrich_parser.add_argument('--workers', type=int, default=enrichment.DEFAULT_MAX_WORKERS,
+                               help=f'同時下載的頁面數（預設 {enrichment.DEFAULT_MAX_WORKERS}）')
+    
+    search_parser = commands.add_parser('search', help='查詢書籍，結果以 JSON 輸出')
+    search_parser.add_argument('--title', help='書名關鍵字')
+    search_parser.add_argument('--author', help='作者關鍵字')
+    search_parser.add_argument('--min-price', type=int, help='最低價格')
+    search_parser.add_argument('--max-price', type=int, help='最高價格')
+    search_parser.add_argument('--sort', choices=sorted(database.SORT_COLUMNS), default='title', help='排序欄位')
+    search_parser.add_argument('--desc', action='store_true', help='遞減排序')
+    search_parser.add_argument('--limit', type=int, default=CLI_SEARCH_LIMIT,
+                               help=f'每個查詢最多回傳的筆數（預設 {CLI_SEARCH_LIMIT}，0 表示不限制）')
+    search_parser.add_argument('--keywords-file', metavar='FILE',
+                               help='批次查詢：檔案中每行一個關鍵字（- 表示標準輸入），每個關鍵字輸出一行 JSON；'
+                                    '其他條件套用到每個關鍵字')
+    search_parser.add_argument('--by', choices=['title', 'author'], default='title',
+                               help='批次查詢時關鍵字比對的欄位（預設 title，不可同時指定該欄位的條件）')
+    
+    export_parser = commands.add_parser('export', help='匯出所有書籍')
+    export_parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                               help='json 為單一陣列，jsonl 為每行一本書（預設 json）')
+    export_parser.add_argument('--output', metavar='FILE', help='輸出檔案（預設為標準輸出）')
+    export_parser.add_argument('--sort', choices=sorted(database.SORT_COLUMNS), default='recency', help='排序欄位')
+    
+    history_parser = commands.add_parser('history', help='查詢書籍的價格歷史，結果以 JSON 輸出')
+    history_parser.add_argument('--title', required=True, help='書名（完全相同）')
+    history_parser.add_argument('--on', metavar='YYYY-MM-DD', help='只查詢該日的價格')
+    
+    drops_parser = commands.add_parser('drops', help='列出最近降價最多的書籍，結果以 JSON 輸出')
+    drops_parser.add_argument('--days', type=int, default=30, help='期間天數（預設 30）')
+    drops_parser.add_argument('--limit', type=int, default=20, help='最多列出的筆數（預設 20）')
+    drops_parser.add_argument('--as-of', metavar='YYYY-MM-DD', help='期末日期（預設今天）')
+    
+    serve_parser = commands.add_parser('serve', help='啟動唯讀的 HTTP/JSON 查詢服務')
+    serve_parser.add_argument('--host', default=query_service.DEFAULT_HOST, help='監聽的位址')
+    serve_parser.add_argument('--port', type=int, default=query_service.DEFAULT_PORT, help='監聽的連接埠')
+    serve_parser.add_argument('--workers', type=int, default=query_service.DEFAULT_WORKERS,
+                              help='執行查詢的工作執行緒數（每個執行緒一條唯讀連線）')
+    serve_parser.add_argument('--max-in-flight', type=int, default=query_service.DEFAULT_MAX_IN_FLIGHT,
+                              help='同時處理的請求數上限，超過時回應 503')
+    serve_parser.add_argument('--timeout', type=float, default=query_service.DEFAULT_TIMEOUT,
+                              help='單一查詢的逾時秒數，超過時回應 504')
+    return parser
+
+
+def _add_keyword_arguments(parser: argparse.ArgumentParser) -> None:
+    """加入指定搜尋關鍵字的參數（--keyword 可重複、--keywords-file 讀取檔案）。"""
+    parser.add_argument('--keyword', action='append', dest='keywords', metavar='KEYWORD',
+                        help=f'搜尋關鍵字，可重複指定（預設 {", ".join(SEARCH_KEYWORDS)}）')
+    parser.add_argument('--keywords-file', metavar='FILE', help='搜尋關鍵字檔案：每行一個關鍵字（- 表示標準輸入）')
+
+
+def read_keywords_file(path: str) -> List[str]:
+    """
+    讀取關鍵字檔案。
+    
+    參數:
+        path: 檔案路徑，'-' 表示標準輸入
+    
+    回傳:
+        List[str]: 每行一個關鍵字（已去除空白，略過空行與 # 開頭的註解）
+    """
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """
+    執行非互動子命令。
+    
+    參數:
+        args: build_arg_parser() 解析後的參數
+    
+    回傳:
+        int: 程式結束碼（0 成功，1 失敗）
+    """
+    if args.command == 'update':
+        keywords = list(args.keywords or [])
+        if args.keywords_file:
+            keywords.extend(read_keywords_file(args.keywords_file))
+        # 標準輸出保留給統計結果的 JSON，進度訊息改寫到標準錯誤
+        with contextlib.redirect_stdout(sys.stderr):
+            with profiling.profiled('update_database', cpu='cpu' in PROFILE_MODES,
+                                    memory='memory' in PROFILE_MODES):
+                summary = update_database(engine=args.engine, incremental_mode=not args.full,
+                                          keywords=keywords or None,
+                                          use_page_cache=False if args.no_page_cache else None,
+                                          enrich_details=True if args.enrich else None)
+        if summary is None:
+            return 1
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+    
+    if args.command == 'enrich':
+        with contextlib.redirect_stdout(sys.stderr):
+            summary = enrich_database(limit=args.limit, force=args.force, max_workers=args.workers)
+        if summary is None:
+            return 1
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+    
+    if args.command == 'search':
+        filters = {
+            'title': args.title,
+            'author': args.author,
+            'min_price': args.min_price,
+            'max_price': args.max_price,
+            'sort': args.sort,
+            'descending': args.desc,
+            'limit': args.limit or None,
+        }
+        if args.keywords_file:
+            for keyword in read_keywords_file(args.keywords_file):
+                rows = database.query_books(**dict(filters, **{args.by: keyword}))
+                print(json.dumps({'keyword': keyword, 'books': [dict(row) for row in rows]}, ensure_ascii=False))
+        else:
+            rows = database.query_books(**filters)
+            print(json.dumps([dict(row) for row in rows], ensure_ascii=False, indent=2))
+        return 0
+    
+    if args.command == 'export':
+        rows = database.iter_books(sort=args.sort)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                count = write_books_json(rows, f, args.format)
+            print(f"已匯出 {count} 筆書籍到 {args.output}", file=sys.stderr)
+        else:
+            write_books_json(rows, sys.stdout, args.format)
+        return 0
+    
+    if args.command == 'history':
+        if args.on:
+            result = {'title': args.title, 'date': args.on, 'price': database.get_price_on(args.title, args.on)}
+        else:
+            result = {
+                'title': args.title,
+                'range': database.get_price_range(args.title),
+                'history': [dict(row) for row in database.get_price_history(args.title)],
+            }
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    
+    if args.command == 'drops':
+        rows = database.get_price_drops(days=args.days, limit=args.limit, as_of=args.as_of)
+        print(json.dumps([dict(row) for row in rows], ensure_ascii=False, indent=2))
+        return 0
+    
+    if args.command == 'serve':
+        query_service.serve(database.DB_PATH, host=args.host, port=args.port, workers=args.workers,
+                            max_in_flight=args.max_in_flight, timeout=args.timeout)
+        return 0
+    
+    return 1
+
+
+def write_books_json(rows: Iterable[Any], out: TextIO, output_format: str = 'json') -> int:
+    """
+    以串流方式將書籍寫成 JSON，不需一次把所有資料載入記憶體。
+    
+    參數:
+        rows: 書籍資料（sqlite3.Row 或 dict）
+        out: 輸出的文字檔
+        output_format: 'json'（單一陣列）或 'jsonl'（每行一本書）
+    
+    回傳:
+        int: 寫出的書籍數
+    """
+    count = 0
+    if output_format == 'jsonl':
+        for row in rows:
+            out.write(json.dumps(dict(row), ensure_ascii=False) + '\n')
+            count += 1
+        return count
+    
+    out.write('[')
+    for row in rows:
+        out.write(('\n  ' if count == 0 else ',\n  ') + json.dumps(dict(row), ensure_ascii=False))
+        count += 1
+    out.write('\n]\n' if count else ']\n')
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    主程式進入點。
+    
+    參數:
+        argv: 命令列參數（不含程式名稱），未指定時使用 sys.argv；沒有子命令時進入互動式選單
+    
+    回傳:
+        int: 程式結束碼
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'search' and args.keywords_file and getattr(args, args.by):
+        parser.error(f"--keywords-file 的關鍵字比對 {args.by}，不可同時指定 --{args.by}（改用 --by 指定另一個欄位）")
+    
+    # 子命令的標準輸出保留給 JSON 結果，初始化（建立或遷移資料庫結構）的訊息改寫到標準錯誤
+    log = sys.stderr if args.command else sys.stdout
     try:
-        database.init_database()
+        with contextlib.redirect_stdout(log):
+            database.init_database()
     except Exception as e:
-        print(f"資料庫初始化失敗：{e}")
-        return
+        print(f"資料庫初始化失敗：{e}", file=log)
+        return 1
     
+    try:
+        if not args.command:
+            interactive_loop()
+            return 0
+        try:
+            return run_command(args)
+        except Exception as e:
+            print(f"執行 {args.command} 時發生錯誤：{e}", file=sys.stderr)
+            return 1
+    
+    finally:
+        shutdown()
+
+
+def interactive_loop() -> None:
+    """互動式選單：顯示主選單並依使用者的選擇執行，直到選擇離開。"""
     while True:
         show_main_menu()
         choice = input("請選擇操作選項 (1-3): ").strip()
         
         if choice == '1':
-            update_database()
+            with profiling.profiled('update_database', cpu='cpu' in PROFILE_MODES,
+                                    memory='memory' in PROFILE_MODES):
+                update_database()
         
         elif choice == '2':
             search_books()
@@ -126,6 +565,11 @@ def main() -> None:
             print("\n無效選項，請重新輸入。")
 
 
-if __name__ == '__main__':
-    main()
+def shutdown() -> None:
+    """關閉共用的瀏覽器工作階段與資料庫連線（程式結束時呼叫）。"""
+    scraper.shutdown_driver_pool()
+    database.close_connections()
+
 
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+精簡瀏覽器設定的效能比較
+
+分別以一般設定與精簡設定（browser_profile.create_driver(lean=True)）的 headless Chrome
+開啟搜尋結果頁，輸出每頁透過網路傳輸的位元組數與載入時間
+（driver.get 開始到 div.table-searchbox 出現為止）。
+
+精簡設定使用暫存的磁碟快取目錄；--passes 2 時第二輪可看出快取命中後的傳輸量。
+
+使用方式：
+    python benchmarks/bench_browser_profile.py --pages 3 --passes 2
+    python benchmarks/bench_browser_profile.py --url-template 'http://127.0.0.1:8000/search/query/cat/BKA/key/{keyword}/sort/1/page/{page}/v/0/'
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import browser_profile
+import http_scraper
+import selenium_scraper
+
+
+def measure(lean: bool, urls: List[str], passes: int, cache_dir: str) -> List[Dict[str, float]]:
+    """以指定設定依序載入各網址，回傳每頁的傳輸位元組數與載入時間。"""
+    driver = browser_profile.create_driver(lean=lean, cache_dir=cache_dir, log_network=True)
+    results = []
+    try:
+        browser_profile.network_transfer_bytes(driver)
+        for pass_num in range(1, passes + 1):
+            for page, url in enumerate(urls, 1):
+                start = time.perf_counter()
+                driver.get(url)
+                WebDriverWait(driver, selenium_scraper.PAGE_LOAD_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div.table-searchbox'))
+                )
+                elapsed = time.perf_counter() - start
+                books = len(selenium_scraper.extract_books_from_page(driver))
+                # 等待 eager 模式下仍在背景載入的資源，計入該頁的傳輸量
+                time.sleep(1)
+                results.append({
+                    'pass': pass_num,
+                    'page': page,
+                    'bytes': browser_profile.network_transfer_bytes(driver),
+                    'seconds': elapsed,
+                    'books': books,
+                })
+    finally:
+        driver.quit()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='一般與精簡瀏覽器設定的傳輸量與載入時間比較')
+    parser.add_argument('--keyword', default=http_scraper.DEFAULT_KEYWORD)
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--passes', type=int, default=2)
+    parser.add_argument('--url-template', default=http_scraper.SEARCH_URL_TEMPLATE)
+    args = parser.parse_args()
+
+    urls = [http_scraper.build_search_url(args.keyword, page, args.url_template)
+            for page in range(1, args.pages + 1)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        normal = measure(False, urls, args.passes, cache_dir)
+        lean = measure(True, urls, args.passes, cache_dir)
+
+    print(f"{'輪次':<6}{'頁碼':<6}{'一般 KB':>10}{'精簡 KB':>10}{'一般 秒':>9}{'精簡 秒':>9}{'書籍數':>8}")
+    for off, on in zip(normal, lean):
+        print(f"{off['pass']:<6}{off['page']:<6}{off['bytes'] / 1024:>10.1f}{on['bytes'] / 1024:>10.1f}"
+              f"{off['seconds']:>9.2f}{on['seconds']:>9.2f}{on['books']:>5}/{off['books']}")
+
+    for name, results in (('一般', normal), ('精簡', lean)):
+        total_bytes = sum(result['bytes'] for result in results)
+        total_seconds = sum(result['seconds'] for result in results)
+        print(f"{name}設定：共 {total_bytes / 1024:.1f} KB，載入 {total_seconds:.2f} 秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+書籍詳細頁擷取的驗證與量測
+
+以本機 fixture 伺服器提供詳細頁（fixtures/products/ 中手寫的頁面，其餘書籍以其中一頁為樣板產生），
+將搜尋結果頁 fixture 的書籍寫入暫存資料庫後，依序執行下列情境並確認結果（不符時結束碼為 1）：
+
+- serial / concurrent：伺服器每個回應延遲 --delay 秒，比較 1 個與 --workers 個同時下載的耗時，
+  並確認寫回的 ISBN、出版社、出版日期與頁數與預期相同、已下架（404）的書籍記錄為已擷取
+- batches：寫回資料庫的交易數約為書籍數 / --batch-size
+- up-to-date：再次執行時沒有待擷取的書籍，不發出任何請求
+- listing-changed：只有作者或商品編號變動的書籍需要重新擷取，價格變動不影響
+- rate-limit：限制每秒請求數時，耗時不低於請求數 / 每秒請求數
+
+使用方式：
+    python benchmarks/bench_enrichment.py --delay 0.02 --workers 8
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import enrichment
+import metrics
+from field_parser import parse_product_id
+from html_extractor import extract_books_from_html
+
+from fixture_server import FIXTURES_DIR, detail_url_template, serve_fixtures
+
+
+# fixtures/products/ 中手寫詳細頁的預期結果
+EXPECTED_FIXTURES: Dict[str, Dict[str, Any]] = {
+    '0010960000': {'isbn': '9786263245426', 'publisher': '碁峰', 'publish_date': '2024-05-30', 'pages': 432},
+    '0010960037': {'isbn': '9789863127970', 'publisher': '旗標科技', 'publish_date': '2025-01-08', 'pages': 528},
+    '0010960074': {'isbn': None, 'publisher': '深石數位', 'publish_date': '2024-11', 'pages': None},
+}
+
+# 產生詳細頁時使用的樣板與出版社
+TEMPLATE_PRODUCT_ID = '0010960000'
+PUBLISHERS = ['碁峰', '旗標科技', '博碩文化', '歐萊禮', '天瓏資訊']
+
+
+def synthetic_details(product_id: str) -> Dict[str, Any]:
+    """產生詳細頁的內容（由商品編號決定，方便比對）。"""
+    number = int(product_id)
+    return {
+        'isbn': f'978{product_id[-10:]}',
+        'publisher': PUBLISHERS[number % len(PUBLISHERS)],
+        'publish_date': f'{2020 + number % 6}-{number % 12 + 1:02d}-{number % 28 + 1:02d}',
+        'pages': 120 + number % 480,
+    }
+
+
+def write_detail_pages(fixtures: Path, product_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """為沒有手寫詳細頁的商品產生詳細頁，回傳每個商品的預期結果。"""
+    template = (fixtures / 'products' / f'{TEMPLATE_PRODUCT_ID}.html').read_text(encoding='utf-8')
+    expected = dict(EXPECTED_FIXTURES)
+    for product_id in product_ids:
+        if product_id in expected:
+            continue
+        details = synthetic_details(product_id)
+        year, month, day = details['publish_date'].split('-')
+        html = template.replace('9786263245426', details['isbn'])
+        html = html.replace('<span>碁峰</span>', f"<span>{details['publisher']}</span>")
+        html = html.replace('2024/05/30', f'{year}/{month}/{day}')
+        html = html.replace('432頁', f"{details['pages']}頁")
+        (fixtures / 'products' / f'{product_id}.html').write_text(html, encoding='utf-8')
+        expected[product_id] = details
+    return expected
+
+
+def load_books(fixtures: Path) -> List[Dict[str, Any]]:
+    books = []
+    for page in sorted(fixtures.glob('search_page_*.html')):
+        books.extend(extract_books_from_html(page.read_text(encoding='utf-8'), 'https://search.books.com.tw/'))
+    return books
+
+
+def stored_details() -> Dict[str, Dict[str, Any]]:
+    rows = database.get_connection().execute(
+        'SELECT product_id, isbn, publisher, publish_date, pages, enriched_at FROM llm_books'
+    ).fetchall()
+    return {row['product_id']: dict(row) for row in rows}
+
+
+def run(url_template: str, **options: Any) -> Dict[str, Any]:
+    metrics.reset()
+    start = time.perf_counter()
+    summary = enrichment.enrich_books(url_template=url_template, **options)
+    summary['seconds'] = time.perf_counter() - start
+    writes = metrics.snapshot()['histograms'].get('db_write_seconds', [])
+    summary['transactions'] = sum(item['count'] for item in writes
+                                  if item['labels'].get('operation') == 'update_book_details')
+    return summary
+
+
+def check(name: str, ok: bool, detail: str = '') -> bool:
+    print(f"[{'通過' if ok else '失敗'}] {name:<16} {detail}")
+    return ok
+
+
+def describe(summary: Dict[str, Any]) -> str:
+    return (f"{summary['seconds'] * 1000:8.1f} ms  待擷取 {summary['pending']}，解析 {summary['enriched']}，"
+            f"不存在 {summary['not_found']}，失敗 {summary['failed']}，寫回 {summary['written']}"
+            f"（{summary['transactions']} 個交易）")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='書籍詳細頁擷取的驗證與量測')
+    parser.add_argument('--delay', type=float, default=0.02, help='fixture 伺服器每個回應的延遲秒數')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent 情境同時下載的頁面數')
+    parser.add_argument('--batch-size', type=int, default=10, help='每次寫回資料庫的書籍數')
+    parser.add_argument('--rate', type=float, default=50, help='rate-limit 情境每秒最多的請求數')
+    args = parser.parse_args()
+
+    checks = []
+    with tempfile.TemporaryDirectory() as workdir:
+        fixtures = Path(workdir) / 'fixtures'
+        shutil.copytree(FIXTURES_DIR, fixtures)
+        books = load_books(fixtures)
+        product_ids = [parse_product_id(book['link']) for book in books]
+        expected = write_detail_pages(fixtures, product_ids)
+
+        # 最後一本書的詳細頁已下架
+        removed = product_ids[-1]
+        (fixtures / 'products' / f'{removed}.html').unlink()
+        expected[removed] = dict.fromkeys(enrichment.DETAIL_FIELDS)
+
+        database.configure(os.path.join(workdir, 'enrichment.db'))
+        database.init_database()
+        database.insert_books(books)
+        total = len(books)
+
+        with serve_fixtures(fixtures_dir=fixtures, delay=args.delay) as search_template:
+            url_template = detail_url_template(search_template)
+            options = {'requests_per_second': 0, 'batch_size': args.batch_size}
+
+            serial = run(url_template, max_workers=1, **options)
+            checks.append(check('serial', serial['pending'] == total, describe(serial)))
+
+            concurrent = run(url_template, max_workers=args.workers, force=True, **options)
+            speedup = serial['seconds'] / concurrent['seconds']
+            checks.append(check('concurrent', speedup > 1.5 and concurrent['written'] == total,
+                                f"{describe(concurrent)}  {speedup:.1f} 倍"))
+
+            stored = stored_details()
+            mismatched = [product_id for product_id in product_ids
+                          if {field: stored[product_id][field] for field in enrichment.DETAIL_FIELDS}
+                          != expected[product_id] or stored[product_id]['enriched_at'] is None]
+            checks.append(check('fields', not mismatched and concurrent['not_found'] == 1,
+                                f"{total - len(mismatched)}/{total} 本書的詳細資料與預期相同"
+                                + (f"，不同：{mismatched}" if mismatched else '')))
+
+            max_transactions = -(-total // args.batch_size) + 1
+            checks.append(check('batches', 0 < concurrent['transactions'] <= max_transactions,
+                                f"{total} 本書以 {concurrent['transactions']} 個交易寫回"
+                                f"（批次 {args.batch_size}，上限 {max_transactions}）"))
+
+            again = run(url_template, max_workers=args.workers, **options)
+            checks.append(check('up-to-date', again['pending'] == 0 and again['enriched'] == 0, describe(again)))
+
+            changed = [dict(book) for book in books[:3]]
+            changed[0]['author'] += '（修訂）'
+            changed[1]['price'] += 10
+            changed[2]['link'] = re.sub(r'loc=\w+', 'loc=P_0009_009', changed[2]['link'])
+            database.insert_books(changed)
+            after_change = run(url_template, max_workers=args.workers, **options)
+            checks.append(check('listing-changed', after_change['pending'] == 1 and after_change['written'] == 1,
+                                f"{describe(after_change)}（作者、價格、連結排名參數各變動 1 本）"))
+
+        with serve_fixtures(fixtures_dir=fixtures) as search_template:
+            count = 20
+            limited = run(detail_url_template(search_template), max_workers=args.workers, force=True,
+                          limit=count, requests_per_second=args.rate, batch_size=args.batch_size)
+            minimum = (count - 1) / args.rate
+            checks.append(check('rate-limit', limited['seconds'] >= minimum * 0.95 and limited['enriched'] == count,
+                                f"{describe(limited)}（{count} 個請求、每秒 {args.rate:g} 個，至少 {minimum:.2f} 秒）"))
+
+        database.close_connections()
+
+    failures = checks.count(False)
+    print(f"\n{'全部通過' if not failures else f'{failures} 項失敗'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
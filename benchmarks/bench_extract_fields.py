@@ -0,0 +1,128 @@
+"""
+價格與作者解析的微基準測試
+
+從 fixtures/ 的搜尋結果頁取出所有書籍區塊的價格、作者與完整文字，
+重複到指定數量（預設 5,000 個區塊），比較：
+- 舊做法：每次呼叫 re.search / re.findall（經由 re 模組快取查找樣式），
+  價格區塊解析失敗時再對整個區塊文字搜尋一次
+- field_parser：預先編譯的樣式，單次掃描同時取得定價、折扣與售價
+另外以相同數量的區塊組成一頁，量測 extract_books_from_html 每個區塊的平均時間。
+
+使用方式：
+    python benchmarks/bench_extract_fields.py --containers 5000 --repeat 5
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from field_parser import join_authors, parse_authors, parse_fallback_price, parse_price
+from html_extractor import SearchResultParser, extract_books_from_html, normalize_text
+
+from fixture_server import FIXTURES_DIR
+
+
+# (價格區塊文字, 作者名稱列表, 書籍區塊完整文字)
+Sample = Tuple[str, List[str], str]
+
+
+def load_samples() -> List[Sample]:
+    """解析所有 fixture 頁面，取出每個書籍區塊的價格、作者與完整文字。"""
+    samples = []
+    for fixture in sorted(FIXTURES_DIR.glob('search_page_*.html')):
+        parser = SearchResultParser()
+        parser.feed(fixture.read_text(encoding='utf-8'))
+        parser.close()
+        for container in parser.containers:
+            samples.append((
+                normalize_text(''.join(container.price_parts or [])),
+                parse_authors(''.join(parts) for parts in container.authors),
+                normalize_text(''.join(container.text_parts)),
+            ))
+    return samples
+
+
+def legacy_fields(sample: Sample) -> Tuple[int, str]:
+    """改寫前的解析方式。"""
+    price_text, authors, full_text = sample
+    price = 0
+    match = re.search(r'(\d+)\s*元', price_text)
+    if match:
+        price = int(match.group(1))
+    else:
+        numbers = re.findall(r'\d+', price_text)
+        large_numbers = [int(n) for n in numbers if int(n) >= 100]
+        if large_numbers:
+            price = max(large_numbers)
+    if price == 0:
+        match = re.search(r'(\d+)\s*元', full_text)
+        if match:
+            price = int(match.group(1))
+    author = 'N/A'
+    names = [name.strip() for name in authors if name.strip()]
+    if names:
+        author = ', '.join(names)
+    return price, author
+
+
+def compiled_fields(sample: Sample) -> Tuple[int, str]:
+    """field_parser 的解析方式。"""
+    price_text, authors, full_text = sample
+    prices = parse_price(price_text)
+    if not prices['sale_price']:
+        prices['sale_price'] = parse_fallback_price(full_text)
+    return prices['sale_price'] or 0, join_authors(authors)
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """回傳 repeat 次執行的中位數（秒）。"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def synthetic_page(containers: int) -> str:
+    """重複 fixture 頁面中的書籍區塊，組成含有指定數量區塊的搜尋結果頁。"""
+    html = (FIXTURES_DIR / 'search_page_1.html').read_text(encoding='utf-8')
+    blocks = re.findall(r'<div class="table-td".*?\n        </div>\n', html, re.S)
+    body = ''.join(blocks[i % len(blocks)] for i in range(containers))
+    return f'<div class="table-searchbox">{body}</div>'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='價格與作者解析的微基準測試')
+    parser.add_argument('--containers', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    base = load_samples()
+    samples = [base[i % len(base)] for i in range(args.containers)]
+
+    mismatches = sum(1 for sample in base if legacy_fields(sample) != compiled_fields(sample))
+    if mismatches:
+        print(f"警告：{mismatches} 個 fixture 區塊的新舊解析結果不同")
+
+    legacy = measure(lambda: [legacy_fields(sample) for sample in samples], args.repeat)
+    compiled = measure(lambda: [compiled_fields(sample) for sample in samples], args.repeat)
+    print(f"{len(samples):,} 個書籍區塊（取自 {len(base)} 個 fixture 區塊）：")
+    print(f"  舊做法        {legacy / len(samples) * 1e6:8.2f} µs/區塊")
+    print(f"  field_parser  {compiled / len(samples) * 1e6:8.2f} µs/區塊"
+          f"（{legacy / compiled:.2f}x）")
+
+    page = synthetic_page(args.containers)
+    books = len(extract_books_from_html(page, 'https://search.books.com.tw/'))
+    full = measure(lambda: extract_books_from_html(page, 'https://search.books.com.tw/'), args.repeat)
+    print(f"  整頁 HTML 擷取 {full / args.containers * 1e6:7.2f} µs/區塊（{books:,} 本）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+insert_books 效能比較
+
+比較舊版逐筆 INSERT OR IGNORE（前後各一次 COUNT(*)、預設 rollback journal）
+與目前單一交易 executemany UPSERT 的寫入速度。
+
+每個資料量量測三種情境：
+- fresh：空資料庫寫入全部書籍
+- unchanged：再次寫入相同資料（全部未變動）
+- changed：再次寫入，其中 10% 價格有變動
+
+使用方式：
+    python benchmarks/bench_insert.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+def legacy_insert_books(db_path: str, books: List[Dict[str, Any]]) -> int:
+    """舊版 insert_books：逐筆 INSERT OR IGNORE，並以兩次 COUNT(*) 計算新增筆數。"""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM llm_books')
+        count_before = cursor.fetchone()[0]
+        for book in books:
+            cursor.execute('''
+                INSERT OR IGNORE INTO llm_books (title, author, price, link)
+                VALUES (?, ?, ?, ?)
+            ''', (book['title'], book['author'], book['price'], book['link']))
+        conn.commit()
+        cursor.execute('SELECT COUNT(*) FROM llm_books')
+        return cursor.fetchone()[0] - count_before
+
+
+def make_books(count: int, price_offset: int = 0, changed_ratio: float = 0.0) -> List[Dict[str, Any]]:
+    """產生合成書籍資料；changed_ratio 比例的書籍價格加上 price_offset。"""
+    changed_every = int(1 / changed_ratio) if changed_ratio else 0
+    books = []
+    for i in range(count):
+        price = 300 + i % 700
+        if changed_every and i % changed_every == 0:
+            price += price_offset
+        books.append({
+            'title': f'大型語言模型實戰 第 {i} 冊',
+            'author': f'作者 {i % 997}, Author {i % 113}',
+            'price': price,
+            'link': f'https://www.books.com.tw/products/{i:010d}',
+        })
+    return books
+
+
+def timed(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(size: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    """對指定資料量執行三種情境，回傳各實作的耗時（秒）。"""
+    fresh = make_books(size)
+    changed = make_books(size, price_offset=50, changed_ratio=0.1)
+    results: Dict[str, Dict[str, float]] = {}
+
+    legacy_path = os.path.join(workdir, f'legacy_{size}.db')
+    with sqlite3.connect(legacy_path) as conn:
+        conn.execute('''
+            CREATE TABLE llm_books (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL UNIQUE,
+                author TEXT,
+                price INTEGER,
+                link TEXT
+            )
+        ''')
+    results['legacy'] = {
+        'fresh': timed(lambda: legacy_insert_books(legacy_path, fresh)),
+        'unchanged': timed(lambda: legacy_insert_books(legacy_path, fresh)),
+        'changed': timed(lambda: legacy_insert_books(legacy_path, changed)),
+    }
+
+    database.configure(os.path.join(workdir, f'upsert_{size}.db'))
+    database.init_database()
+    results['upsert'] = {
+        'fresh': timed(lambda: database.insert_books(fresh)),
+        'unchanged': timed(lambda: database.insert_books(fresh)),
+        'changed': timed(lambda: database.insert_books(changed)),
+    }
+    database.close_connections()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='insert_books 效能比較')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results = run(size, workdir)
+            print(f"\n{size:,} 筆")
+            print(f"{'情境':<10}{'legacy (s)':>12}{'upsert (s)':>12}{'加速':>8}")
+            for scenario in ('fresh', 'unchanged', 'changed'):
+                legacy = results['legacy'][scenario]
+                upsert = results['upsert'][scenario]
+                print(f"{scenario:<10}{legacy:>12.3f}{upsert:>12.3f}{legacy / upsert:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
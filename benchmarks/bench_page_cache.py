@@ -0,0 +1,142 @@
+"""
+頁面快取的驗證與量測
+
+以本機 fixture 伺服器重播搜尋結果頁，依序執行下列情境，記錄每次更新的耗時、
+擷取的頁數與寫入資料庫的頁數，並確認結果符合預期（不符時結束碼為 1）：
+
+- no-cache：不使用快取（原本的做法）
+- cold：快取是空的，每頁都下載、擷取並寫入
+- not-modified：伺服器提供 ETag / Last-Modified，每頁都回應 304，不擷取也不寫入
+- fragment-hash：伺服器不提供驗證資訊，以搜尋結果區塊的雜湊判斷未變動，不擷取也不寫入
+- one-page-changed：修改第 2 頁一本書的價格，只有第 2 頁重新擷取並寫入
+- replay：停止伺服器，從快取重播並重新擷取所有頁面
+- lru：快取上限小於所有頁面的大小時，淘汰最久未使用的頁面且大小不超過上限
+
+使用方式：
+    python benchmarks/bench_page_cache.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import http_scraper
+import metrics
+import scraper
+from page_cache import PageCache
+
+from fixture_server import FIXTURES_DIR, serve_fixtures
+
+
+def write_pages(pages: Iterable[Tuple[int, List[Dict[str, Any]]]]) -> Dict[str, Any]:
+    """與 pipeline 相同：空列表（未變動的頁面）略過寫入，其餘寫入資料庫。"""
+    result = {'pages': 0, 'written': 0, 'updated': 0}
+    for _, page_books in pages:
+        result['pages'] += 1
+        if page_books:
+            result['written'] += 1
+            result['updated'] += database.insert_books(page_books)['updated']
+    return result
+
+
+def run_update(url_template: str, cache: Optional[PageCache]) -> Dict[str, Any]:
+    """以 HTTP 引擎更新一次資料庫，回傳耗時、擷取與寫入的頁數。"""
+    metrics.reset()
+    start = time.perf_counter()
+    result = write_pages(scraper.iter_scrape_pages(
+        engine=scraper.ENGINE_HTTP, requests_per_second=0, page_cache=cache,
+        count_changes=database.count_new_or_changed if cache is not None else None,
+        url_template=url_template
+    ))
+    result['seconds'] = time.perf_counter() - start
+    result['cache'] = cache_results()
+    return result
+
+
+def cache_results() -> Dict[str, int]:
+    """從指標取得本次各種重新驗證結果的次數。"""
+    series = metrics.snapshot()['counters'].get('page_cache_total', [])
+    return {item['labels']['result']: int(item['value']) for item in series}
+
+
+def report(name: str, result: Dict[str, Any], expected_written: int) -> bool:
+    ok = result['written'] == expected_written
+    print(f"[{'通過' if ok else '失敗'}] {name:<17} {result['seconds'] * 1000:8.1f} ms  "
+          f"{result['pages']} 頁，寫入 {result['written']} 頁（預期 {expected_written}）  {result.get('cache', '')}")
+    return ok
+
+
+def main() -> int:
+    checks = []
+    with tempfile.TemporaryDirectory() as workdir:
+        fixtures = Path(workdir) / 'fixtures'
+        shutil.copytree(FIXTURES_DIR, fixtures)
+        pages = len(list(fixtures.glob('search_page_*.html')))
+
+        database.configure(os.path.join(workdir, 'cache.db'))
+        database.init_database()
+        cache = PageCache(os.path.join(workdir, 'pages.sqlite3'))
+
+        with serve_fixtures(fixtures_dir=fixtures) as url_template:
+            checks.append(report('no-cache', run_update(url_template, None), pages))
+            checks.append(report('cold', run_update(url_template, cache), pages))
+            checks.append(report('not-modified', run_update(url_template, cache), 0))
+
+        # 快取以網址為鍵，第二個伺服器沿用相同的埠號
+        port = urlsplit(url_template).port
+        with serve_fixtures(port, fixtures_dir=fixtures, validators=False) as url_template:
+            checks.append(report('fragment-hash', run_update(url_template, cache), 0))
+
+            page_2 = fixtures / 'search_page_2.html'
+            html = page_2.read_text(encoding='utf-8')
+            price = next(book['sale_price'] for book in http_scraper.extract_books_from_html(html)
+                         if book['sale_price'])
+            page_2.write_text(html.replace(f'{price}</b>', f'{price + 1}</b>', 1), encoding='utf-8')
+            result = run_update(url_template, cache)
+            checks.append(report('one-page-changed', result, 1) and result['updated'] == 1)
+
+        metrics.reset()
+        start = time.perf_counter()
+        result = write_pages(scraper.iter_scrape_pages(engine=scraper.ENGINE_CACHE, page_cache=cache,
+                                                       url_template=url_template))
+        result['seconds'] = time.perf_counter() - start
+        result['cache'] = cache_results()
+        checks.append(report('replay', result, pages))
+
+        html_bytes = sum(fixture.stat().st_size for fixture in fixtures.glob('search_page_*.html'))
+        print(f"\n快取大小：{cache.total_bytes():,} 位元組（{pages} 頁 {html_bytes:,} 位元組的 HTML 與書籍資料，壓縮後）")
+        cache.close()
+
+        # 上限為所有頁面壓縮後大小的一半，依序存入後應只保留最近存入的頁面
+        fixture_pages = [(fixture.name, fixture.read_text(encoding='utf-8'))
+                         for fixture in sorted(fixtures.glob('search_page_*.html'))]
+        with PageCache(None) as full:
+            for name, html in fixture_pages:
+                full.store(name, html)
+            limit = full.total_bytes() // 2
+        with PageCache(None, max_bytes=limit) as small:
+            for name, html in fixture_pages:
+                small.store(name, html)
+            kept = [name for name, _ in fixture_pages if small.load(name) is not None]
+            ok = small.total_bytes() <= limit and 0 < len(kept) < pages and kept[-1] == fixture_pages[-1][0]
+            print(f"[{'通過' if ok else '失敗'}] lru               上限 {limit:,} 位元組，"
+                  f"目前 {small.total_bytes():,} 位元組，保留 {kept}")
+        checks.append(ok)
+
+        database.close_connections()
+
+    failures = checks.count(False)
+    print(f"\n{'全部通過' if not failures else f'{failures} 項失敗'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+價格歷史的驗證與量測
+
+1. daily：以 insert_books 模擬每天更新一次書目（每天少數書籍價格變動），確認只有價格變動的書籍
+   新增 price_history 資料列，並與「每天每本書記一筆」的做法比較資料列數
+2. bulk：以 executemany 一次寫入多年份的合成價格歷史（每本書平均每 --interval 天變價一次），
+   比較資料庫大小與每天記一筆的估計大小
+3. 量測 get_price_history / get_price_on / get_price_range / get_price_drops 的延遲百分位數，
+   以 EXPLAIN QUERY PLAN 確認使用主鍵與 idx_price_history_changed_on（不掃描整個資料表），
+   並與 Python 計算的結果比對
+
+結果不符時結束碼為 1。
+
+使用方式：
+    python benchmarks/bench_price_history.py --books 20000 --years 5
+"""
+
+import argparse
+import bisect
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+from bench_search import make_books
+from run_suite import percentiles
+
+
+# 價格歷史：書籍 id -> 依日期排序的 (日期序數, 價格)
+History = Dict[int, List[Tuple[int, int]]]
+
+# (說明, 查詢, 參數, 查詢計畫中必須出現的字串)
+PLAN_CHECKS: List[Tuple[str, str, Any, List[str]]] = [
+    ('get_price_on',
+     'SELECT price FROM price_history WHERE book_id = ? AND changed_on <= ? ORDER BY changed_on DESC LIMIT 1',
+     (1, '2024-01-01'), ['SEARCH price_history USING PRIMARY KEY (book_id=? AND changed_on<?)']),
+    ('get_price_history',
+     'SELECT changed_on, price FROM price_history WHERE book_id = ? ORDER BY changed_on',
+     (1,), ['SEARCH price_history USING PRIMARY KEY (book_id=?)']),
+    ('get_price_drops', database.PRICE_DROPS_SQL,
+     {'start': '2024-01-01', 'end': '2024-01-31', 'limit': 20},
+     ['SEARCH price_history USING COVERING INDEX idx_price_history_changed_on (changed_on>? AND changed_on<?)',
+      'SEARCH h USING PRIMARY KEY (book_id=? AND changed_on<?)',
+      'SEARCH b USING INTEGER PRIMARY KEY (rowid=?)']),
+]
+
+
+def iso(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+def price_at(history: History, book_id: int, ordinal: int) -> Optional[int]:
+    """模型中某本書在某日的價格。"""
+    changes = history.get(book_id, [])
+    index = bisect.bisect_right(changes, (ordinal, float('inf'))) - 1
+    return changes[index][1] if index >= 0 else None
+
+
+def expected_drops(history: History, end: int, days: int, limit: int) -> List[Tuple[int, int, int]]:
+    """模型中期間內降價最多的書籍：[(id, 期初價格, 期末價格)]。"""
+    start = end - days
+    drops = []
+    for book_id, changes in history.items():
+        if not any(start < ordinal <= end for ordinal, _ in changes):
+            continue
+        old, new = price_at(history, book_id, start), price_at(history, book_id, end)
+        if old is not None and old > new:
+            drops.append((book_id, old, new))
+    drops.sort(key=lambda item: (item[2] - item[1], item[0]))
+    return drops[:limit]
+
+
+def check(name: str, ok: bool, detail: str = '') -> bool:
+    print(f"[{'通過' if ok else '失敗'}] {name}{'  ' + detail if detail else ''}")
+    return ok
+
+
+def simulate_daily(books: int, days: int, change_rate: float, seed: int) -> List[bool]:
+    """以 insert_books 模擬每天更新一次書目，回傳各項檢查結果。"""
+    rng = random.Random(seed)
+    catalogue = next(make_books(books, seed=seed))
+    first_day = date(2024, 1, 1).toordinal()
+    history: Dict[str, List[Tuple[int, int]]] = {}
+    seconds = {'changed': [], 'unchanged': []}
+    recorded = 0
+
+    for day in range(first_day, first_day + days):
+        changes = 0
+        if day > first_day and day % 7:  # 每週有一天沒有任何價格變動
+            for book in rng.sample(catalogue, int(books * change_rate)):
+                book['price'] = max(1, int(book['price'] * rng.uniform(0.7, 1.2)))
+                changes += 1
+        start = time.perf_counter()
+        result = database.insert_books(catalogue, changed_on=iso(day))
+        seconds['changed' if result['inserted'] or result['updated'] else 'unchanged'].append(
+            time.perf_counter() - start
+        )
+        recorded += result['price_changes']
+        for book in catalogue:
+            changes_of_book = history.setdefault(book['title'], [])
+            if not changes_of_book or changes_of_book[-1][1] != book['price']:
+                changes_of_book.append((day, book['price']))
+
+    rows = database.get_connection().execute('SELECT COUNT(*) FROM price_history').fetchone()[0]
+    expected_rows = sum(len(changes) for changes in history.values())
+    print(f"\n== daily：{books:,} 本書 × {days} 天 ==")
+    for kind, samples in seconds.items():
+        if samples:
+            stats = percentiles(samples)
+            print(f"  insert_books（{kind}）p50 {stats['p50'] * 1000:.2f} ms  p99 {stats['p99'] * 1000:.2f} ms")
+    checks = [
+        check('只記錄價格變動', rows == expected_rows == recorded,
+              f"{rows:,} 筆（預期 {expected_rows:,}，每天記一筆為 {books * days:,} 筆）"),
+    ]
+
+    sample = rng.sample(list(history), 50)
+    checks.append(check('get_price_history 與模型一致', all(
+        [(row['changed_on'], row['price']) for row in database.get_price_history(title)]
+        == [(iso(day), price) for day, price in history[title]]
+        for title in sample
+    )))
+    checks.append(check('get_price_on 與模型一致', all(
+        database.get_price_on(title, iso(day)) == (
+            next((price for changed, price in reversed(history[title]) if changed <= day), None)
+        )
+        for title in sample for day in (first_day - 1, first_day + days // 2, first_day + days)
+    )))
+    return checks
+
+
+def build_history(conn: sqlite3.Connection, books: int, years: int, interval: float,
+                  seed: int) -> Tuple[History, int, int]:
+    """
+    以 executemany 寫入合成書目與多年份的價格歷史。
+
+    回傳:
+        Tuple[History, int, int]: 價格歷史模型、第一天與最後一天的日期序數
+    """
+    rng = random.Random(seed)
+    end = date(2025, 12, 31).toordinal()
+    first = end - years * 365
+    for batch in make_books(books, seed=seed):
+        database.insert_books(batch, changed_on=iso(first))
+
+    history: History = {}
+    ids = [row[0] for row in conn.execute('SELECT id FROM llm_books ORDER BY id')]
+    for book_id in ids:
+        day = first
+        price = rng.randint(200, 1200)
+        changes = [(day, price)]
+        while True:
+            day += max(1, int(rng.expovariate(1 / interval)))
+            if day > end:
+                break
+            price = max(1, int(price * rng.uniform(0.75, 1.15)))
+            if price != changes[-1][1]:
+                changes.append((day, price))
+        history[book_id] = changes
+
+    start = time.perf_counter()
+    with database.transaction() as writer:
+        writer.execute('DELETE FROM price_history')
+        writer.executemany(
+            'INSERT INTO price_history (book_id, changed_on, price) VALUES (?, ?, ?)',
+            ((book_id, iso(day), price) for book_id, changes in history.items() for day, price in changes)
+        )
+        writer.executemany('UPDATE llm_books SET price = ? WHERE id = ?',
+                           ((changes[-1][1], book_id) for book_id, changes in history.items()))
+    rows = sum(len(changes) for changes in history.values())
+    print(f"\n== bulk：{books:,} 本書 × {years} 年，平均每 {interval:g} 天變價 ==")
+    print(f"  寫入 {rows:,} 筆價格歷史 {time.perf_counter() - start:.2f} 秒")
+    return history, first, end
+
+
+def table_bytes(conn: sqlite3.Connection, names: Tuple[str, ...]) -> int:
+    """以 dbstat 計算資料表與索引的大小；SQLite 未啟用 dbstat 時回傳 0。"""
+    placeholders = ', '.join('?' * len(names))
+    try:
+        return conn.execute(
+            f'SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN ({placeholders})', names
+        ).fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+
+def compare_sizes(conn: sqlite3.Connection, history: History, first: int, end: int, sample: int) -> None:
+    """比較只記錄變動與每天每本書記一筆的大小（後者以 sample 本書的實際大小推估）。"""
+    days = end - first + 1
+    size = table_bytes(conn, ('price_history', 'idx_price_history_changed_on'))
+    rows = sum(len(changes) for changes in history.values())
+
+    daily = sqlite3.connect(':memory:')
+    daily.execute('''
+        CREATE TABLE daily_prices (
+            book_id INTEGER NOT NULL, day TEXT NOT NULL, price INTEGER NOT NULL,
+            PRIMARY KEY (book_id, day)
+        ) WITHOUT ROWID
+    ''')
+    daily.execute('CREATE INDEX idx_daily_prices_day ON daily_prices (day, book_id)')
+    sample_ids = list(history)[:sample]
+    daily.executemany('INSERT INTO daily_prices VALUES (?, ?, ?)', (
+        (book_id, iso(day), price_at(history, book_id, day))
+        for book_id in sample_ids for day in range(first, end + 1)
+    ))
+    daily_size = table_bytes(daily, ('daily_prices', 'idx_daily_prices_day')) * len(history) // len(sample_ids)
+    daily.close()
+
+    print(f"  只記錄變動：{rows:,} 筆，{size / 1024 / 1024:,.1f} MB")
+    if daily_size:
+        print(f"  每天記一筆：{len(history) * days:,} 筆，約 {daily_size / 1024 / 1024:,.1f} MB"
+              f"（以 {len(sample_ids):,} 本書推估，{daily_size / max(size, 1):.0f} 倍）")
+
+
+def measure(name: str, func: Callable[[int], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    stats = percentiles(samples)
+    print(f"  {name:<18} p50 {stats['p50'] * 1000:7.3f} ms  p99 {stats['p99'] * 1000:7.3f} ms")
+    return stats
+
+
+def bench_queries(conn: sqlite3.Connection, history: History, first: int, end: int,
+                  repeat: int, seed: int) -> List[bool]:
+    """量測查詢延遲、檢查查詢計畫並與模型比對。"""
+    rng = random.Random(seed)
+    titles = dict(conn.execute('SELECT id, title FROM llm_books'))
+    ids = list(history)
+    picks = [(rng.choice(ids), rng.randint(first - 30, end)) for _ in range(repeat)]
+
+    print('\n  查詢延遲：')
+    measure('get_price_history', lambda i: database.get_price_history(titles[picks[i][0]]), repeat)
+    measure('get_price_on', lambda i: database.get_price_on(titles[picks[i][0]], iso(picks[i][1])), repeat)
+    measure('get_price_range', lambda i: database.get_price_range(titles[picks[i][0]]), repeat)
+    for days in (7, 30, 90):
+        measure(f'get_price_drops {days}d',
+                lambda i: database.get_price_drops(days, as_of=iso(picks[i][1])), max(1, repeat // 20))
+
+    checks = []
+    print()
+    for name, sql, params, required in PLAN_CHECKS:
+        plan = '\n'.join(row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+        checks.append(check(f'查詢計畫：{name}', all(item in plan for item in required), plan.replace('\n', ' | ')))
+
+    checks.append(check('get_price_on 與模型一致', all(
+        database.get_price_on(titles[book_id], iso(day)) == price_at(history, book_id, day)
+        for book_id, day in picks
+    )))
+    checks.append(check('get_price_range 與模型一致', all(
+        (lambda found, changes: found is not None
+         and (found['min_price'], found['max_price'], found['changes'])
+         == (min(p for _, p in changes), max(p for _, p in changes), len(changes))
+         )(database.get_price_range(titles[book_id]), history[book_id])
+        for book_id, _ in picks[:200]
+    )))
+    drops_ok = True
+    for days in (7, 30, 90):
+        for _, day in picks[:5]:
+            found = [(row['id'], row['old_price'], row['new_price'])
+                     for row in database.get_price_drops(days, limit=20, as_of=iso(day))]
+            drops_ok &= found == expected_drops(history, day, days, 20)
+    checks.append(check('get_price_drops 與模型一致', drops_ok))
+    return checks
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='價格歷史的驗證與量測')
+    parser.add_argument('--books', type=int, default=20_000, help='bulk 的書籍數')
+    parser.add_argument('--years', type=int, default=5, help='bulk 的年數')
+    parser.add_argument('--interval', type=float, default=30, help='每本書平均幾天變價一次')
+    parser.add_argument('--daily-books', type=int, default=2_000, help='daily 的書籍數')
+    parser.add_argument('--daily-days', type=int, default=60, help='daily 模擬的天數')
+    parser.add_argument('--change-rate', type=float, default=0.03, help='daily 每天變價的書籍比例')
+    parser.add_argument('--repeat', type=int, default=2_000, help='每種查詢的量測次數')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    checks = []
+    with tempfile.TemporaryDirectory() as workdir:
+        database.configure(os.path.join(workdir, 'daily.db'))
+        database.init_database()
+        checks += simulate_daily(args.daily_books, args.daily_days, args.change_rate, args.seed)
+
+        database.configure(os.path.join(workdir, 'bulk.db'))
+        database.init_database()
+        conn = database.get_connection()
+        history, first, end = build_history(conn, args.books, args.years, args.interval, args.seed)
+        conn.execute('ANALYZE')
+        compare_sizes(conn, history, first, end, sample=min(500, args.books))
+        checks += bench_queries(conn, history, first, end, args.repeat, args.seed)
+        database.close_connections()
+
+    failures = checks.count(False)
+    print(f"\n{'全部通過' if not failures else f'{failures} 項失敗'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
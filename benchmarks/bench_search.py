@@ -0,0 +1,146 @@
+"""
+書名／作者搜尋效能比較：LIKE 與 FTS5 trigram
+
+建立合成書目（預設 100 萬筆），對同一組關鍵字分別以
+LIKE '%keyword%'（全表掃描）與 database.search_by_title / search_by_author（FTS5 MATCH）查詢，
+輸出各自的 p50 / p95 延遲與結果筆數。FTS 量測時停用查詢結果快取，
+另外量測快取命中時的 p50。
+
+使用方式：
+    python benchmarks/bench_search.py --rows 1000000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+TOPICS = ['大型語言模型', 'LLM', '深度學習', 'Transformer', '生成式 AI', 'RAG', '提示工程',
+          '機器學習', '自然語言處理', 'GPT', '向量資料庫', '資料科學', 'Python', '雲端運算']
+SUFFIXES = ['實戰', '入門', '全攻略', '技術手冊', '應用開發', '原理與實作', '從零開始']
+AUTHORS = ['王小明', '李大華', '陳建宏', 'Sebastian Raschka', 'Jay Alammar', '張志強', '林怡君', 'Chip Huyen']
+
+# (欄位, 關鍵字)：包含英文、中文、常見與罕見詞，以及少於 3 字元而走 LIKE 的關鍵字
+QUERIES = [
+    ('title', 'LLM'),
+    ('title', 'GPT'),
+    ('title', '大型語言'),
+    ('title', '向量資料庫'),
+    ('title', '第 123456 版'),
+    ('title', '語言的'),
+    ('title', 'AI'),
+    ('title', '學習'),
+    ('author', 'Raschka'),
+    ('author', '陳建宏'),
+]
+
+
+# 合成書名與作者使用的常用字
+COMMON_CHARS = '的一是在人有我他這中大來上國個到說們為子和你地出道也時年得就那要下以生會自著去之過家學對可她裡後小麼心多天而能好都然沒日於起還發成事只作當想看文無開手十用主行方又如前所本見經頭面公同三已老從動兩長知民樣現分將外但身些與高意進把法此實回二理美點月明其種聲全工己話兒者向情部正名定女問力機給等幾很業最間新什打便位因重被走電四第門相次東政海口使教西再平真聽世氣信北少關並內加化由卻代軍產入先山五太水萬市眼體別處總才場師書比住員九笑性通目華報立馬命張活難神數件安表原車白應路期叫死常提感金何更反合放做系計或司利受光王果親界及今京務製解各任至清物台象記邊共風戰干接它許八特覺望直服毛林題建南度統色字請交愛讓認算論百吃義科怎元社術結六功指思非流每青管夫連遠資隊跟帶花快條院變聯言權往展該領傳近留紅治決周保達辦運武半候七必城父強步完革深區即求品士轉量空甚眾技輕程告江語英基'
+
+
+def make_books(count: int, seed: int = 42) -> Iterator[List[Dict[str, Any]]]:
+    """
+    分批產生合成書籍資料。
+
+    書名由隨機常用字組成，約 2% 的書名含有 TOPICS 中的主題詞，
+    約 3% 的書籍作者為 AUTHORS 中的作者，使查詢結果接近實際書目的選擇性。
+    """
+    rng = random.Random(seed)
+    names = [''.join(rng.sample(COMMON_CHARS, 3)) for _ in range(20_000)]
+    batch = []
+    for i in range(count):
+        words = ''.join(rng.sample(COMMON_CHARS, rng.randint(4, 10)))
+        if rng.random() < 0.02:
+            words = f'{rng.choice(TOPICS)}{words}'
+        author = rng.choice(AUTHORS) if rng.random() < 0.03 else rng.choice(names)
+        batch.append({
+            'title': f'{words}{rng.choice(SUFFIXES)} 第 {i} 版',
+            'author': author,
+            'price': rng.randint(200, 1200),
+            'link': f'https://www.books.com.tw/products/{i:010d}',
+        })
+        if len(batch) == 50_000:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def like_search(field: str, keyword: str) -> list:
+    """舊版查詢：LIKE '%keyword%' 全表掃描，依書名排序。"""
+    return database.get_connection().execute(f'''
+        SELECT title, author, price FROM llm_books
+        WHERE {field} LIKE ?
+        ORDER BY title
+    ''', (f'%{keyword}%',)).fetchall()
+
+
+def fts_search(field: str, keyword: str) -> list:
+    """目前的查詢：database.search_by_title / search_by_author。"""
+    if field == 'title':
+        return database.search_by_title(keyword)
+    return database.search_by_author(keyword)
+
+
+def measure(func: Callable[[str, str], list], field: str, keyword: str,
+            repeat: int) -> Dict[str, float]:
+    """重複查詢並回傳延遲百分位數（毫秒）與結果筆數。"""
+    latencies = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(func(field, keyword))
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies),
+        'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'rows': rows,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='LIKE 與 FTS5 搜尋效能比較')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database.configure(os.path.join(workdir, 'search.db'))
+        database.init_database()
+
+        start = time.perf_counter()
+        for batch in make_books(args.rows):
+            database.insert_books(batch)
+        print(f"建立 {args.rows:,} 筆合成書目：{time.perf_counter() - start:.1f} 秒\n")
+
+        print(f"{'欄位':<8}{'關鍵字':<14}{'LIKE p50':>10}{'FTS p50':>10}{'FTS p95':>10}"
+              f"{'快取 p50':>11}{'筆數':>9}{'加速':>8}")
+        for field, keyword in QUERIES:
+            like = measure(like_search, field, keyword, args.repeat)
+            database.configure_query_cache(max_size=0)
+            fts = measure(fts_search, field, keyword, args.repeat)
+            database.configure_query_cache(max_size=128)
+            cached = measure(fts_search, field, keyword, args.repeat + 1)
+            if like['rows'] != fts['rows']:
+                print(f"  警告：{keyword} 的結果筆數不一致（LIKE {like['rows']}，FTS {fts['rows']}）")
+            print(f"{field:<8}{keyword:<14}{like['p50']:>9.1f}ms{fts['p50']:>8.1f}ms"
+                  f"{fts['p95']:>8.1f}ms{cached['p50']:>9.3f}ms{fts['rows']:>9}"
+                  f"{like['p50'] / fts['p50']:>7.1f}x")
+        print(f"\n查詢結果快取統計：{database.get_query_cache_stats()}")
+
+        database.close_connections()
+
+
+if __name__ == '__main__':
+    main()
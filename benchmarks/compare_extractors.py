@@ -0,0 +1,70 @@
+"""
+比對兩種頁面解析模式的結果與耗時
+
+以 headless Chrome 開啟 fixtures/ 中保存的搜尋結果頁與作者區塊的各種寫法（author_markup.html），
+分別以 dom（逐一查詢 WebDriver 元素）與 html（一次取回 HTML）模式擷取，
+確認兩者回傳的書籍資料完全相同。需要 selenium 與 Chrome，為選用的比對；
+不需瀏覽器的擷取測試見 tests/test_html_extractor.py。
+
+使用方式：
+    python benchmarks/compare_extractors.py
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium import webdriver
+
+import scraper
+import selenium_scraper
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+
+def main() -> int:
+    """比對所有 fixture 頁面，回傳程式結束碼。"""
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+
+    driver = webdriver.Chrome(options=options)
+    failures = 0
+
+    try:
+        for fixture in sorted(FIXTURES_DIR.glob('search_page_*.html')) + [FIXTURES_DIR / 'author_markup.html']:
+            driver.get(fixture.as_uri())
+
+            start = time.perf_counter()
+            dom_books = selenium_scraper.extract_books_from_page(driver, scraper.PARSE_MODE_DOM)
+            dom_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            html_books = selenium_scraper.extract_books_from_page(driver, scraper.PARSE_MODE_HTML)
+            html_elapsed = time.perf_counter() - start
+
+            status = 'OK' if dom_books == html_books else 'MISMATCH'
+            if dom_books != html_books:
+                failures += 1
+                for dom_book, html_book in zip(dom_books, html_books):
+                    if dom_book != html_book:
+                        print(f"  dom : {dom_book}")
+                        print(f"  html: {html_book}")
+
+            print(f"{fixture.name}: {status} "
+                  f"({len(dom_books)} / {len(html_books)} 本, "
+                  f"dom {dom_elapsed * 1000:.1f} ms, html {html_elapsed * 1000:.1f} ms)")
+    finally:
+        driver.quit()
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+本機 fixture 伺服器
+
+以 HTTP 提供 fixtures/ 中保存的搜尋結果頁，讓 HTTP 爬蟲引擎可以離線測試。
+網址中的 /page/N/ 會對應到 fixtures/search_page_N.html（關鍵字有對應的子目錄 fixtures/<關鍵字>/ 時
+改用該目錄中的頁面，模擬不同關鍵字的搜尋結果），
+書籍詳細頁 /products/<商品編號> 對應到 fixtures/products/<商品編號>.html。
+回應帶有 ETag 與 Last-Modified，收到相符的條件式請求時回傳 304 Not Modified。
+
+使用方式：
+    python benchmarks/fixture_server.py --port 8000
+
+    python -c "import scraper; print(len(scraper.scrape_books(engine='http',
+        url_template='http://127.0.0.1:8000/search/query/cat/BKA/key/{keyword}/sort/1/page/{page}/v/0/')))"
+"""
+
+import argparse
+import hashlib
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# 與 http_scraper.SEARCH_URL_TEMPLATE 相同的路徑格式
+SEARCH_PATH_TEMPLATE = '/search/query/cat/BKA/key/{keyword}/sort/1/page/{page}/v/0/'
+
+# 與 enrichment.DETAIL_URL_TEMPLATE 相同的路徑格式
+DETAIL_PATH_TEMPLATE = '/products/{product_id}'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """依網址中的頁碼回傳對應的 fixture 頁面（HTTP/1.1 keep-alive）。"""
+
+    protocol_version = 'HTTP/1.1'
+
+    # fixture 目錄、是否提供 ETag / Last-Modified、每個回應的延遲秒數與指定路徑回應的錯誤狀態碼
+    # （serve_fixtures 會建立設定不同的子類別）
+    fixtures_dir = FIXTURES_DIR
+    validators = True
+    delay = 0.0
+    statuses: Dict[str, int] = {}
+
+    def do_GET(self) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+
+        status = self.statuses.get(self.path)
+        if status is not None:
+            self.send_error(status)
+            return
+
+        product = re.search(r'/products/(\w+)', self.path)
+        if product:
+            fixture = self.fixtures_dir / 'products' / f'{product.group(1)}.html'
+        else:
+            match = re.search(r'/page/(\d+)', self.path)
+            page = int(match.group(1)) if match else 1
+            keyword = re.search(r'/key/(\w+)/', self.path)
+            pages_dir = self.fixtures_dir
+            if keyword and (self.fixtures_dir / keyword.group(1)).is_dir():
+                pages_dir = self.fixtures_dir / keyword.group(1)
+            fixture = pages_dir / f'search_page_{page}.html'
+
+        if not fixture.is_file():
+            self.send_error(404)
+            return
+
+        body = fixture.read_bytes()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        last_modified = formatdate(fixture.stat().st_mtime, usegmt=True)
+        if self.validators and (self.headers.get('If-None-Match') == etag or (
+                self.headers.get('If-None-Match') is None
+                and self.headers.get('If-Modified-Since') == last_modified)):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if self.validators:
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@contextmanager
+def serve_fixtures(port: int = 0, fixtures_dir: Optional[Path] = None,
+                   validators: bool = True, delay: float = 0.0,
+                   statuses: Optional[Dict[str, int]] = None) -> Iterator[str]:
+    """
+    在背景執行緒啟動 fixture 伺服器。
+
+    參數:
+        port: 監聽埠號，0 表示由系統分配
+        fixtures_dir: 提供頁面的目錄，預設為 FIXTURES_DIR
+        validators: 是否提供 ETag / Last-Modified 並回應條件式請求
+        delay: 每個回應前等待的秒數（模擬網路延遲）
+        statuses: {網址路徑: 狀態碼}，這些路徑不提供頁面而回應指定的錯誤（例如已下架的 410、暫時性的 503）
+
+    回傳:
+        Iterator[str]: 搜尋網址樣板，可傳給 scraper.scrape_books / iter_scrape_pages 或 pipeline.run_pipeline 的 url_template
+        （詳細頁網址樣板為 detail_url_template(搜尋網址樣板)）
+    """
+    handler = type('ConfiguredFixtureHandler', (FixtureHandler,), {
+        'fixtures_dir': Path(fixtures_dir) if fixtures_dir is not None else FIXTURES_DIR,
+        'validators': validators,
+        'delay': delay,
+        'statuses': dict(statuses or {}),
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}{SEARCH_PATH_TEMPLATE}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def detail_url_template(url_template: str) -> str:
+    """
+    由 serve_fixtures() 的搜尋網址樣板取得同一個伺服器的詳細頁網址樣板。
+
+    參數:
+        url_template: serve_fixtures() 回傳的搜尋網址樣板
+
+    回傳:
+        str: 可直接傳給 enrichment 的詳細頁網址樣板
+    """
+    return url_template.replace(SEARCH_PATH_TEMPLATE, DETAIL_PATH_TEMPLATE)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='提供 fixture 搜尋結果頁的本機 HTTP 伺服器')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), FixtureHandler)
+    print(f"fixture 伺服器啟動：http://127.0.0.1:{args.port}{SEARCH_PATH_TEMPLATE}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
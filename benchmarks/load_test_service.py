@@ -0,0 +1,202 @@
+"""
+查詢服務負載測試
+
+建立合成書目的暫存資料庫，以子程序啟動 python app.py serve（與量測端不共用 GIL），
+在每個並行數下以 keep-alive 連線持續送出書名搜尋、作者搜尋與價格範圍查詢 --duration 秒，
+輸出每秒請求數、p50 / p99 延遲，以及 503（超過同時處理上限）、504（逾時）與其他錯誤的次數。
+查詢的價格範圍隨機產生，大部分請求不會命中查詢結果快取。
+
+使用方式：
+    python benchmarks/load_test_service.py --books 100000 --concurrency 1 2 4 8 16 32 64
+    python benchmarks/load_test_service.py --workers 8 --max-in-flight 16   # 觀察超過上限時的 503
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8080      # 量測已啟動的服務
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from typing import Any, Dict, List
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+from bench_search import AUTHORS, TOPICS, make_books
+from run_suite import percentiles
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def build_database(path: str, count: int) -> None:
+    database.configure(path)
+    database.init_database()
+    for batch in make_books(count):
+        database.insert_books(batch)
+    database.close_connections()
+
+
+def make_paths(count: int, seed: int = 7) -> List[str]:
+    """產生請求路徑：書名搜尋、作者搜尋、價格範圍與書名加價格範圍的條件查詢各約四分之一。"""
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        low = rng.randint(200, 1100)
+        kind = rng.randrange(4)
+        if kind == 0:
+            paths.append('/search/title?' + urlencode({'q': rng.choice(TOPICS), 'limit': 20}))
+        elif kind == 1:
+            paths.append('/search/author?' + urlencode({'q': rng.choice(AUTHORS), 'limit': 20}))
+        elif kind == 2:
+            paths.append('/books?' + urlencode({'min_price': low, 'max_price': low + 20, 'sort': 'price', 'limit': 20}))
+        else:
+            paths.append('/books?' + urlencode({'title': rng.choice(TOPICS), 'min_price': low,
+                                                'max_price': low + 200, 'sort': 'price', 'limit': 20}))
+    return paths
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"查詢服務啟動失敗（結束碼 {process.returncode}）")
+        try:
+            with urllib.request.urlopen(f'{base_url}/health', timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('等待查詢服務啟動逾時')
+
+
+async def client(host: str, port: int, paths: List[str], deadline: float, rng: random.Random,
+                 latencies: List[float], statuses: Counter) -> None:
+    """以一條 keep-alive 連線依序送出請求，直到 deadline。"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(f'GET {rng.choice(paths)} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('ascii'))
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[int(head[9:12])] += 1
+    except (ConnectionError, asyncio.IncompleteReadError):
+        statuses['connection_error'] += 1
+    finally:
+        writer.close()
+
+
+async def run_level(base_url: str, paths: List[str], concurrency: int, duration: float) -> Dict[str, Any]:
+    """以 concurrency 條連線同時送出請求 duration 秒。"""
+    url = urlsplit(base_url)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client(url.hostname, url.port, paths, deadline, random.Random(i), latencies, statuses)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / elapsed,
+        'ok': statuses[200],
+        'overloaded': statuses[503],
+        'timeouts': statuses[504],
+        'errors': sum(statuses.values()) - statuses[200] - statuses[503] - statuses[504],
+    }
+    if latencies:
+        latency = percentiles(latencies)
+        result['p50_ms'] = latency['p50'] * 1000
+        result['p99_ms'] = latency['p99'] * 1000
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='查詢服務負載測試')
+    parser.add_argument('--books', type=int, default=100_000, help='合成書目的書籍數')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64],
+                        help='依序量測的並行連線數')
+    parser.add_argument('--duration', type=float, default=3.0, help='每個並行數的量測秒數')
+    parser.add_argument('--workers', type=int, default=4, help='服務的工作執行緒數')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='服務同時處理的請求數上限')
+    parser.add_argument('--timeout', type=float, default=5.0, help='服務單一查詢的逾時秒數')
+    parser.add_argument('--url', help='量測已啟動的服務（不建立資料庫、不啟動服務）')
+    parser.add_argument('--output', help='將結果寫成 JSON 檔案')
+    args = parser.parse_args()
+
+    paths = make_paths(5000)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        base_url = args.url
+        if base_url is None:
+            db_path = os.path.join(workdir, 'books.db')
+            start = time.perf_counter()
+            build_database(db_path, args.books)
+            print(f"建立 {args.books} 筆書籍的資料庫：{time.perf_counter() - start:.1f} 秒")
+
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            process = subprocess.Popen(
+                [sys.executable, APP_PATH, 'serve', '--port', str(port), '--workers', str(args.workers),
+                 '--max-in-flight', str(args.max_in_flight), '--timeout', str(args.timeout)],
+                env=dict(os.environ, BOOKS_DB_PATH=db_path), cwd=workdir,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        try:
+            if process is not None:
+                wait_until_ready(base_url, process)
+            asyncio.run(run_level(base_url, paths, 4, 1.0))  # 暖機：建立工作執行緒的連線並載入頁面快取
+
+            print(f"\n{'並行數':>6} {'請求數':>8} {'請求/秒':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+                  f"{'503':>6} {'504':>6} {'錯誤':>5}")
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_level(base_url, paths, concurrency, args.duration))
+                results.append(result)
+                print(f"{concurrency:>9} {result['requests']:>11} {result['requests_per_second']:>12.0f} "
+                      f"{result.get('p50_ms', 0):>9.2f} {result.get('p99_ms', 0):>9.2f} "
+                      f"{result['overloaded']:>6} {result['timeouts']:>6} {result['errors']:>7}")
+
+            with urllib.request.urlopen(f'{base_url}/stats', timeout=5) as response:
+                cache = json.load(response)['query_cache']
+            lookups = cache['hits'] + cache['misses']
+            print(f"\n查詢結果快取命中率：{cache['hits'] / lookups:.0%}（{cache['hits']}/{lookups}）" if lookups else '')
+        finally:
+            if process is not None:
+                process.send_signal(signal.SIGINT)
+                process.wait(timeout=30)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'books': args.books, 'workers': args.workers, 'max_in_flight': args.max_in_flight,
+                       'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.output}")
+
+    return 1 if any(result['errors'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+離線效能量測套件
+
+以保存的搜尋結果頁（fixtures/）與合成書目量測爬蟲與資料庫的主要路徑，
+結果寫成 JSON，方便比較不同版本的效能：
+
+- scrape：以本機 fixture 伺服器重播搜尋結果頁，量測 HTTP 引擎的 pages/s 與 books/s
+- extract：直接解析 fixture 檔案，量測每頁的擷取時間
+- insert：各書目規模下 insert_books 的寫入速度（新增、重複寫入、10% 異動）
+- search：各書目規模下書名／作者查詢的延遲百分位數（停用查詢結果快取）
+
+使用方式：
+    python benchmarks/run_suite.py --sizes 10000 100000 --output results.json
+    python benchmarks/run_suite.py --baseline old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import http_scraper
+from html_extractor import extract_books_from_html
+from timing import PhaseTimer
+
+from bench_search import QUERIES, fts_search, make_books
+from fixture_server import FIXTURES_DIR, serve_fixtures
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# 與 baseline 比較時，變慢超過此比例即標示
+REGRESSION_THRESHOLD = 0.10
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """回傳樣本的 p50 / p95 / p99 與平均值。"""
+    ordered = sorted(samples)
+
+    def pick(ratio: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+    return {
+        'p50': statistics.median(ordered),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'mean': statistics.fmean(ordered),
+    }
+
+
+def bench_scrape(runs: int, max_workers: int) -> Dict[str, Any]:
+    """以本機伺服器重播搜尋結果頁，量測 HTTP 引擎的整體吞吐量。"""
+    pages = books = 0
+    elapsed = 0.0
+    timer = PhaseTimer()
+    with serve_fixtures() as url_template:
+        for _ in range(runs):
+            start = time.perf_counter()
+            for _, page_books in http_scraper.iter_pages_http(
+                url_template=url_template, max_workers=max_workers,
+                requests_per_second=0, timer=timer
+            ):
+                pages += 1
+                books += len(page_books)
+            elapsed += time.perf_counter() - start
+
+    return {
+        'runs': runs,
+        'pages': pages,
+        'books': books,
+        'seconds': elapsed,
+        'pages_per_second': pages / elapsed,
+        'books_per_second': books / elapsed,
+        'phases': timer.report()['phases'],
+    }
+
+
+def bench_extract(repeat: int) -> Dict[str, Any]:
+    """量測每個 fixture 頁面的 HTML 擷取時間（毫秒）。"""
+    results = {}
+    for fixture in sorted(FIXTURES_DIR.glob('search_page_*.html')):
+        html = fixture.read_text(encoding='utf-8')
+        samples = []
+        books = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            books = len(extract_books_from_html(html, 'https://search.books.com.tw/'))
+            samples.append((time.perf_counter() - start) * 1000)
+        results[fixture.name] = dict(percentiles(samples), books=books)
+    return results
+
+
+def timed(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_database(size: int, repeat: int, workdir: str) -> Dict[str, Any]:
+    """建立指定規模的書目，量測寫入速度與查詢延遲。"""
+    database.configure(os.path.join(workdir, f'suite_{size}.db'))
+    database.init_database()
+    database.configure_query_cache(max_size=0)
+
+    batches = list(make_books(size))
+    fresh = timed(lambda: [database.insert_books(batch) for batch in batches])
+    unchanged = timed(lambda: [database.insert_books(batch) for batch in batches])
+
+    changed_batches = []
+    for batch in batches:
+        changed_batches.append([dict(book, price=book['price'] + 1) if i % 10 == 0 else book
+                                for i, book in enumerate(batch)])
+    changed = timed(lambda: [database.insert_books(batch) for batch in changed_batches])
+
+    search = {}
+    for field, keyword in QUERIES:
+        samples = []
+        rows = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(fts_search(field, keyword))
+            samples.append((time.perf_counter() - start) * 1000)
+        search[f'{field}:{keyword}'] = dict(percentiles(samples), rows=rows)
+
+    all_samples = [value['p50'] for value in search.values()]
+    database.configure_query_cache(max_size=128)
+    database.close_connections()
+
+    return {
+        'insert': {
+            'fresh_rows_per_second': size / fresh,
+            'unchanged_rows_per_second': size / unchanged,
+            'changed_rows_per_second': size / changed,
+        },
+        'search': search,
+        'search_p50_ms': statistics.median(all_samples),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """記錄量測環境，方便比較不同機器或版本的結果。"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+
+
+def flatten(data: Any, prefix: str = '') -> Dict[str, float]:
+    """將巢狀結果攤平成 {'a.b.c': 數值}，用於與 baseline 比較。"""
+    if isinstance(data, dict):
+        flat = {}
+        for key, value in data.items():
+            flat.update(flatten(value, f'{prefix}.{key}' if prefix else str(key)))
+        return flat
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return {prefix: float(data)}
+    return {}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """輸出與 baseline 的差異；吞吐量（*_per_second）越大越好，其餘時間指標越小越好。"""
+    current = flatten({key: results[key] for key in ('scrape', 'extract', 'database')})
+    previous = flatten({key: baseline.get(key, {}) for key in ('scrape', 'extract', 'database')})
+
+    print(f"\n與 baseline（{baseline.get('environment', {}).get('commit', '?')}）比較：")
+    for key in sorted(current):
+        if key not in previous or not previous[key]:
+            continue
+        is_rate = key.endswith('_per_second')
+        is_latency = key.endswith(('p50', 'p95', 'p99', 'mean', '_ms'))
+        if not (is_rate or is_latency):
+            continue
+        ratio = current[key] / previous[key]
+        slower = ratio < 1 - REGRESSION_THRESHOLD if is_rate else ratio > 1 + REGRESSION_THRESHOLD
+        if slower:
+            print(f"  變慢  {key}: {previous[key]:.3f} → {current[key]:.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='離線效能量測套件')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--scrape-runs', type=int, default=10)
+    parser.add_argument('--max-workers', type=int, default=http_scraper.DEFAULT_MAX_WORKERS)
+    parser.add_argument('--extract-repeat', type=int, default=50)
+    parser.add_argument('--search-repeat', type=int, default=20)
+    parser.add_argument('--output', help='結果 JSON 路徑（預設寫入 benchmarks/results/）')
+    parser.add_argument('--baseline', help='用來比較的舊結果 JSON')
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {'environment': environment()}
+
+    print("量測 HTTP 爬蟲吞吐量...")
+    results['scrape'] = bench_scrape(args.scrape_runs, args.max_workers)
+    print(f"  {results['scrape']['pages_per_second']:.1f} pages/s，"
+          f"{results['scrape']['books_per_second']:.1f} books/s")
+
+    print("量測頁面擷取時間...")
+    results['extract'] = bench_extract(args.extract_repeat)
+    for name, stats in results['extract'].items():
+        print(f"  {name}: p50 {stats['p50']:.2f} ms（{stats['books']} 本）")
+
+    results['database'] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"量測 {size:,} 筆書目的寫入與查詢...")
+            stats = bench_database(size, args.search_repeat, workdir)
+            results['database'][str(size)] = stats
+            insert = stats['insert']
+            print(f"  寫入 {insert['fresh_rows_per_second']:,.0f} rows/s（新增），"
+                  f"{insert['unchanged_rows_per_second']:,.0f} rows/s（未變動）；"
+                  f"查詢 p50 中位數 {stats['search_p50_ms']:.2f} ms")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'suite-{stamp}.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n結果已寫入 {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+瀏覽器設定模組
+
+建立 Selenium 使用的 headless Chrome 設定。精簡模式（lean）只保留擷取書籍所需的內容：
+- 不載入圖片
+- 以 CDP Network.setBlockedURLs 封鎖廣告、追蹤與字型等第三方資源
+- 頁面載入策略為 eager（DOMContentLoaded 後即返回，之後以明確條件等待結果區塊）
+- 使用跨執行保留的磁碟快取目錄，重複載入的 CSS / JS 直接從快取讀取
+
+頁面本身的 CSS 不封鎖，以免影響「元素可點擊」等依版面判斷的等待條件。
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+from selenium import webdriver
+
+import metrics
+
+
+# 是否預設使用精簡模式
+LEAN_BROWSER = True
+
+# 磁碟快取目錄，可用環境變數 BROWSER_CACHE_DIR 指定
+BROWSER_CACHE_DIR = os.environ.get(
+    'BROWSER_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'books_scraper', 'chrome')
+)
+
+# 磁碟快取大小上限（位元組）
+BROWSER_CACHE_SIZE = 200 * 1024 * 1024
+
+# 精簡模式封鎖的網址樣式（Network.setBlockedURLs 支援 * 萬用字元）
+BLOCKED_URL_PATTERNS = [
+    # 廣告與追蹤
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*googleadservices.com*',
+    '*googletagmanager.com*',
+    '*googletagservices.com*',
+    '*google-analytics.com*',
+    '*analytics.google.com*',
+    '*connect.facebook.net*',
+    '*facebook.com/tr*',
+    '*criteo.com*',
+    '*criteo.net*',
+    '*scorecardresearch.com*',
+    '*hotjar.com*',
+    '*clarity.ms*',
+    '*adsrvr.org*',
+    '*yahoo.com.tw/ads*',
+    '*ad.books.com.tw*',
+    # 圖片與字型
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    # 影音
+    '*.mp4*', '*.webm*',
+]
+
+# 同時存在的瀏覽器各用一個快取子目錄（Chrome 不支援多個程序共用同一個快取目錄）
+_cache_slots: Set[int] = set()
+_cache_slots_lock = threading.Lock()
+
+
+def create_driver(lean: bool = LEAN_BROWSER, cache_dir: str = BROWSER_CACHE_DIR,
+                  log_network: bool = False) -> webdriver.Chrome:
+    """
+    建立 headless Chrome WebDriver。
+
+    參數:
+        lean: 是否使用精簡模式
+        cache_dir: 精簡模式的磁碟快取目錄
+        log_network: 是否記錄網路事件（供 network_transfer_bytes 統計傳輸量）
+
+    回傳:
+        webdriver.Chrome: WebDriver 實例
+    """
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')  # 無頭模式
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')
+    if log_network:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    if not lean:
+        return _count_commands(webdriver.Chrome(options=options))
+
+    options.page_load_strategy = 'eager'
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+    })
+
+    slot = _claim_cache_slot()
+    slot_dir = os.path.join(cache_dir, f'slot-{slot}')
+    try:
+        os.makedirs(slot_dir, exist_ok=True)
+        options.add_argument(f'--disk-cache-dir={slot_dir}')
+        options.add_argument(f'--disk-cache-size={BROWSER_CACHE_SIZE}')
+        driver = webdriver.Chrome(options=options)
+    except BaseException:
+        _release_cache_slot(slot)
+        raise
+
+    quit_driver = driver.quit
+
+    def quit() -> None:
+        try:
+            quit_driver()
+        finally:
+            _release_cache_slot(slot)
+
+    driver.quit = quit
+
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        print(f"無法設定網址封鎖，改為只停用圖片：{e}")
+
+    return _count_commands(driver)
+
+
+def _count_commands(driver: webdriver.Chrome) -> webdriver.Chrome:
+    """
+    讓 WebDriver 發出的每個指令都記入 metrics 的 webdriver_commands_total。
+
+    WebElement 的操作也經由 driver.execute 發出，因此一併計入。
+    """
+    execute = driver.execute
+
+    def counted_execute(driver_command: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        metrics.inc('webdriver_commands_total', command=driver_command)
+        return execute(driver_command, params)
+
+    driver.execute = counted_execute
+    return driver
+
+
+def network_transfer_bytes(driver: Any) -> int:
+    """
+    統計上次呼叫後瀏覽器透過網路接收的位元組數（含標頭，不含被封鎖與快取命中的請求）。
+
+    以 Chrome performance log 中 Network.loadingFinished 事件的 encodedDataLength 加總；
+    讀取後記錄即被清空，因此每次呼叫回傳的是兩次呼叫之間的傳輸量。
+    建立 WebDriver 時需指定 log_network=True。
+
+    參數:
+        driver: WebDriver 實例
+
+    回傳:
+        int: 傳輸位元組數
+    """
+    total = 0
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        if message.get('method') == 'Network.loadingFinished':
+            total += int(message['params'].get('encodedDataLength', 0))
+    return total
+
+
+def _claim_cache_slot() -> int:
+    """取得未被其他瀏覽器使用的最小快取子目錄編號。"""
+    with _cache_slots_lock:
+        slot = 0
+        while slot in _cache_slots:
+            slot += 1
+        _cache_slots.add(slot)
+        return slot
+
+
+def _release_cache_slot(slot: int) -> None:
+    with _cache_slots_lock:
+        _cache_slots.discard(slot)
@@ -2,139 +2,985 @@
 資料庫管理模組
 """
 
+import os
 import sqlite3
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import metrics
+import migrations
+from field_parser import parse_product_id
+from migrations import FTS_TABLE
+from query_cache import QueryCache
+
+
+# 資料庫檔案路徑，可用環境變數 BOOKS_DB_PATH 或 configure() 指定
+DB_PATH = os.environ.get('BOOKS_DB_PATH', 'books.db')
+
+# 是否以唯讀模式（mode=ro URI）開啟連線，由 configure() 指定；唯讀連線無法寫入，也不會建立資料庫
+READ_ONLY = False
+
+# 每條連線建立時套用的 PRAGMA 設定
+CONNECTION_PRAGMAS = [
+    ('journal_mode', 'WAL'),        # 寫入時不阻擋讀取
+    ('synchronous', 'NORMAL'),      # WAL 模式下只在 checkpoint 時 fsync
+    ('cache_size', -16000),         # 頁面快取約 16 MB
+    ('mmap_size', 64 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),         # 等待寫入鎖最多 5 秒
+    ('foreign_keys', 'ON'),         # 刪除書籍時一併刪除 book_keywords 的對應
+]
+
+# 唯讀連線套用的 PRAGMA 設定（journal_mode 等寫入相關的設定由寫入端決定）
+READ_ONLY_PRAGMAS = [
+    ('cache_size', -16000),
+    ('mmap_size', 64 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),
+    ('query_only', 'ON'),
+]
+
+# 書名已存在時，只在欄位實際變動時更新（未變動的資料列不計入 changes）；
+# 連結以商品編號比較：搜尋結果的連結帶有排名參數（?loc=P_0005_001），前面多一本書時後面每本書的連結都會改變，
+# 只有排名改變的書籍不視為變動（連結維持第一次寫入的值，直到其他欄位變動時才更新）。
+# 作者或商品編號變動時清除 enriched_at，讓書籍詳細頁重新擷取（價格變動不影響詳細資料）
+UPSERT_BOOK_SQL = '''
+    INSERT INTO llm_books (title, author, price, link, product_id)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(title) DO UPDATE SET
+        author = excluded.author,
+        price = excluded.price,
+        link = excluded.link,
+        product_id = excluded.product_id,
+        enriched_at = CASE
+            WHEN llm_books.author IS NOT excluded.author OR llm_books.product_id IS NOT excluded.product_id
+            THEN NULL ELSE llm_books.enriched_at
+        END
+    WHERE llm_books.author IS NOT excluded.author
+       OR llm_books.price IS NOT excluded.price
+       OR llm_books.product_id IS NOT excluded.product_id
+'''
+
+# 記錄搜尋到某本書的關鍵字（同一本書、同一關鍵字只記錄一次）
+INSERT_BOOK_KEYWORD_SQL = '''
+    INSERT OR IGNORE INTO book_keywords (book_id, keyword)
+    SELECT id, ? FROM llm_books WHERE title = ?
+'''
+
+# 書籍目前的價格與最近一筆價格歷史不同時記錄一筆（同一天再次變動時改寫當天的價格）；
+# 價格 0 表示無法解析價格（field_parser），不是實際的價格變動，不記錄
+RECORD_PRICE_SQL = '''
+    INSERT INTO price_history (book_id, changed_on, price)
+    SELECT b.id, ?, b.price FROM llm_books b
+    WHERE b.title = ? AND b.price > 0
+      AND b.price IS NOT (
+          SELECT h.price FROM price_history h
+          WHERE h.book_id = b.id ORDER BY h.changed_on DESC LIMIT 1
+      )
+    ON CONFLICT(book_id, changed_on) DO UPDATE SET price = excluded.price
+'''
+
+# 書籍的價格變動紀錄：以書名的唯一索引取得 id，再以 price_history 的主鍵 (book_id, changed_on) 依日期取得
+PRICE_HISTORY_SQL = '''
+    SELECT h.changed_on, h.price FROM price_history h
+    WHERE h.book_id = (SELECT id FROM llm_books WHERE title = ?)
+    ORDER BY h.changed_on
+'''
+
+# 書籍在指定日期的價格：以主鍵從該日往前找最近一次變動
+PRICE_ON_SQL = '''
+    SELECT h.price FROM price_history h
+    WHERE h.book_id = (SELECT id FROM llm_books WHERE title = ?) AND h.changed_on <= ?
+    ORDER BY h.changed_on DESC LIMIT 1
+'''
+
+# 期間 (:start, :end] 內降價的書籍：以 changed_on 索引找出期間內有變動的書籍（統計資訊可能讓查詢規劃器
+# 改為逐一掃描每本書的主鍵，因此指定索引），再以主鍵取得期初與期末的價格；
+# prices 以 MATERIALIZED（SQLite 3.35+）只計算一次，避免篩選與排序時重複執行子查詢
+PRICE_DROPS_SQL = '''
+    WITH changed AS (
+        SELECT DISTINCT book_id FROM price_history INDEXED BY idx_price_history_changed_on
+        WHERE changed_on > :start AND changed_on <= :end
+    ), prices AS MATERIALIZED (
+        SELECT c.book_id,
+               (SELECT h.price FROM price_history h
+                WHERE h.book_id = c.book_id AND h.changed_on <= :start
+                ORDER BY h.changed_on DESC LIMIT 1) AS old_price,
+               (SELECT h.price FROM price_history h
+                WHERE h.book_id = c.book_id AND h.changed_on <= :end
+                ORDER BY h.changed_on DESC LIMIT 1) AS new_price
+        FROM changed c
+    )
+    SELECT b.id, b.title, b.author, b.link, p.old_price, p.new_price,
+           p.old_price - p.new_price AS price_drop,
+           ROUND(100.0 * (p.old_price - p.new_price) / p.old_price, 1) AS drop_percent
+    FROM prices p JOIN llm_books b ON b.id = p.book_id
+    WHERE p.old_price > p.new_price
+    ORDER BY price_drop DESC, b.id
+    LIMIT :limit
+'''
+
+# 寫回書籍詳細資料；擷取期間作者或商品編號已變動（enriched_at 被清除且編號不同）時不寫入
+UPDATE_BOOK_DETAILS_SQL = '''
+    UPDATE llm_books SET
+        isbn = :isbn,
+        publisher = :publisher,
+        publish_date = :publish_date,
+        pages = :pages,
+        enriched_at = :enriched_at
+    WHERE id = :id AND product_id IS :product_id AND author IS :author
+'''
+
+# 單一 SQL 敘述中 IN (...) 的參數數量上限
+SQL_BATCH_SIZE = 500
+
+# 查詢字串至少需 3 個字元才使用全文檢索索引（trigram）
+TRIGRAM_MIN_LENGTH = 3
+
+# query_books 可用的排序鍵與對應欄位；recency 依寫入順序（id 遞增，搭配 descending=True 為最新在前）
+SORT_COLUMNS = {
+    'title': 'title',
+    'author': 'author',
+    'price': 'price',
+    'recency': 'id',
+}
+
+# iter_books 每次向資料庫取回的筆數
+ITER_BATCH_SIZE = 500
+
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_generation = 0  # 每次 close_connections() 遞增，讓各執行緒重新建立連線
+_fts_ready: Dict[str, bool] = {}  # 各資料庫路徑的全文檢索索引是否已完成
+
+# 書名／作者查詢結果快取，資料庫有寫入時自動作廢
+_query_cache = QueryCache()
+
+
+def configure(db_path: str, read_only: bool = False) -> None:
+    """
+    設定資料庫檔案路徑。
+
+    已開啟的連線會全部關閉，之後的操作改用新的資料庫。
+
+    參數:
+        db_path: 資料庫檔案路徑
+        read_only: 是否以唯讀模式開啟連線（資料庫須已存在且結構為最新版本，init_database() 與寫入會失敗）
+    """
+    global DB_PATH, READ_ONLY
+    close_connections()
+    DB_PATH = db_path
+    READ_ONLY = read_only
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    取得目前執行緒的資料庫連線。
+
+    每個執行緒保留一條長期連線並重複使用，避免每次查詢都重新建立連線與套用設定。
+    連線為 autocommit 模式，寫入請使用 transaction()；configure(read_only=True) 後改以唯讀模式開啟。
+
+    回傳:
+        sqlite3.Connection: 資料庫連線（row_factory 為 sqlite3.Row）
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.generation == _generation:
+        return conn
+
+    if READ_ONLY:
+        conn = sqlite3.connect(f'{Path(DB_PATH).resolve().as_uri()}?mode=ro', uri=True,
+                               isolation_level=None, check_same_thread=False)
+        pragmas = READ_ONLY_PRAGMAS
+    else:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+        pragmas = CONNECTION_PRAGMAS
+    conn.row_factory = sqlite3.Row
+    for name, value in pragmas:
+        conn.execute(f'PRAGMA {name} = {value}')
+
+    with _connections_lock:
+        _connections.append(conn)
+        _local.generation = _generation
+    _local.conn = conn
+    _local.data_version = None
+    return conn
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    在明確的交易中執行寫入。
+
+    以 BEGIN IMMEDIATE 開始交易，正常結束時提交並作廢查詢結果快取，發生例外時回復。
+    若目前執行緒已在交易中，則直接併入外層交易。
+
+    回傳:
+        Iterator[sqlite3.Connection]: 目前執行緒的資料庫連線
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    else:
+        conn.execute('COMMIT')
+        _query_cache.invalidate()
+
+
+def close_connections() -> None:
+    """關閉所有執行緒開啟的資料庫連線（程式結束或切換資料庫時呼叫）。"""
+    global _generation
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+        _generation += 1
+    _query_cache.invalidate()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
 
 
 def init_database() -> None:
     """
-    初始化資料庫，建立 llm_books 資料表。
-    
-    若資料表已存在則不會重複建立。
-    資料表結構：
-    - id: INTEGER (主鍵，自動遞增)
-    - title: TEXT (不可為空，唯一)
-    - author: TEXT
-    - price: INTEGER
-    - link: TEXT
-    """
-    try:
-        with sqlite3.connect('books.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS llm_books (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL UNIQUE,
-                    author TEXT,
-                    price INTEGER,
-                    link TEXT
-                )
-            ''')
-            conn.commit()
-    except sqlite3.Error as e:
+    初始化資料庫：依 PRAGMA user_version 套用尚未套用的結構遷移（見 migrations.MIGRATIONS）。
+    
+    已是最新版本時只讀取一次版本號。建立的結構：
+    - llm_books 資料表：id（主鍵，自動遞增）、title（不可為空，唯一）、author、price、link，
+      並以 author 與 price 索引供 query_books 的排序、價格範圍與分頁使用
+    - scrape_state 資料表（key / value）：保存爬蟲狀態，例如上次完整爬取的時間
+    - book_keywords 關聯表（book_id, keyword）：記錄每本書被哪些搜尋關鍵字找到
+    - llm_books_fts 全文檢索索引（FTS5 trigram），以觸發器與 llm_books 保持同步；
+      既有資料分段回填，回填完成前與 SQLite 不支援 FTS5 trigram 時，搜尋改用 LIKE 比對
+    
+    例外:
+        sqlite3.Error: 遷移失敗
+        RuntimeError: 資料庫結構版本比程式支援的版本新
+    """
+    try:
+        conn = get_connection()
+        migrations.migrate(conn)
+        _fts_ready[DB_PATH] = migrations.has_table(conn, FTS_TABLE)
+        _query_cache.invalidate()
+    except (sqlite3.Error, RuntimeError) as e:
         print(f"資料庫初始化錯誤：{e}")
         raise
 
 
-def insert_books(books: List[Dict[str, Any]]) -> int:
+def insert_books(books: List[Dict[str, Any]], changed_on: Optional[str] = None) -> Dict[str, int]:
     """
-    批量插入書籍資料到資料庫。
+    批量寫入書籍資料到資料庫。
+    
+    在單一交易中以 executemany 執行 UPSERT（ON CONFLICT(title) DO UPDATE），
+    書名已存在時只有作者、價格或商品編號（由連結取得）有變動的資料列才會被更新；
+    連結中只有排名參數不同時不視為變動。
+    同一批次中書名重複時，以最後一筆為準。
+    
+    新增筆數以寫入前的最大 id 計算（只掃描新增的資料列），
+    不需要在寫入前後對整個資料表執行 COUNT(*)。
+    
+    書籍含有 keywords 欄位時，同一交易中一併寫入 book_keywords 關聯表。
     
-    使用 INSERT OR IGNORE 語法，若書名已存在則自動忽略。
+    有資料列新增或更新時，同一交易中將價格與最近一筆紀錄不同的書籍寫入 price_history
+    （只記錄變動，價格不變的日子不新增資料列；價格為 0 表示無法解析，不記錄）；
+    整批都未變動時不查詢價格歷史。
     
     參數:
-        books: 書籍資料列表，每個元素為字典，包含 title, author, price, link
+        books: 書籍資料列表，每個元素為字典，包含 title, author, price, link，
+            以及選用的 keywords（搜尋到此書的關鍵字列表）
+        changed_on: 價格歷史的日期（YYYY-MM-DD），預設為今天
     
     回傳:
-        int: 成功新增的書籍數量
+        Dict[str, int]: 寫入結果，包含 inserted（新增）、updated（更新）、unchanged（未變動）筆數，
+        以及 price_changes（寫入價格歷史的筆數）
     """
+    result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'price_changes': 0}
     if not books:
-        return 0
+        return result
+    
+    rows = {}
+    keyword_pairs = {}
+    for book in books:
+        rows[book['title']] = (book['title'], book['author'], book['price'], book['link'],
+                               parse_product_id(book['link']))
+        for keyword in book.get('keywords', ()):
+            keyword_pairs[(keyword, book['title'])] = None
     
+    start = time.perf_counter()
     try:
-        with sqlite3.connect('books.db') as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) FROM llm_books')
-            count_before = cursor.fetchone()[0]
-            
-            for book in books:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO llm_books (title, author, price, link)
-                    VALUES (?, ?, ?, ?)
-                ''', (book['title'], book['author'], book['price'], book['link']))
+        with transaction() as conn:
+            max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM llm_books').fetchone()[0]
             
-            conn.commit()
+            changed = conn.executemany(UPSERT_BOOK_SQL, rows.values()).rowcount
             
-            cursor.execute('SELECT COUNT(*) FROM llm_books')
-            count_after = cursor.fetchone()[0]
+            inserted = conn.execute(
+                'SELECT COUNT(*) FROM llm_books WHERE id > ?', (max_id,)
+            ).fetchone()[0]
             
-            inserted_count = count_after - count_before
-            
-            return inserted_count
+            if changed:
+                day = changed_on or date.today().isoformat()
+                result['price_changes'] = conn.executemany(
+                    RECORD_PRICE_SQL, ((day, title) for title in rows)
+                ).rowcount
             
+            if keyword_pairs:
+                conn.executemany(INSERT_BOOK_KEYWORD_SQL, keyword_pairs)
+        
+        result['inserted'] = inserted
+        result['updated'] = changed - inserted
+        result['unchanged'] = len(rows) - changed
+        
+        metrics.observe('db_write_seconds', time.perf_counter() - start, operation='insert_books')
+        return result
+        
     except sqlite3.Error as e:
         print(f"資料插入錯誤：{e}")
         raise
 
 
-def search_by_title(keyword: str) -> List[sqlite3.Row]:
+def add_book_keywords(pairs: List[Tuple[str, str]]) -> None:
     """
-    依書名關鍵字搜尋書籍（模糊比對）。
+    記錄已存在書籍的搜尋關鍵字（已記錄過的組合會被略過）。
     
     參數:
-        keyword: 搜尋關鍵字
+        pairs: (書名, 關鍵字) 的列表
+    """
+    if not pairs:
+        return
+    
+    try:
+        with transaction() as conn:
+            conn.executemany(INSERT_BOOK_KEYWORD_SQL, {(keyword, title): None for title, keyword in pairs})
+        
+    except sqlite3.Error as e:
+        print(f"資料寫入錯誤：{e}")
+        raise
+
+
+def get_book_keywords(title: str) -> List[str]:
+    """
+    取得搜尋到指定書籍的所有關鍵字。
+    
+    參數:
+        title: 書名
     
     回傳:
-        List[sqlite3.Row]: 符合條件的書籍列表
+        List[str]: 關鍵字列表（依字母順序）
     """
     try:
-        with sqlite3.connect('books.db') as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT title, author, price FROM llm_books
-                WHERE title LIKE ?
-                ORDER BY title
-            ''', (f'%{keyword}%',))
-            
-            results = cursor.fetchall()
-            return results
-            
+        return [row['keyword'] for row in get_connection().execute('''
+            SELECT k.keyword FROM book_keywords k
+            JOIN llm_books b ON b.id = k.book_id
+            WHERE b.title = ?
+            ORDER BY k.keyword
+        ''', (title,))]
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def count_new_or_changed(books: List[Dict[str, Any]]) -> int:
+    """
+    計算一批書籍中，資料庫尚未收錄或作者、價格、商品編號有變動的數量。
+    
+    以 title 的 UNIQUE 索引分批查詢（IN (...)），不逐筆查詢。
+    連結與 insert_books 相同以商品編號比較，只有排名參數（?loc=...）不同的書籍不計入。
+    
+    參數:
+        books: 書籍資料列表，每個元素為字典，包含 title, author, price, link
+    
+    回傳:
+        int: 新書或有變動的書籍數量
+    """
+    if not books:
+        return 0
+    
+    rows = {book['title']: (book['author'], book['price'], parse_product_id(book['link'])) for book in books}
+    titles = list(rows)
+    
+    try:
+        conn = get_connection()
+        unchanged = 0
+        for start in range(0, len(titles), SQL_BATCH_SIZE):
+            chunk = titles[start:start + SQL_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in conn.execute(
+                f'SELECT title, author, price, product_id FROM llm_books WHERE title IN ({placeholders})', chunk
+            ):
+                if rows[row['title']] == (row['author'], row['price'], row['product_id']):
+                    unchanged += 1
+        
+        return len(rows) - unchanged
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def get_price_history(title: str) -> List[sqlite3.Row]:
+    """
+    取得書籍的價格變動紀錄。
+    
+    參數:
+        title: 書名
+    
+    回傳:
+        List[sqlite3.Row]: 依日期排序，每筆包含 changed_on（YYYY-MM-DD）與 price
+    """
+    try:
+        return get_connection().execute(PRICE_HISTORY_SQL, (title,)).fetchall()
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def get_price_on(title: str, day: str) -> Optional[int]:
+    """
+    取得書籍在指定日期的價格（該日或之前最近一次變動後的價格）。
+    
+    參數:
+        title: 書名
+        day: 日期（YYYY-MM-DD）
+    
+    回傳:
+        Optional[int]: 價格；書籍不存在或該日之前沒有價格紀錄時回傳 None
+    """
+    try:
+        row = get_connection().execute(PRICE_ON_SQL, (title, day)).fetchone()
+        return row['price'] if row else None
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def get_price_range(title: str) -> Optional[Dict[str, Any]]:
+    """
+    取得書籍歷來的最低價、最高價與變動次數。
+    
+    參數:
+        title: 書名
+    
+    回傳:
+        Optional[Dict[str, Any]]: 包含 min_price, max_price, first_seen, last_changed（YYYY-MM-DD）
+        與 changes（價格紀錄筆數）；沒有價格紀錄時回傳 None
+    """
+    try:
+        row = get_connection().execute('''
+            SELECT MIN(h.price) AS min_price, MAX(h.price) AS max_price,
+                   MIN(h.changed_on) AS first_seen, MAX(h.changed_on) AS last_changed,
+                   COUNT(*) AS changes
+            FROM price_history h
+            WHERE h.book_id = (SELECT id FROM llm_books WHERE title = ?)
+        ''', (title,)).fetchone()
+        return dict(row) if row['changes'] else None
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def get_price_drops(days: int = 30, limit: int = 20, as_of: Optional[str] = None) -> List[sqlite3.Row]:
+    """
+    找出最近 days 天內降價最多的書籍。
+    
+    以 changed_on 索引找出期間內有價格變動的書籍，再以主鍵取得每本書期初與期末的價格，
+    不需掃描整個價格歷史。期初之後才收錄的書籍沒有期初價格，不列入。
+    
+    參數:
+        days: 期間天數
+        limit: 最多回傳的筆數
+        as_of: 期末日期（YYYY-MM-DD），預設為今天
+    
+    回傳:
+        List[sqlite3.Row]: 依降價金額由大到小排序，每筆包含 id, title, author, link,
+        old_price（期初價格）, new_price（期末價格）, price_drop 與 drop_percent
+    """
+    end = as_of or date.today().isoformat()
+    start = (date.fromisoformat(end) - timedelta(days=days)).isoformat()
+    try:
+        return get_connection().execute(
+            PRICE_DROPS_SQL, {'start': start, 'end': end, 'limit': limit}
+        ).fetchall()
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def get_books_to_enrich(after_id: int = 0, limit: int = 100, force: bool = False) -> List[sqlite3.Row]:
+    """
+    取得需要擷取詳細頁的書籍（依 id 遞增，以 after_id 分批取得）。
+    
+    未擷取過、或作者與商品編號在擷取後變動的書籍 enriched_at 為 NULL，
+    以部分索引 idx_llm_books_unenriched 取得，不需掃描整個資料表。
+    
+    參數:
+        after_id: 只取得 id 大於此值的書籍
+        limit: 最多回傳筆數
+        force: 是否包含已擷取過的書籍（全部重新擷取）
+    
+    回傳:
+        List[sqlite3.Row]: 書籍的 id, title, author, link, product_id
+    """
+    condition = '' if force else 'enriched_at IS NULL AND '
+    try:
+        return get_connection().execute(f'''
+            SELECT id, title, author, link, product_id FROM llm_books
+            WHERE {condition}id > ?
+            ORDER BY id LIMIT ?
+        ''', (after_id, limit)).fetchall()
+        
     except sqlite3.Error as e:
         print(f"查詢錯誤：{e}")
         raise
 
 
+def count_books_to_enrich(force: bool = False) -> int:
+    """
+    計算需要擷取詳細頁的書籍數量。
+    
+    參數:
+        force: 是否包含已擷取過的書籍
+    
+    回傳:
+        int: 書籍數量
+    """
+    condition = '' if force else ' WHERE enriched_at IS NULL'
+    try:
+        return get_connection().execute(f'SELECT COUNT(*) FROM llm_books{condition}').fetchone()[0]
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def update_book_details(details: List[Dict[str, Any]]) -> int:
+    """
+    在單一交易中以 executemany 批次寫回書籍詳細資料，並記錄擷取時間（enriched_at）。
+    
+    只在書籍的作者與商品編號仍與擷取時相同時寫入；擷取期間書目已變動的書籍維持待擷取。
+    
+    參數:
+        details: 詳細資料列表，每個元素為字典，包含 id, author, product_id（取得書籍時的值）
+            與 isbn, publisher, publish_date, pages（找不到的欄位為 None）
+    
+    回傳:
+        int: 實際寫入的書籍數
+    """
+    if not details:
+        return 0
+    
+    enriched_at = datetime.now().isoformat(timespec='seconds')
+    start = time.perf_counter()
+    try:
+        with transaction() as conn:
+            written = conn.executemany(
+                UPDATE_BOOK_DETAILS_SQL, [dict(detail, enriched_at=enriched_at) for detail in details]
+            ).rowcount
+        
+        metrics.observe('db_write_seconds', time.perf_counter() - start, operation='update_book_details')
+        return written
+        
+    except sqlite3.Error as e:
+        print(f"資料寫入錯誤：{e}")
+        raise
+
+
+def get_state(key: str) -> Optional[str]:
+    """
+    讀取爬蟲狀態值。
+    
+    參數:
+        key: 狀態名稱
+    
+    回傳:
+        Optional[str]: 狀態值，不存在時回傳 None
+    """
+    try:
+        row = get_connection().execute(
+            'SELECT value FROM scrape_state WHERE key = ?', (key,)
+        ).fetchone()
+        return row['value'] if row else None
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def set_state(key: str, value: Optional[str]) -> None:
+    """
+    寫入爬蟲狀態值；value 為 None 時刪除該狀態。
+    
+    參數:
+        key: 狀態名稱
+        value: 狀態值
+    """
+    try:
+        with transaction() as conn:
+            if value is None:
+                conn.execute('DELETE FROM scrape_state WHERE key = ?', (key,))
+            else:
+                conn.execute('''
+                    INSERT INTO scrape_state (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                ''', (key, value))
+        
+    except sqlite3.Error as e:
+        print(f"資料寫入錯誤：{e}")
+        raise
+
+
+def search_by_title(keyword: str) -> List[sqlite3.Row]:
+    """
+    依書名關鍵字搜尋書籍（模糊比對）。
+    
+    關鍵字至少 3 個字元時使用全文檢索索引並依 bm25 相關度排序，
+    否則以 LIKE '%keyword%' 比對並依書名排序；兩者皆為不分大小寫的子字串比對。
+    
+    參數:
+        keyword: 搜尋關鍵字
+    
+    回傳:
+        List[sqlite3.Row]: 符合條件的書籍列表
+    """
+    return _search_books('title', keyword)
+
+
 def search_by_author(keyword: str) -> List[sqlite3.Row]:
     """
     依作者關鍵字搜尋書籍（模糊比對）。
     
+    關鍵字至少 3 個字元時使用全文檢索索引並依 bm25 相關度排序，
+    否則以 LIKE '%keyword%' 比對並依書名排序；兩者皆為不分大小寫的子字串比對。
+    
     參數:
         keyword: 搜尋關鍵字
     
+    回傳:
+        List[sqlite3.Row]: 符合條件的書籍列表
+    """
+    return _search_books('author', keyword)
+
+
+def _search_books(field: str, keyword: str) -> List[sqlite3.Row]:
+    """
+    依指定欄位搜尋書籍。
+    
+    結果以 (資料庫路徑, 欄位, 關鍵字) 為鍵保存在查詢結果快取中；
+    英文字母不分大小寫，因此關鍵字的英文字母轉為小寫後才作為快取鍵。
+    
+    參數:
+        field: 搜尋欄位，'title' 或 'author'
+        keyword: 搜尋關鍵字
+    
     回傳:
         List[sqlite3.Row]: 符合條件的書籍列表
     """
     try:
-        with sqlite3.connect('books.db') as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT title, author, price FROM llm_books
-                WHERE author LIKE ?
-                ORDER BY title
-            ''', (f'%{keyword}%',))
-            
-            results = cursor.fetchall()
-            return results
-            
+        conn = get_connection()
+        _check_data_version(conn)
+        
+        generation = _query_cache.generation
+        key = (DB_PATH, field, _normalize_keyword(keyword))
+        hit, results = _query_cache.get(key)
+        if hit:
+            return list(results)
+        
+        results = conn.execute(*_build_search_query(conn, field, keyword)).fetchall()
+        _query_cache.put(key, tuple(results), generation)
+        return results
+        
+    except sqlite3.Error as e:
+        print(f"查詢錯誤：{e}")
+        raise
+
+
+def query_books(title: Optional[str] = None, author: Optional[str] = None,
+                min_price: Optional[int] = None, max_price: Optional[int] = None,
+                sort: str = 'title', descending: bool = False,
+                limit: Optional[int] = None, offset: int = 0,
+                after: Optional[Tuple[Any, int]] = None) -> List[sqlite3.Row]:
+    """
+    依條件查詢書籍，可排序與分頁。
+    
+    所有條件以 AND 組合：書名／作者為不分大小寫的子字串比對（至少 3 個字元時使用全文檢索索引），
+    價格範圍包含上下限。結果依排序鍵排序，相同時依 id 排序，因此順序固定。
+    
+    分頁方式：
+    - LIMIT / OFFSET：limit 與 offset，適合跳到任意頁，但 offset 越大越慢
+    - keyset：after 傳入上一頁最後一筆的 book_cursor(row, sort)，
+      直接從索引中的該位置繼續，任何頁數的速度都相同（排序欄位不可為 NULL）
+    
+    結果保存在查詢結果快取中，資料庫有寫入時自動作廢。
+    
+    參數:
+        title: 書名關鍵字
+        author: 作者關鍵字
+        min_price: 最低價格
+        max_price: 最高價格
+        sort: 排序鍵，'title'（預設）、'author'、'price' 或 'recency'
+        descending: 是否遞減排序
+        limit: 最多回傳筆數，None 表示不限制
+        offset: 略過前幾筆
+        after: keyset 分頁的游標 (排序欄位值, id)
+    
+    回傳:
+        List[sqlite3.Row]: 符合條件的書籍（id, title, author, price, link 與詳細資料 isbn, publisher, publish_date, pages）
+    
+    例外:
+        ValueError: 不支援的排序鍵
+    """
+    try:
+        conn = get_connection()
+        _check_data_version(conn)
+        
+        generation = _query_cache.generation
+        key = (DB_PATH, 'query', _normalize_keyword(title or ''), _normalize_keyword(author or ''),
+               min_price, max_price, sort, descending, limit, offset, after)
+        hit, results = _query_cache.get(key)
+        if hit:
+            return list(results)
+        
+        sql, params = _build_books_query(conn, title, author, min_price, max_price,
+                                         sort, descending, limit, offset, after)
+        results = conn.execute(sql, params).fetchall()
+        _query_cache.put(key, tuple(results), generation)
+        return results
+        
     except sqlite3.Error as e:
         print(f"查詢錯誤：{e}")
         raise
 
 
+def iter_books(title: Optional[str] = None, author: Optional[str] = None,
+               min_price: Optional[int] = None, max_price: Optional[int] = None,
+               sort: str = 'title', descending: bool = False,
+               batch_size: int = ITER_BATCH_SIZE) -> Iterator[sqlite3.Row]:
+    """
+    逐筆產出符合條件的書籍，不會一次將所有結果載入記憶體。
+    
+    以 keyset 分頁每次取回 batch_size 筆，批次之間不保留讀取交易，
+    因此迭代期間可以寫入資料庫（已產出位置之後的異動會反映在後續批次中）。
+    條件與排序參數與 query_books 相同，結果不放入查詢結果快取。
+    
+    參數:
+        batch_size: 每次向資料庫取回的筆數
+    
+    回傳:
+        Iterator[sqlite3.Row]: 符合條件的書籍（id, title, author, price, link 與詳細資料 isbn, publisher, publish_date, pages）
+    
+    例外:
+        ValueError: 不支援的排序鍵
+    """
+    after = None
+    while True:
+        try:
+            conn = get_connection()
+            sql, params = _build_books_query(conn, title, author, min_price, max_price,
+                                             sort, descending, batch_size, 0, after)
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"查詢錯誤：{e}")
+            raise
+        
+        yield from rows
+        
+        if len(rows) < batch_size:
+            return
+        after = book_cursor(rows[-1], sort)
+
+
+def book_cursor(row: sqlite3.Row, sort: str = 'title') -> Tuple[Any, int]:
+    """
+    取得 keyset 分頁的游標，傳給 query_books(after=...) 以取得下一頁。
+    
+    參數:
+        row: 上一頁的最後一筆（需包含 id 與排序欄位）
+        sort: 查詢時使用的排序鍵
+    
+    回傳:
+        Tuple[Any, int]: (排序欄位值, id)
+    """
+    return row[SORT_COLUMNS[sort]], row['id']
+
+
+def explain_query_books(**filters: Any) -> List[str]:
+    """
+    取得 query_books 以相同參數查詢時的 EXPLAIN QUERY PLAN，用於確認是否使用索引。
+    
+    參數:
+        filters: 與 query_books 相同的參數
+    
+    回傳:
+        List[str]: 查詢計畫的每個步驟
+    """
+    conn = get_connection()
+    arguments = dict(title=None, author=None, min_price=None, max_price=None, sort='title',
+                     descending=False, limit=None, offset=0, after=None)
+    arguments.update(filters)
+    sql, params = _build_books_query(conn, **arguments)
+    return [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
 
 
+def explain_search_books(field: str, keyword: str) -> List[str]:
+    """
+    取得 search_by_title / search_by_author 搜尋相同關鍵字時的 EXPLAIN QUERY PLAN，
+    用於確認是否使用全文檢索索引。
+    
+    參數:
+        field: 搜尋欄位，'title' 或 'author'
+        keyword: 搜尋關鍵字
+    
+    回傳:
+        List[str]: 查詢計畫的每個步驟
+    """
+    conn = get_connection()
+    sql, params = _build_search_query(conn, field, keyword)
+    return [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def _build_search_query(conn: sqlite3.Connection, field: str, keyword: str) -> Tuple[str, Tuple[str]]:
+    """組出 _search_books 的 SQL 與參數：關鍵字至少 3 個字元時使用全文檢索，否則以 LIKE 比對。"""
+    if len(keyword) >= TRIGRAM_MIN_LENGTH and _fts_enabled(conn):
+        return f'''
+            SELECT b.title, b.author, b.price
+            FROM {FTS_TABLE} f
+            JOIN llm_books b ON b.id = f.rowid
+            WHERE {FTS_TABLE} MATCH ?
+            ORDER BY bm25({FTS_TABLE}), b.title
+        ''', (_fts_query(field, keyword),)
+    return f'''
+        SELECT title, author, price FROM llm_books
+        WHERE {field} LIKE ?
+        ORDER BY title
+    ''', (f'%{keyword}%',)
+
+
+def _build_books_query(conn: sqlite3.Connection, title: Optional[str], author: Optional[str],
+                       min_price: Optional[int], max_price: Optional[int],
+                       sort: str, descending: bool, limit: Optional[int], offset: int,
+                       after: Optional[Tuple[Any, int]]) -> Tuple[str, List[Any]]:
+    """組出 query_books 的 SQL 與參數。"""
+    column = SORT_COLUMNS.get(sort)
+    if column is None:
+        raise ValueError(f"不支援的排序鍵：{sort}")
+    
+    conditions = []
+    params: List[Any] = []
+    
+    for field, keyword in (('title', title), ('author', author)):
+        if not keyword:
+            continue
+        if len(keyword) >= TRIGRAM_MIN_LENGTH and _fts_enabled(conn):
+            conditions.append(f'id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)')
+            params.append(_fts_query(field, keyword))
+        else:
+            conditions.append(f'{field} LIKE ?')
+            params.append(f'%{keyword}%')
+    
+    if min_price is not None:
+        conditions.append('price >= ?')
+        params.append(min_price)
+    if max_price is not None:
+        conditions.append('price <= ?')
+        params.append(max_price)
+    
+    direction = 'DESC' if descending else 'ASC'
+    if after is not None:
+        operator = '<' if descending else '>'
+        if column == 'id':
+            conditions.append(f'id {operator} ?')
+            params.append(after[1])
+        else:
+            conditions.append(f'({column}, id) {operator} (?, ?)')
+            params.extend(after)
+    
+    sql = 'SELECT id, title, author, price, link, isbn, publisher, publish_date, pages FROM llm_books'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += f' ORDER BY {column} {direction}'
+    if column != 'id':
+        sql += f', id {direction}'
+    if limit is not None or offset:
+        sql += ' LIMIT ? OFFSET ?'
+        params.extend([-1 if limit is None else limit, offset])
+    
+    return sql, params
+
+
+def _fts_query(field: str, keyword: str) -> str:
+    """組出限定欄位的全文檢索片語查詢；trigram 的片語查詢等同子字串比對，雙引號需跳脫。"""
+    phrase = '"' + keyword.replace('"', '""') + '"'
+    return f'{field} : {phrase}'
+
+
+def _normalize_keyword(keyword: str) -> str:
+    """將關鍵字的英文字母轉為小寫（LIKE 與 trigram 皆不分英文大小寫，其他字元維持原樣）。"""
+    return ''.join(ch.lower() if ch.isascii() else ch for ch in keyword)
+
+
+def _check_data_version(conn: sqlite3.Connection) -> None:
+    """
+    偵測其他連線（其他執行緒或程序）提交的寫入，有變動時作廢查詢結果快取。
+
+    PRAGMA data_version 只在其他連線提交寫入後改變，
+    本程序經由 transaction() 的寫入則在提交時直接作廢快取。
+    """
+    version = conn.execute('PRAGMA data_version').fetchone()[0]
+    last_version = getattr(_local, 'data_version', None)
+    if last_version is not None and version != last_version:
+        _query_cache.invalidate()
+    _local.data_version = version
+
+
+def configure_query_cache(max_size: Optional[int] = None, ttl: Optional[float] = None) -> None:
+    """
+    調整查詢結果快取的大小與存活時間，並清空目前的快取。
+    
+    參數:
+        max_size: 最多保存的查詢結果數（0 表示停用快取），None 表示不變
+        ttl: 每筆結果的存活時間（秒），None 表示不變
+    """
+    if max_size is not None:
+        _query_cache.max_size = max_size
+    if ttl is not None:
+        _query_cache.ttl = ttl
+    _query_cache.invalidate()
+
+
+def get_query_cache_stats() -> Dict[str, int]:
+    """
+    取得查詢結果快取的統計。
+    
+    回傳:
+        Dict[str, int]: 包含 size、max_size、hits、misses、evictions、expirations、invalidations
+    """
+    return _query_cache.stats()
+
+
+def _fts_enabled(conn: sqlite3.Connection) -> bool:
+    """
+    目前的資料庫是否可使用全文檢索索引（結果依資料庫路徑快取）。
+    
+    未經 init_database() 開啟的資料庫，需索引存在且結構版本已完成全文檢索的回填。
+    """
+    enabled = _fts_ready.get(DB_PATH)
+    if enabled is None:
+        enabled = _fts_ready[DB_PATH] = (migrations.has_table(conn, FTS_TABLE)
+                                         and migrations.get_version(conn) >= migrations.FTS_VERSION)
+    return enabled
@@ -0,0 +1,145 @@
+"""
+書籍詳細頁解析模組
+
+從博客來商品頁的原始 HTML 取得搜尋結果頁沒有的欄位：
+- isbn：ISBN（去除連字號，10 或 13 碼）
+- publisher：出版社
+- publish_date：出版日期（YYYY-MM-DD；只有年月時為 YYYY-MM）
+- pages：頁數（由「規格：平裝 / 320頁 / …」取得）
+
+頁面可見文字依區塊元素斷行後，以「標籤：值」逐行比對，
+欄位位於基本資料或詳細資料區塊、是否包在連結中都不影響結果。
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+from html_extractor import BLOCK_TAGS, HIDDEN_TAGS, VOID_TAGS, normalize_text
+
+
+# 詳細頁中的「標籤：值」行
+DETAIL_LINE_PATTERN = re.compile(r'^(ISBN|出版社|出版日期|規格)\s*[:：]\s*(.+)$', re.MULTILINE)
+
+# ISBN-10（最後一碼可能為 X）或 ISBN-13，比對前先去除連字號與空白
+ISBN_PATTERN = re.compile(r'\d{13}|\d{9}[\dX]')
+ISBN_SEPARATOR_PATTERN = re.compile(r'[\s-]')
+
+# 出版日期：2024/05/30、2024-5-30、2024年5月30日，或只有年月的 2024/05
+DATE_PATTERN = re.compile(r'(\d{4})\s*[/\-.年]\s*(\d{1,2})(?:\s*[/\-.月]\s*(\d{1,2}))?')
+
+# 出版社連結後的「訂閱出版社新書快訊」按鈕
+PUBLISHER_SUFFIX_PATTERN = re.compile(r'\s*訂閱出版社.*$')
+
+# 規格中的頁數
+PAGES_PATTERN = re.compile(r'(\d+)\s*頁')
+
+
+class _VisibleTextParser(HTMLParser):
+    """收集頁面可見文字，只在區塊元素的開始與結束處斷行（原始碼中的換行視為空白，與瀏覽器相同）。"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.text_parts: List[str] = []
+        self._stack: List[str] = []
+        self._hidden_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in BLOCK_TAGS:
+            self.text_parts.append('\n')
+        if tag in VOID_TAGS:
+            return
+        if tag in HIDDEN_TAGS:
+            self._hidden_depth += 1
+        self._stack.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in self._stack:
+            return
+        while self._stack:
+            open_tag = self._stack.pop()
+            if open_tag in BLOCK_TAGS:
+                self.text_parts.append('\n')
+            if open_tag in HIDDEN_TAGS:
+                self._hidden_depth -= 1
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if not self._hidden_depth:
+            self.text_parts.append(data.replace('\n', ' '))
+
+
+def extract_book_details(html: str) -> Dict[str, Any]:
+    """
+    解析書籍詳細頁。
+
+    參數:
+        html: 詳細頁原始碼
+
+    回傳:
+        Dict[str, Any]: 包含 isbn, publisher, publish_date, pages，找不到的欄位為 None
+    """
+    parser = _VisibleTextParser()
+    parser.feed(html)
+    parser.close()
+
+    fields: Dict[str, str] = {}
+    for label, value in DETAIL_LINE_PATTERN.findall(normalize_text(''.join(parser.text_parts))):
+        fields.setdefault(label, value.strip())
+
+    return {
+        'isbn': parse_isbn(fields.get('ISBN')),
+        'publisher': PUBLISHER_SUFFIX_PATTERN.sub('', fields.get('出版社', '')) or None,
+        'publish_date': parse_publish_date(fields.get('出版日期')),
+        'pages': parse_pages(fields.get('規格')),
+    }
+
+
+def parse_isbn(text: Optional[str]) -> Optional[str]:
+    """
+    取得 ISBN（去除連字號與空白）。
+
+    參數:
+        text: ISBN 欄位的文字，例如「978-626-324-542-6」
+
+    回傳:
+        Optional[str]: 10 或 13 碼的 ISBN，無法解析時回傳 None
+    """
+    if not text:
+        return None
+    match = ISBN_PATTERN.search(ISBN_SEPARATOR_PATTERN.sub('', text).upper())
+    return match.group(0) if match else None
+
+
+def parse_publish_date(text: Optional[str]) -> Optional[str]:
+    """
+    將出版日期轉為 ISO 格式。
+
+    參數:
+        text: 出版日期欄位的文字，例如「2024/05/30」
+
+    回傳:
+        Optional[str]: YYYY-MM-DD（只有年月時為 YYYY-MM），無法解析時回傳 None
+    """
+    match = DATE_PATTERN.search(text or '')
+    if not match:
+        return None
+    year, month, day = match.groups()
+    if day is None:
+        return f'{year}-{int(month):02d}'
+    return f'{year}-{int(month):02d}-{int(day):02d}'
+
+
+def parse_pages(text: Optional[str]) -> Optional[int]:
+    """
+    從規格取得頁數。
+
+    參數:
+        text: 規格欄位的文字，例如「平裝 / 320頁 / 17 x 23 x 1.6 cm / 普通級」
+
+    回傳:
+        Optional[int]: 頁數，沒有標示時回傳 None
+    """
+    match = PAGES_PATTERN.search(text or '')
+    return int(match.group(1)) if match else None
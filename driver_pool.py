@@ -0,0 +1,213 @@
+"""
+WebDriver 連線池模組
+
+保留數個已啟動的瀏覽器工作階段，在多次爬取之間重複使用，
+避免每次更新（或每個搜尋關鍵字）都重新啟動 Chrome。
+
+借出前檢查瀏覽器是否仍可回應，超過存活時間或使用次數的工作階段會關閉重建；
+歸還時清除 cookie 與網站儲存資料並回到空白頁，下一位使用者不會沿用上一次的狀態。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+
+# 最多同時存在的瀏覽器工作階段數
+DEFAULT_POOL_SIZE = 2
+
+# 工作階段建立後超過此秒數即關閉重建（避免長時間執行的瀏覽器累積記憶體）
+DEFAULT_MAX_AGE = 30 * 60
+
+# 工作階段借出超過此次數即關閉重建
+DEFAULT_MAX_USES = 50
+
+# 等待可用工作階段的預設秒數
+DEFAULT_ACQUIRE_TIMEOUT = 120
+
+BLANK_URL = 'about:blank'
+
+# 清除目前網站的 localStorage 與 sessionStorage（about:blank 等頁面不允許存取時略過）
+CLEAR_STORAGE_SCRIPT = '''
+    try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}
+'''
+
+
+class _Session:
+    """池中的一個瀏覽器工作階段。"""
+
+    def __init__(self, driver: Any) -> None:
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+
+class DriverPool:
+    """
+    WebDriver 工作階段池（執行緒安全，可同時借給多個工作執行緒）。
+
+    使用方式：
+        pool = DriverPool(create_driver)
+        with pool.acquire() as driver:
+            driver.get(url)
+        pool.shutdown()
+    """
+
+    def __init__(self, factory: Callable[[], Any],
+                 size: int = DEFAULT_POOL_SIZE,
+                 max_age: float = DEFAULT_MAX_AGE,
+                 max_uses: int = DEFAULT_MAX_USES) -> None:
+        """
+        參數:
+            factory: 建立新 WebDriver 的函式
+            size: 最多同時存在的工作階段數
+            max_age: 工作階段的最長存活秒數
+            max_uses: 工作階段的最多借出次數
+        """
+        self.factory = factory
+        self.size = max(size, 1)
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self._idle: List[_Session] = []
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def acquire(self, timeout: float = DEFAULT_ACQUIRE_TIMEOUT) -> Iterator[Any]:
+        """
+        借出一個可用的 WebDriver，with 區塊結束時重設並歸還。
+
+        有閒置的工作階段時先檢查健康狀態與存活時間，不合格者關閉並改建新的工作階段；
+        沒有閒置且未達上限時建立新的工作階段；已達上限時等待其他使用者歸還。
+
+        參數:
+            timeout: 等待可用工作階段的最長秒數
+
+        回傳:
+            Iterator[Any]: WebDriver 實例
+
+        例外:
+            RuntimeError: 連線池已關閉
+            TimeoutError: 等待逾時
+        """
+        session = self._checkout(timeout)
+        try:
+            yield session.driver
+        finally:
+            self._checkin(session)
+
+    def _checkout(self, timeout: float) -> _Session:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("WebDriver 連線池已關閉")
+                if self._idle:
+                    session = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.size:
+                    session = None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"等待 WebDriver 逾時（{timeout} 秒）")
+                self._condition.wait(remaining)
+
+        # 健康檢查與建立瀏覽器較慢，在鎖外進行
+        try:
+            if session is not None:
+                if self._is_usable(session):
+                    session.uses += 1
+                    self.reused += 1
+                    return session
+                self._discard(session)
+
+            session = _Session(self.factory())
+            session.uses = 1
+            self.created += 1
+            return session
+
+        except BaseException:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def _checkin(self, session: _Session) -> None:
+        keep = not self._closed and self._reset(session)
+        with self._condition:
+            self._in_use -= 1
+            if keep and not self._closed:
+                self._idle.append(session)
+                session = None
+            self._condition.notify()
+
+        if session is not None:
+            self._discard(session)
+
+    def _is_usable(self, session: _Session) -> bool:
+        """工作階段是否未過期且瀏覽器仍可回應。"""
+        if time.monotonic() - session.created_at > self.max_age:
+            return False
+        if session.uses >= self.max_uses:
+            return False
+        try:
+            return session.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def _reset(self, session: _Session) -> bool:
+        """清除 cookie、網站儲存資料與多餘分頁並回到空白頁；失敗時回傳 False。"""
+        driver = session.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.execute_script(CLEAR_STORAGE_SCRIPT)
+            driver.delete_all_cookies()
+            driver.get(BLANK_URL)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, session: _Session) -> None:
+        self.discarded += 1
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        """
+        回傳連線池統計。
+
+        回傳:
+            Dict[str, int]: 包含 idle、in_use、created（新建）、reused（重複使用）、discarded（關閉）次數
+        """
+        with self._condition:
+            return {
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+            }
+
+    def shutdown(self) -> None:
+        """關閉所有閒置的瀏覽器；借出中的工作階段會在歸還時關閉。"""
+        with self._condition:
+            self._closed = True
+            sessions = self._idle
+            self._idle = []
+            self._condition.notify_all()
+        for session in sessions:
+            self._discard(session)
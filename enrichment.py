@@ -0,0 +1,186 @@
+"""
+書籍詳細頁擷取模組
+
+搜尋結果頁只有書名、作者、價格與連結；此模組取得尚未擷取詳細頁的書籍
+（或作者、商品編號在擷取後變動的書籍），以有上限的執行緒池同時下載詳細頁
+（共用 keep-alive 連線池與每主機的請求頻率限制），解析 ISBN、出版社、出版日期與頁數後，
+每 batch_size 本在單一交易中寫回資料庫。已擷取且書目未變動的書籍不會重新下載。
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import database
+import metrics
+from detail_extractor import extract_book_details
+from http_client import HttpClient, HttpError
+from http_scraper import DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, create_client
+from timing import PhaseTimer
+
+
+# 書籍詳細頁網址（{product_id} 為商品編號）；測試時可換成本機 fixture 伺服器
+DETAIL_URL_TEMPLATE = 'https://www.books.com.tw/products/{product_id}'
+
+# 每次寫回資料庫的書籍數
+DEFAULT_BATCH_SIZE = 50
+
+# 回應這些狀態碼的詳細頁視為已下架，記錄為已擷取（欄位為 None），之後不再重試
+NOT_FOUND_STATUSES = {404, 410}
+
+# 詳細資料的欄位
+DETAIL_FIELDS = ('isbn', 'publisher', 'publish_date', 'pages')
+
+
+def build_detail_url(book: Dict[str, Any], url_template: str = DETAIL_URL_TEMPLATE) -> Optional[str]:
+    """
+    組出書籍詳細頁的網址。
+
+    參數:
+        book: 書籍資料，包含 product_id 與 link
+        url_template: 詳細頁網址樣板
+
+    回傳:
+        Optional[str]: 有商品編號時依樣板組出網址，否則使用書籍連結；兩者皆無時回傳 None
+    """
+    if book['product_id']:
+        return url_template.format(product_id=book['product_id'])
+    return book['link'] or None
+
+
+def fetch_book_details(client: HttpClient, book: Dict[str, Any],
+                       url_template: str = DETAIL_URL_TEMPLATE,
+                       timer: Optional[PhaseTimer] = None) -> Dict[str, Any]:
+    """
+    下載並解析單一書籍的詳細頁。
+
+    參數:
+        client: HTTP 用戶端
+        book: 書籍資料，包含 id, author, link, product_id
+        url_template: 詳細頁網址樣板
+        timer: 各階段耗時紀錄器
+
+    回傳:
+        Dict[str, Any]: 供 database.update_book_details 寫回的資料（id, author, product_id 與詳細資料欄位）
+
+    例外:
+        http_client.HttpError: 詳細頁下載失敗
+        ValueError: 書籍沒有商品編號也沒有連結
+    """
+    timer = timer or PhaseTimer()
+    url = build_detail_url(book, url_template)
+    if url is None:
+        raise ValueError(f"書籍 {book['id']} 沒有商品編號或連結")
+
+    with timer.phase('detail_load'):
+        response = client.get(url)
+    with timer.phase('detail_extract'):
+        details = extract_book_details(response.text)
+    details.update(id=book['id'], author=book['author'], product_id=book['product_id'])
+    return details
+
+
+def enrich_books(client: Optional[HttpClient] = None,
+                 url_template: str = DETAIL_URL_TEMPLATE,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 limit: Optional[int] = None,
+                 force: bool = False,
+                 timer: Optional[PhaseTimer] = None) -> Dict[str, int]:
+    """
+    下載需要擷取的書籍詳細頁，並分批寫回資料庫。
+
+    同時下載的頁面不超過 max_workers，等待中的工作不超過 max_workers 的兩倍，
+    書籍從資料庫分批讀取，記憶體用量與書目大小無關。下載在工作執行緒中進行，
+    寫入只在呼叫端的執行緒中進行。暫時性的錯誤（連線失敗、5xx）不寫入，下次仍會重試。
+
+    參數:
+        client: HTTP 用戶端，未指定時建立一個並在結束時關閉
+        url_template: 詳細頁網址樣板（{product_id} 為商品編號）
+        max_workers: 同時下載的頁面數上限
+        requests_per_second: 未指定 client 時，對同一主機每秒最多發出的請求數
+        batch_size: 每次寫回資料庫的書籍數
+        limit: 最多處理的書籍數，None 表示全部
+        force: 是否重新擷取已擷取過的書籍
+        timer: 各階段耗時紀錄器
+
+    回傳:
+        Dict[str, int]: 包含 pending（待擷取）、enriched（已解析）、not_found（詳細頁不存在）、
+        failed（下載失敗）與 written（寫回資料庫）的書籍數
+    """
+    timer = timer or PhaseTimer()
+    own_client = client is None
+    if own_client:
+        client = create_client(max_workers, requests_per_second)
+
+    pending = database.count_books_to_enrich(force)
+    summary = {
+        'pending': pending if limit is None else min(pending, limit),
+        'enriched': 0,
+        'not_found': 0,
+        'failed': 0,
+        'written': 0,
+    }
+    buffer: List[Dict[str, Any]] = []
+
+    def collect(done: Set[Future]) -> None:
+        for future in done:
+            book = in_flight.pop(future)
+            try:
+                buffer.append(future.result())
+                result = 'enriched'
+            except HttpError as e:
+                if e.status not in NOT_FOUND_STATUSES:
+                    print(f"下載書籍詳細頁失敗（{book['title']}）：{e}")
+                    result = 'failed'
+                else:
+                    buffer.append(dict(dict.fromkeys(DETAIL_FIELDS), id=book['id'], author=book['author'],
+                                       product_id=book['product_id']))
+                    result = 'not_found'
+            except Exception as e:
+                print(f"擷取書籍詳細頁失敗（{book['title']}）：{e}")
+                result = 'failed'
+            summary[result] += 1
+            metrics.inc('enrichment_total', result=result)
+
+        if len(buffer) >= batch_size:
+            flush()
+
+    def flush() -> None:
+        if buffer:
+            with timer.phase('db_write'):
+                summary['written'] += database.update_book_details(buffer)
+            buffer.clear()
+
+    executor = ThreadPoolExecutor(max_workers=max(max_workers, 1))
+    in_flight: Dict[Future, Dict[str, Any]] = {}
+    try:
+        for book in _iter_books_to_enrich(batch_size, limit, force):
+            if len(in_flight) >= max(max_workers, 1) * 2:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            in_flight[executor.submit(fetch_book_details, client, book, url_template, timer)] = book
+
+        collect(wait(in_flight).done)
+        flush()
+        return summary
+
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if own_client:
+            client.close()
+
+
+def _iter_books_to_enrich(batch_size: int, limit: Optional[int], force: bool) -> Iterator[Dict[str, Any]]:
+    """以 id 分批從資料庫讀取需要擷取的書籍。"""
+    after_id = 0
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        rows = database.get_books_to_enrich(after_id, size, force)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(row)
+        after_id = rows[-1]['id']
+        if remaining is not None:
+            remaining -= len(rows)
@@ -0,0 +1,153 @@
+"""
+書籍欄位解析模組
+
+以預先編譯的正規表示式，從已取得的文字中解析價格與作者，
+html 與 dom 兩種擷取模式共用，確保結果一致。
+作者只取 p.author 下各個 <a> 的文字（不解析整個作者區塊），
+區塊中的「作者：」「譯者：」標籤或沒有連結的文字在兩種模式下都不會成為作者。
+
+價格區塊只掃描一次，同時取得：
+- list_price：定價
+- discount：折扣（折數換算成百分比，79 折為 79、9 折為 90）
+- sale_price：實際售價（「N 元」，沒有時取定價或較大的數字）
+
+另外由書籍連結取得商品編號（product_id），供詳細頁擷取與判斷書目是否變動。
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+
+# 價格區塊中的標記：「定價」標籤，或數字與其後的單位（折／元）
+PRICE_TOKEN_PATTERN = re.compile(r'(定價|原價)|(\d+(?:\.\d+)?)\s*(折|元)?')
+
+# 整個書籍區塊中的「N 元」
+YUAN_PATTERN = re.compile(r'(\d+)\s*元')
+
+# 書籍連結中的商品編號：商品頁 /products/0010960000 或搜尋結果的轉址 /item/0010960000/
+PRODUCT_ID_PATTERN = re.compile(r'/(?:products|item)/([0-9A-Za-z]+)')
+
+# 沒有標示單位時，小於此值的數字不視為價格（避免誤取折數或頁碼）
+MIN_UNLABELED_PRICE = 100
+
+
+def parse_price(price_text: str) -> Dict[str, Optional[int]]:
+    """
+    單次掃描價格區塊的文字，解析定價、折扣與售價。
+
+    參數:
+        price_text: 價格區塊的文字，例如「優惠價：79 折, 513 元」或「定價：650 元」
+
+    回傳:
+        Dict[str, Optional[int]]: 包含 list_price, discount, sale_price，無法解析的欄位為 None
+    """
+    list_price = discount = sale_price = None
+    largest = 0
+    after_list_label = False
+
+    for label, number, unit in PRICE_TOKEN_PATTERN.findall(price_text):
+        if label:
+            after_list_label = True
+            continue
+
+        if unit == '折':
+            discount = _discount_percent(float(number))
+        else:
+            value = int(number) if number.isdigit() else int(float(number))
+            if after_list_label and list_price is None:
+                list_price = value
+            elif unit == '元':
+                if sale_price is None:
+                    sale_price = value
+            elif value > largest:
+                largest = value
+        after_list_label = False
+
+    if sale_price is None:
+        if list_price is not None and discount is None:
+            sale_price = list_price
+        elif largest >= MIN_UNLABELED_PRICE:
+            sale_price = largest
+
+    return {'list_price': list_price, 'discount': discount, 'sale_price': sale_price}
+
+
+def parse_fallback_price(full_text: str) -> Optional[int]:
+    """
+    價格區塊無法解析時，從整個書籍區塊的文字中尋找第一個「N 元」。
+
+    參數:
+        full_text: 書籍區塊的完整文字
+
+    回傳:
+        Optional[int]: 價格，找不到時回傳 None
+    """
+    match = YUAN_PATTERN.search(full_text)
+    return int(match.group(1)) if match else None
+
+
+def parse_authors(link_texts: Iterable[str]) -> List[str]:
+    """
+    整理 p.author 下各個作者連結（<a>）的文字。
+
+    html 模式傳入從原始碼解析出的連結文字，dom 模式傳入各連結的 textContent，
+    兩者經過相同的整理，因此結果一致。
+
+    參數:
+        link_texts: 各作者連結的文字
+
+    回傳:
+        List[str]: 作者名稱列表（連續空白與換行合併為單一空白，去除空項目）
+    """
+    names = (' '.join(text.split()) for text in link_texts)
+    return [name for name in names if name]
+
+
+def join_authors(names: List[str]) -> str:
+    """
+    合併作者名稱。
+
+    參數:
+        names: 作者名稱列表
+
+    回傳:
+        str: 以「, 」連接的作者，沒有作者時回傳 'N/A'
+    """
+    return ', '.join(names) if names else 'N/A'
+
+
+def parse_product_id(link: Optional[str]) -> Optional[str]:
+    """
+    從書籍連結取得商品編號。
+
+    參數:
+        link: 書籍連結，例如 https://www.books.com.tw/products/0010960000?loc=P_0005_001
+
+    回傳:
+        Optional[str]: 商品編號，連結中沒有時回傳 None
+    """
+    match = PRODUCT_ID_PATTERN.search(link or '')
+    return match.group(1) if match else None
+
+
+def book_key(link: str) -> str:
+    """
+    取得辨識同一本書的鍵：商品編號，連結中沒有商品編號時為去除查詢字串與錨點的連結。
+
+    搜尋結果的連結帶有排名參數（?loc=P_0005_001），同一本書在不同關鍵字或不同次搜尋中的連結不同，
+    去除重複時以此鍵比較。
+
+    參數:
+        link: 書籍連結
+
+    回傳:
+        str: 書籍的鍵
+    """
+    return parse_product_id(link) or link.split('#', 1)[0].split('?', 1)[0]
+
+
+def _discount_percent(value: float) -> int:
+    """將折數換算為百分比：79 折 → 79，9 折 → 90，7.5 折 → 75。"""
+    if value < 10:
+        value *= 10
+    return int(round(value))
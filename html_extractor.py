@@ -0,0 +1,400 @@
+"""
+HTML 解析模組
+
+直接解析搜尋結果頁的原始 HTML，一次取得整頁書籍資料，
+避免對每個元素各發出一次 WebDriver 請求。
+"""
+
+import re
+import time
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Optional
+from urllib.parse import urljoin
+
+from field_parser import join_authors, parse_authors, parse_fallback_price, parse_price
+import metrics
+
+
+# 不會有結束標籤的元素
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+
+# 會讓瀏覽器在文字中斷行的區塊元素（模擬 WebElement.text 的換行行為）
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul'
+}
+
+# 內容不會顯示在畫面上的元素
+HIDDEN_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'title'}
+
+# 價格容器的 CSS 選擇器：p.price, li.price_a, div.price
+PRICE_SELECTORS = {('p', 'price'), ('li', 'price_a'), ('div', 'price')}
+
+# 搜尋結果區塊 div.table-searchbox 的開始標籤，以及用來找出對應結束標籤的 div 標籤
+SEARCHBOX_START_PATTERN = re.compile(
+    r'<div\b[^>]*\bclass\s*=\s*["\'][^"\']*\btable-searchbox\b[^"\']*["\'][^>]*>', re.IGNORECASE
+)
+DIV_TAG_PATTERN = re.compile(r'<(/?)div\b[^>]*>', re.IGNORECASE)
+
+
+def normalize_text(text: str) -> str:
+    """
+    將原始文字整理成與 WebElement.text 相同的格式。
+
+    每一行的連續空白合併為單一空白，並移除空行與前後空白。
+
+    參數:
+        text: 原始文字
+
+    回傳:
+        str: 整理後的文字
+    """
+    lines = (' '.join(line.split()) for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+class _Container:
+    """單一 div.table-td 書籍區塊在解析過程中的暫存資料。"""
+
+    def __init__(self) -> None:
+        self.text_parts: List[str] = []
+        self.title_parts: Optional[List[str]] = None
+        self.link: Optional[str] = None
+        self.authors: List[List[str]] = []
+        self.price_parts: Optional[List[str]] = None
+
+
+class SearchResultParser(HTMLParser):
+    """
+    搜尋結果頁的 HTML 解析器。
+
+    對應 extract_books_from_page 使用的選擇器：
+    - 書籍區塊：div.table-searchbox div.table-td
+    - 書名與連結：第一個 h4 a
+    - 作者：所有 p.author a
+    - 價格：第一個 p.price, li.price_a, div.price
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.containers: List[_Container] = []
+        self._stack: List[tuple] = []
+        self._searchbox_depth = 0
+        self._hidden_depth = 0
+        self._h4_depth = 0
+        self._author_depth = 0
+        self._container: Optional[_Container] = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in BLOCK_TAGS and tag not in VOID_TAGS:
+            self._auto_close(tag)
+
+        attributes = dict(attrs)
+        classes = (attributes.get('class') or '').split()
+        roles = []
+        container = self._container
+
+        if tag in HIDDEN_TAGS:
+            roles.append('hidden')
+            self._hidden_depth += 1
+
+        if tag == 'div' and 'table-searchbox' in classes:
+            roles.append('searchbox')
+            self._searchbox_depth += 1
+
+        if tag == 'div' and 'table-td' in classes and self._searchbox_depth and container is None:
+            roles.append('container')
+            container = self._container = _Container()
+            self.containers.append(container)
+
+        if container is not None:
+            if tag in BLOCK_TAGS:
+                self._append_break()
+
+            if tag == 'h4':
+                roles.append('h4')
+                self._h4_depth += 1
+
+            if tag == 'p' and 'author' in classes:
+                roles.append('author')
+                self._author_depth += 1
+
+            if tag == 'a':
+                if self._h4_depth and container.title_parts is None:
+                    roles.append('title')
+                    container.title_parts = []
+                    container.link = attributes.get('href')
+                if self._author_depth:
+                    roles.append('author_a')
+                    container.authors.append([])
+
+            if container.price_parts is None and any(
+                tag == selector_tag and selector_class in classes
+                for selector_tag, selector_class in PRICE_SELECTORS
+            ):
+                roles.append('price')
+                container.price_parts = []
+
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, roles))
+        elif tag == 'br' and container is not None:
+            self._append_text('\n')
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, roles = self._stack.pop()
+            self._close(open_tag, roles)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._container is None or self._hidden_depth:
+            return
+        self._append_text(data)
+
+    def close(self) -> None:
+        super().close()
+        while self._stack:
+            open_tag, roles = self._stack.pop()
+            self._close(open_tag, roles)
+
+    def _auto_close(self, tag: str) -> None:
+        """模擬瀏覽器對未關閉的 <p> 與 <li> 的隱含結束行為。"""
+        if self._stack and self._stack[-1][0] == 'p':
+            self.handle_endtag('p')
+        elif tag == 'li' and self._stack and self._stack[-1][0] == 'li':
+            self.handle_endtag('li')
+
+    def _close(self, tag: str, roles: list) -> None:
+        if self._container is not None and tag in BLOCK_TAGS:
+            self._append_break()
+
+        for role in roles:
+            if role == 'hidden':
+                self._hidden_depth -= 1
+            elif role == 'searchbox':
+                self._searchbox_depth -= 1
+            elif role == 'container':
+                self._container = None
+            elif role == 'h4':
+                self._h4_depth -= 1
+            elif role == 'author':
+                self._author_depth -= 1
+
+    def _append_break(self) -> None:
+        self._append_text('\n')
+
+    def _append_text(self, text: str) -> None:
+        container = self._container
+        container.text_parts.append(text)
+
+        # 書名與作者只取目前開啟中的 <a>
+        for tag, roles in reversed(self._stack):
+            if tag == 'a':
+                if 'title' in roles:
+                    container.title_parts.append(text)
+                if 'author_a' in roles:
+                    container.authors[-1].append(text)
+                break
+
+        if container.price_parts is not None and any('price' in roles for _, roles in self._stack):
+            container.price_parts.append(text)
+
+
+def extract_books_from_html(html: str, base_url: str = '') -> List[Dict[str, Any]]:
+    """
+    從搜尋結果頁的 HTML 擷取所有書籍資料。
+
+    回傳格式與 selenium_scraper.extract_books_from_page 相同，
+    但整頁只需解析一次，不需要任何 WebDriver 請求。
+    價格與作者由 field_parser 解析，price 與 sale_price 相同（無法解析時為 0）。
+
+    每頁以「解析時間 / 書籍區塊數」記入 extract_container_seconds（mode="html"），
+    缺少書名或連結而略過的區塊、找不到價格的書籍記入 parse_failures_total。
+
+    參數:
+        html: 頁面原始碼（driver.page_source 或 div.table-searchbox 的 outerHTML）
+        base_url: 頁面網址，用來將相對連結轉為絕對網址
+
+    回傳:
+        List[Dict[str, Any]]: 書籍資料列表
+    """
+    start = time.perf_counter()
+    parser = SearchResultParser()
+    parser.feed(html)
+    parser.close()
+
+    books = []
+    for container in parser.containers:
+        if container.title_parts is None:
+            metrics.inc('parse_failures_total', field='title', mode='html')
+            continue
+
+        title = normalize_text(''.join(container.title_parts))
+        link = urljoin(base_url, container.link) if container.link is not None else None
+
+        author = join_authors(parse_authors(''.join(parts) for parts in container.authors))
+
+        prices = parse_price(normalize_text(''.join(container.price_parts or [])))
+        if not prices['sale_price']:
+            prices['sale_price'] = parse_fallback_price(normalize_text(''.join(container.text_parts)))
+        price = prices['sale_price'] or 0
+
+        if title and link:
+            if price == 0:
+                metrics.inc('parse_failures_total', field='price', mode='html')
+            books.append({
+                'title': title,
+                'author': author,
+                'price': price,
+                'link': link,
+                **prices
+            })
+        else:
+            metrics.inc('parse_failures_total', field='title' if not title else 'link', mode='html')
+
+    if parser.containers:
+        metrics.observe('extract_container_seconds',
+                        (time.perf_counter() - start) / len(parser.containers), mode='html')
+
+    return books
+
+
+def extract_searchbox_fragment(html: str) -> Optional[str]:
+    """
+    取出頁面中 div.table-searchbox（搜尋結果區塊）的原始 HTML。
+
+    只以正規表示式尋找開始標籤並計算 div 的巢狀層數找出對應的結束標籤，
+    不需完整解析整頁，用於判斷搜尋結果是否變動（見 page_cache.fragment_hash）。
+
+    參數:
+        html: 頁面原始碼
+
+    回傳:
+        Optional[str]: 搜尋結果區塊的 HTML，找不到時回傳 None；結束標籤缺漏時取到頁面結尾
+    """
+    start = SEARCHBOX_START_PATTERN.search(html)
+    if start is None:
+        return None
+
+    depth = 1
+    for match in DIV_TAG_PATTERN.finditer(html, start.end()):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return html[start.start():match.end()]
+    return html[start.start():]
+
+
+class _PaginationParser(HTMLParser):
+    """
+    收集分頁連結文字與頁面可見文字，用於偵測總頁數。
+
+    分頁連結對應選擇器：div.mod_pagination a, div.cnt_page a, ul.pagination a, .page_bar a
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.link_texts: List[str] = []
+        self.text_parts: List[str] = []
+        self._stack: List[tuple] = []
+        self._pagination_depth = 0
+        self._hidden_depth = 0
+        self._link_parts: Optional[List[str]] = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        classes = (dict(attrs).get('class') or '').split()
+        roles = []
+
+        if tag in HIDDEN_TAGS:
+            roles.append('hidden')
+            self._hidden_depth += 1
+
+        if ((tag == 'div' and ('mod_pagination' in classes or 'cnt_page' in classes))
+                or (tag == 'ul' and 'pagination' in classes)
+                or 'page_bar' in classes):
+            roles.append('pagination')
+            self._pagination_depth += 1
+
+        if tag == 'a' and self._pagination_depth:
+            roles.append('link')
+            self._link_parts = []
+
+        if tag in BLOCK_TAGS:
+            self.text_parts.append('\n')
+
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, roles))
+
+    def handle_endtag(self, tag: str) -> None:
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, roles = self._stack.pop()
+            if open_tag in BLOCK_TAGS:
+                self.text_parts.append('\n')
+            for role in roles:
+                if role == 'hidden':
+                    self._hidden_depth -= 1
+                elif role == 'pagination':
+                    self._pagination_depth -= 1
+                elif role == 'link' and self._link_parts is not None:
+                    self.link_texts.append(''.join(self._link_parts).strip())
+                    self._link_parts = None
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._hidden_depth:
+            return
+        self.text_parts.append(data)
+        if self._link_parts is not None:
+            self._link_parts.append(data)
+
+
+def parse_page_count(html: str) -> int:
+    """
+    從搜尋結果頁的 HTML 偵測總頁數。
+
+    偵測順序與 scraper 相同：
+    1. 分頁列中數字連結的最大值
+    2. 「共 N 頁」文字
+    3. 「搜尋結果共 … 頁數 x / N」文字
+
+    參數:
+        html: 頁面原始碼
+
+    回傳:
+        int: 總頁數，無法偵測時回傳 1
+    """
+    parser = _PaginationParser()
+    parser.feed(html)
+    parser.close()
+
+    page_numbers = [int(text) for text in parser.link_texts if text.isdigit()]
+    if page_numbers and max(page_numbers) > 1:
+        return max(page_numbers)
+
+    text = normalize_text(''.join(parser.text_parts))
+
+    match = re.search(r'共\s*(\d+)\s*頁', text)
+    if match:
+        return int(match.group(1))
+
+    if '搜尋結果共' in text:
+        match = re.search(r'頁數\s*\d+\s*/\s*(\d+)', text)
+        if match:
+            return int(match.group(1))
+
+    return 1
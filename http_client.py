@@ -0,0 +1,259 @@
+"""
+HTTP 連線模組
+
+以標準函式庫 http.client 實作的簡易 HTTP 用戶端，
+依主機保留 keep-alive 連線並重複使用，避免每個請求重新建立 TCP / TLS 連線。
+"""
+
+import gzip
+import http.client
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/119.0 Safari/537.36'),
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# 重複使用閒置連線時，伺服器可能已經關閉連線，此時以新連線重試一次
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+MAX_REDIRECTS = 5
+
+
+class HttpError(Exception):
+    """HTTP 請求失敗（連線錯誤或回應狀態碼 >= 400）。"""
+
+    def __init__(self, message: str, status: int = 0) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class HostRateLimiter:
+    """
+    依主機限制請求頻率（執行緒安全）。
+
+    同一主機的兩個請求之間至少間隔 1 / requests_per_second 秒，
+    多個執行緒同時請求時會依序排入下一個可用的時間點。
+    """
+
+    def __init__(self, requests_per_second: float) -> None:
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        """
+        等待直到可以對指定主機發出下一個請求。
+
+        參數:
+            host: 主機名稱
+        """
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HttpResponse:
+    """已完整讀取的 HTTP 回應。"""
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], content: bytes) -> None:
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+    @property
+    def encoding(self) -> str:
+        """由 Content-Type 取得字元編碼，未指定時使用 UTF-8。"""
+        content_type = self.headers.get('content-type', '')
+        for part in content_type.split(';'):
+            key, _, value = part.strip().partition('=')
+            if key.lower() == 'charset' and value:
+                return value.strip('"\'')
+        return 'utf-8'
+
+    @property
+    def text(self) -> str:
+        """以回應的字元編碼解碼後的內容。"""
+        try:
+            return self.content.decode(self.encoding, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+
+class HttpClient:
+    """
+    具備連線池的 HTTP 用戶端（執行緒安全）。
+
+    每個 (scheme, host, port) 保留最多 max_idle_per_host 條閒置連線，
+    請求結束後若伺服器允許 keep-alive，連線會放回池中供下一個請求使用。
+    多個執行緒同時請求時，各自取得不同的連線；提供 rate_limiter 時依主機限制請求頻率。
+    """
+
+    def __init__(self, max_idle_per_host: int = 4, timeout: float = 15.0,
+                 headers: Optional[Dict[str, str]] = None,
+                 rate_limiter: Optional[HostRateLimiter] = None) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def __enter__(self) -> 'HttpClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        """
+        發出 GET 請求並自動跟隨重新導向。
+
+        參數:
+            url: 目標網址
+            headers: 額外的請求標頭
+
+        回傳:
+            HttpResponse: 回應內容
+
+        例外:
+            HttpError: 連線失敗或狀態碼 >= 400
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.request('GET', url, headers)
+            location = response.headers.get('location')
+            if response.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                raise HttpError(f"HTTP {response.status}：{url}", response.status)
+            return response
+
+        raise HttpError(f"重新導向次數過多：{url}")
+
+    def request(self, method: str, url: str,
+                headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        """
+        發出單一 HTTP 請求（不跟隨重新導向）。
+
+        參數:
+            method: HTTP 方法
+            url: 目標網址
+            headers: 額外的請求標頭
+
+        回傳:
+            HttpResponse: 回應內容
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname or '', port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        request_headers = dict(self.headers)
+        if headers:
+            request_headers.update(headers)
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(key[1])
+
+        conn, reused = self._acquire(key)
+        try:
+            try:
+                response = self._send(conn, method, path, request_headers)
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                conn = self._connect(key)
+                response = self._send(conn, method, path, request_headers)
+
+            content = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise HttpError(f"連線錯誤：{url}（{e}）") from e
+
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        self._release(key, conn, reusable=not response.will_close)
+
+        return HttpResponse(url, response.status, response_headers,
+                            _decode_body(content, response_headers.get('content-encoding', '')))
+
+    def close(self) -> None:
+        """關閉所有閒置連線。"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def _send(self, conn: http.client.HTTPConnection, method: str, path: str,
+              headers: Dict[str, str]) -> http.client.HTTPResponse:
+        conn.request(method, path, headers=headers)
+        return conn.getresponse()
+
+    def _acquire(self, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            connections = self._idle.get(key)
+            if connections:
+                return connections.pop(), True
+        return self._connect(key), False
+
+    def _connect(self, key: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        connection_class = (http.client.HTTPSConnection if scheme == 'https'
+                            else http.client.HTTPConnection)
+        with self._lock:
+            self.connections_opened += 1
+        return connection_class(host, port, timeout=self.timeout)
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection,
+                 reusable: bool) -> None:
+        if reusable:
+            with self._lock:
+                connections = self._idle.setdefault(key, [])
+                if len(connections) < self.max_idle_per_host:
+                    connections.append(conn)
+                    return
+        conn.close()
+
+
+def _decode_body(content: bytes, content_encoding: str) -> bytes:
+    """依 Content-Encoding 解壓縮回應內容。"""
+    encoding = content_encoding.strip().lower()
+    if encoding == 'gzip':
+        return gzip.decompress(content)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(content)
+        except zlib.error:
+            return zlib.decompress(content, -zlib.MAX_WBITS)
+    return content
@@ -0,0 +1,442 @@
+"""
+HTTP 爬蟲模組
+
+不啟動瀏覽器，直接組出搜尋結果頁的網址，
+透過具連線池的 HTTP 用戶端下載後交由 html_extractor 解析。
+
+提供 page_cache 時，以快取的 ETag / Last-Modified 發出條件式請求，
+並比對搜尋結果區塊的雜湊，內容未變動的頁面沿用快取中的書籍資料，不重新擷取；
+iter_pages_cached() 則完全不連線，從快取重播頁面。
+"""
+
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from html_extractor import extract_books_from_html, parse_page_count
+from http_client import HttpClient, HostRateLimiter
+from incremental import EarlyStop
+from page_cache import PageCache, fragment_hash
+from timing import PhaseTimer
+import metrics
+
+
+# 博客來「圖書」分類（cat/BKA）的搜尋結果頁網址
+SEARCH_URL_TEMPLATE = 'https://search.books.com.tw/search/query/cat/BKA/key/{keyword}/sort/1/page/{page}/v/0/'
+
+DEFAULT_KEYWORD = 'LLM'
+
+# 網址中表示頁碼的部分：路徑中的 /page/2/ 或查詢參數 page=2
+PAGE_NUMBER_PATTERNS = [
+    re.compile(r'(/page/)(\d+)(?=[/?#]|$)'),
+    re.compile(r'([?&](?:page|pageno|page_no|pg|p)=)(\d+)(?=[&#]|$)'),
+]
+
+# 同時下載的頁面數上限
+DEFAULT_MAX_WORKERS = 4
+
+# 對同一主機每秒最多發出的請求數（0 表示不限制）
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+
+
+def build_search_url(keyword: str, page: int, url_template: str = SEARCH_URL_TEMPLATE) -> str:
+    """
+    組出指定關鍵字與頁碼的搜尋結果頁網址。
+
+    參數:
+        keyword: 搜尋關鍵字
+        page: 頁碼（從 1 開始）
+        url_template: 網址樣板，需包含 {keyword} 與 {page}
+
+    回傳:
+        str: 搜尋結果頁網址
+    """
+    return url_template.format(keyword=quote(keyword, safe=''), page=page)
+
+
+def infer_page_url_template(url: str, page: int) -> Optional[str]:
+    """
+    由第 page 頁的網址推得各頁共用的網址樣板，頁碼以 {page} 表示。
+
+    依序尋找路徑中的 /page/N/ 與查詢參數 page=N（及常見別名），
+    只接受數字等於 page 的位置，避免把其他數字參數（例如 sort/1）當成頁碼。
+
+    參數:
+        url: 已知頁碼的搜尋結果頁網址
+        page: 該網址的頁碼
+
+    回傳:
+        Optional[str]: 網址樣板；網址中找不到頁碼時回傳 None
+    """
+    for pattern in PAGE_NUMBER_PATTERNS:
+        matches = [match for match in pattern.finditer(url) if int(match.group(2)) == page]
+        if matches:
+            match = matches[-1]
+            return url[:match.start(2)] + '{page}' + url[match.end(2):]
+    return None
+
+
+def build_page_url(page_url_template: str, page: int) -> str:
+    """
+    以 infer_page_url_template 推得的樣板組出指定頁碼的網址。
+
+    參數:
+        page_url_template: 包含 {page} 的網址樣板
+        page: 頁碼（從 1 開始）
+
+    回傳:
+        str: 該頁網址
+    """
+    return page_url_template.replace('{page}', str(page))
+
+
+def create_client(max_workers: int = DEFAULT_MAX_WORKERS,
+                  requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND) -> HttpClient:
+    """
+    建立爬取搜尋結果頁用的 HTTP 用戶端。
+
+    多個關鍵字同時爬取時共用同一個用戶端，所有請求共用連線池與每主機的請求頻率限制。
+
+    參數:
+        max_workers: 預計同時使用的連線數（決定每個主機保留的閒置連線數）
+        requests_per_second: 對同一主機每秒最多發出的請求數
+
+    回傳:
+        HttpClient: HTTP 用戶端，使用完畢需呼叫 close()
+    """
+    return HttpClient(max_idle_per_host=max(max_workers, 1),
+                      rate_limiter=HostRateLimiter(requests_per_second))
+
+
+def fetch_page(client: HttpClient, url: str, timer: Optional[PhaseTimer] = None,
+               page: Optional[int] = None, page_cache: Optional[PageCache] = None) -> List[Dict[str, Any]]:
+    """
+    下載並解析單一搜尋結果頁。
+
+    參數:
+        client: HTTP 用戶端
+        url: 搜尋結果頁網址
+        timer: 各階段耗時紀錄器
+        page: 頁碼，用於耗時報告
+        page_cache: 頁面快取；提供時重新驗證快取，內容未變動時沿用快取中的書籍資料
+
+    回傳:
+        List[Dict[str, Any]]: 該頁的書籍資料列表
+    """
+    timer = timer or PhaseTimer()
+    if page_cache is not None:
+        return fetch_page_cached(client, url, page_cache, timer, page)[1]
+
+    with timer.phase('page_load', page):
+        response = client.get(url)
+    with timer.phase('extract', page):
+        return extract_books_from_html(response.text, response.url)
+
+
+def fetch_page_cached(client: HttpClient, url: str, page_cache: PageCache,
+                      timer: Optional[PhaseTimer] = None, page: Optional[int] = None,
+                      load_phase: str = 'page_load') -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    下載搜尋結果頁並以頁面快取重新驗證。
+
+    快取中有此網址時帶上 If-None-Match / If-Modified-Since；
+    收到 304 或 div.table-searchbox 片段的雜湊與快取相同時，視為內容未變動，
+    沿用快取中的書籍資料而不重新擷取（page_cache.was_unchanged(url) 為 True）。
+    每次結果記入 page_cache_total（result 為 miss、changed、unchanged 或 not_modified）。
+
+    參數:
+        client: HTTP 用戶端
+        url: 搜尋結果頁網址
+        page_cache: 頁面快取
+        timer: 各階段耗時紀錄器
+        page: 頁碼，用於耗時報告
+        load_phase: 下載時間計入的階段名稱
+
+    回傳:
+        Tuple[str, List[Dict[str, Any]]]: (頁面 HTML, 該頁的書籍資料列表)
+
+    例外:
+        http_client.HttpError: 頁面下載失敗
+    """
+    timer = timer or PhaseTimer()
+    entry = page_cache.lookup(url)
+    with timer.phase(load_phase, page):
+        response = client.get(url, entry.revalidation_headers() if entry is not None else None)
+
+    if response.status == 304 and entry is not None:
+        html = page_cache.load(url)
+        if html is not None and entry.books is not None:
+            page_cache.refresh(url, response.headers.get('etag'), response.headers.get('last-modified'))
+            metrics.inc('page_cache_total', result='not_modified')
+            return html, entry.books
+        # 快取內容已被淘汰，不帶條件重新下載
+        with timer.phase(load_phase, page):
+            response = client.get(url)
+
+    html = response.text
+    digest = fragment_hash(html)
+    unchanged = entry is not None and entry.books is not None and entry.fragment_hash == digest
+    if unchanged:
+        books = entry.books
+        metrics.inc('page_cache_total', result='unchanged')
+    else:
+        with timer.phase('extract', page):
+            books = extract_books_from_html(html, response.url)
+        metrics.inc('page_cache_total', result='miss' if entry is None else 'changed')
+
+    page_cache.store(url, html, books, digest, response.headers.get('etag'),
+                     response.headers.get('last-modified'), unchanged=unchanged)
+    return html, books
+
+
+def iter_fetch_pages(client: HttpClient, urls: List[str],
+                     max_workers: int = DEFAULT_MAX_WORKERS,
+                     timer: Optional[PhaseTimer] = None,
+                     first_page: int = 1,
+                     page_cache: Optional[PageCache] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    以有上限的執行緒池同時下載多個搜尋結果頁，並依網址順序逐頁產出結果。
+
+    同時送出的頁面最多 max_workers 頁（滑動視窗）：每產出一頁才送出下一頁，
+    呼叫端提前結束迭代（例如增量模式判斷停止）時，最多只多下載一個視窗的頁面。
+    每個工作執行緒從 client 的連線池取得各自的 keep-alive 連線，
+    請求頻率由 client 的 rate_limiter 控制。
+
+    參數:
+        client: HTTP 用戶端
+        urls: 搜尋結果頁網址列表
+        max_workers: 同時下載的頁面數上限
+        timer: 各階段耗時紀錄器
+        first_page: urls 第一個網址的頁碼，用於耗時報告
+        page_cache: 頁面快取（見 fetch_page）
+
+    回傳:
+        Iterator[List[Dict[str, Any]]]: 各頁的書籍資料，順序與 urls 相同
+    """
+    pages = range(first_page, first_page + len(urls))
+
+    if max_workers <= 1 or len(urls) <= 1:
+        for url, page in zip(urls, pages):
+            yield fetch_page(client, url, timer, page, page_cache)
+        return
+
+    window = min(max_workers, len(urls))
+    executor = ThreadPoolExecutor(max_workers=window)
+    try:
+        pending = deque()
+        for url, page in zip(urls, pages):
+            if len(pending) == window:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fetch_page, client, url, timer, page, page_cache))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pages_http(keyword: str = DEFAULT_KEYWORD,
+                    url_template: str = SEARCH_URL_TEMPLATE,
+                    client: Optional[HttpClient] = None,
+                    max_workers: int = DEFAULT_MAX_WORKERS,
+                    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                    timer: Optional[PhaseTimer] = None,
+                    early_stop: Optional[EarlyStop] = None,
+                    start_page: int = 1,
+                    page_cache: Optional[PageCache] = None,
+                    count_changes: Optional[Callable[[List[Dict[str, Any]]], int]] = None
+                    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    以 HTTP 直接爬取搜尋關鍵字的書籍資料（不需瀏覽器），逐頁產出結果。
+
+    先下載第 1 頁並偵測總頁數，再以執行緒池同時下載其餘頁面，
+    依頁碼順序產出。遇到沒有書籍的頁面時停止。
+
+    提供 early_stop（增量模式）時，依頁碼順序檢查，
+    連續數頁沒有新書或異動時停止，並取消尚未開始下載的頁面。
+    每頁在產出前就完成檢查，呼叫端（例如另一個執行緒）寫入該頁不會影響判斷。
+
+    提供 page_cache 時各頁先以快取重新驗證（見 fetch_page_cached）；再提供 count_changes 時，
+    內容未變動且 count_changes 回傳 0（資料庫已有相同資料）的頁面產出空列表，呼叫端不需再寫入。
+
+    參數:
+        keyword: 搜尋關鍵字
+        url_template: 搜尋結果頁網址樣板（測試時可指向本機伺服器）
+        client: 共用的 HTTP 用戶端，未提供時自行建立並於結束時關閉
+        max_workers: 同時下載的頁面數上限
+        requests_per_second: 自行建立用戶端時，對同一主機每秒最多發出的請求數
+        timer: 各階段耗時紀錄器
+        early_stop: 增量模式的提前停止判斷
+        start_page: 從第幾頁開始產出（用於中斷後續跑；第 1 頁仍會下載以偵測總頁數）
+        page_cache: 頁面快取
+        count_changes: 計算一頁中新書或異動書籍數量的函式，例如 database.count_new_or_changed
+
+    回傳:
+        Iterator[Tuple[int, List[Dict[str, Any]]]]: (頁碼, 該頁書籍資料)；略過的未變動頁面為空列表
+
+    例外:
+        http_client.HttpError: 頁面下載失敗
+    """
+    timer = timer or PhaseTimer()
+    own_client = client is None
+    if own_client:
+        with timer.phase('startup'):
+            client = create_client(max_workers, requests_per_second)
+
+    try:
+        first_url = build_search_url(keyword, 1, url_template)
+        # 第 1 頁即為搜尋結果，下載時間計入 search 階段
+        if page_cache is not None:
+            html, page_books = fetch_page_cached(client, first_url, page_cache, timer, 1, load_phase='search')
+            with timer.phase('extract', 1):
+                page_count = parse_page_count(html)
+        else:
+            with timer.phase('search'):
+                response = client.get(first_url)
+
+            with timer.phase('extract', 1):
+                html = response.text
+                page_count = parse_page_count(html)
+                page_books = extract_books_from_html(html, response.url)
+
+        print(f"「{keyword}」偵測到總共有 {page_count} 頁。")
+
+        if not page_books:
+            print(f"「{keyword}」沒有書籍資料，停止爬取。")
+            return
+
+        if start_page <= 1:
+            _count_page(page_books)
+            page_books = _skip_if_stored(page_books, first_url, page_cache, count_changes)
+            stop = early_stop is not None and early_stop.should_stop(page_books)
+            yield 1, page_books
+            if stop:
+                return
+
+        first_page = max(start_page, 2)
+        if first_page <= page_count:
+            print(f"正在同時爬取「{keyword}」第 {first_page} 到 {page_count} 頁（最多 {max_workers} 個同時連線）...")
+            urls = [build_search_url(keyword, page_num, url_template)
+                    for page_num in range(first_page, page_count + 1)]
+
+            page_results = iter_fetch_pages(client, urls, max_workers, timer, first_page=first_page,
+                                            page_cache=page_cache)
+            try:
+                for page_num, page_books in enumerate(page_results, first_page):
+                    if not page_books:
+                        print(f"「{keyword}」第 {page_num} 頁沒有書籍資料，停止爬取。")
+                        break
+                    _count_page(page_books)
+                    page_books = _skip_if_stored(page_books, urls[page_num - first_page], page_cache, count_changes)
+                    stop = early_stop is not None and early_stop.should_stop(page_books)
+                    yield page_num, page_books
+                    if stop:
+                        break
+            finally:
+                page_results.close()
+
+        print(f"「{keyword}」爬取完成。")
+
+    finally:
+        if own_client:
+            client.close()
+
+
+def iter_pages_cached(page_cache: PageCache,
+                      keyword: str = DEFAULT_KEYWORD,
+                      url_template: str = SEARCH_URL_TEMPLATE,
+                      timer: Optional[PhaseTimer] = None,
+                      early_stop: Optional[EarlyStop] = None,
+                      start_page: int = 1) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    離線重播：不連線，從頁面快取取出搜尋結果頁並以目前的擷取程式重新擷取，逐頁產出結果。
+
+    用於修改 html_extractor 或 field_parser 後重新處理已下載的頁面；
+    重新擷取的書籍資料會寫回快取。遇到快取中沒有的頁面時停止。
+
+    參數:
+        page_cache: 頁面快取
+        keyword: 搜尋關鍵字
+        url_template: 下載時使用的搜尋結果頁網址樣板（快取以網址為鍵）
+        timer: 各階段耗時紀錄器
+        early_stop: 增量模式的提前停止判斷
+        start_page: 從第幾頁開始產出（用於中斷後續跑）
+
+    回傳:
+        Iterator[Tuple[int, List[Dict[str, Any]]]]: (頁碼, 該頁書籍資料)
+    """
+    timer = timer or PhaseTimer()
+    first_url = build_search_url(keyword, 1, url_template)
+    html = page_cache.load(first_url)
+    if html is None:
+        print(f"頁面快取中沒有「{keyword}」的搜尋結果，無法重播。")
+        return
+
+    page_count = parse_page_count(html)
+    print(f"從頁面快取重播「{keyword}」，共 {page_count} 頁。")
+
+    for page_num in range(max(start_page, 1), page_count + 1):
+        url = build_search_url(keyword, page_num, url_template)
+        if page_num > 1:
+            html = page_cache.load(url)
+            if html is None:
+                print(f"頁面快取中沒有「{keyword}」第 {page_num} 頁，停止重播。")
+                break
+
+        with timer.phase('extract', page_num):
+            page_books = extract_books_from_html(html, url)
+        if not page_books:
+            print(f"「{keyword}」第 {page_num} 頁沒有書籍資料，停止重播。")
+            break
+
+        page_cache.refresh(url, books=page_books, unchanged=False)
+        metrics.inc('page_cache_total', result='replay')
+        _count_page(page_books, engine='cache')
+        stop = early_stop is not None and early_stop.should_stop(page_books)
+        yield page_num, page_books
+        if stop:
+            break
+
+    print(f"「{keyword}」重播完成。")
+
+
+def _count_page(page_books: List[Dict[str, Any]], engine: str = 'http') -> None:
+    metrics.inc('pages_scraped_total', engine=engine)
+    metrics.inc('books_scraped_total', len(page_books), engine=engine)
+
+
+def _skip_if_stored(page_books: List[Dict[str, Any]], url: str, page_cache: Optional[PageCache],
+                    count_changes: Optional[Callable[[List[Dict[str, Any]]], int]]) -> List[Dict[str, Any]]:
+    """內容與快取相同且資料庫已有相同資料時回傳空列表，讓呼叫端略過寫入。"""
+    if page_cache is None or count_changes is None or not page_cache.was_unchanged(url):
+        return page_books
+    if count_changes(page_books):
+        return page_books
+    metrics.inc('pages_skipped_total', reason='unchanged')
+    return []
+
+
+def scrape_books_http(keyword: str = DEFAULT_KEYWORD,
+                      url_template: str = SEARCH_URL_TEMPLATE,
+                      client: Optional[HttpClient] = None,
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                      timer: Optional[PhaseTimer] = None,
+                      early_stop: Optional[EarlyStop] = None) -> List[Dict[str, Any]]:
+    """
+    以 HTTP 直接爬取搜尋關鍵字的所有書籍資料（不需瀏覽器）。
+
+    參數與 iter_pages_http 相同，將各頁結果依頁碼順序合併為單一列表。
+
+    回傳:
+        List[Dict[str, Any]]: 書籍資料列表，格式與 scraper.scrape_books 相同
+
+    例外:
+        http_client.HttpError: 頁面下載失敗
+    """
+    books = []
+    for _, page_books in iter_pages_http(keyword, url_template, client, max_workers,
+                                         requests_per_second, timer, early_stop):
+        books.extend(page_books)
+    return books
@@ -0,0 +1,104 @@
+"""
+增量爬取模組
+
+每日更新時，搜尋結果大多是資料庫中已有的書籍。
+增量模式在連續數頁都沒有新書或異動時提前停止翻頁，
+並定期執行一次完整爬取，避免遺漏排序較後面的異動。
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional
+
+import database
+
+
+# 連續幾頁沒有新書或異動時停止翻頁
+DEFAULT_STOP_AFTER_PAGES = 2
+
+# 距離上次完整爬取超過此天數時，改為完整爬取
+FULL_CRAWL_INTERVAL = timedelta(days=7)
+
+LAST_FULL_CRAWL_KEY = 'last_full_crawl'
+
+
+class EarlyStop:
+    """
+    依頁面內容判斷是否提前停止翻頁。
+
+    每擷取一頁呼叫 should_stop()，連續 stop_after_pages 頁都沒有新書或異動時回傳 True。
+    count_changes 比對的是資料庫的現況，因此需在該頁寫入資料庫之前呼叫。
+    """
+
+    def __init__(self, count_changes: Callable[[List[Dict[str, Any]]], int],
+                 stop_after_pages: int = DEFAULT_STOP_AFTER_PAGES) -> None:
+        """
+        參數:
+            count_changes: 計算一頁中新書或異動書籍數量的函式，例如 database.count_new_or_changed
+            stop_after_pages: 連續幾頁沒有變動時停止
+        """
+        self.count_changes = count_changes
+        self.stop_after_pages = stop_after_pages
+        self.unchanged_pages = 0
+        self.pages_checked = 0
+
+    def should_stop(self, page_books: List[Dict[str, Any]]) -> bool:
+        """
+        檢查一頁的書籍並回傳是否應停止翻頁。
+
+        參數:
+            page_books: 該頁擷取到的書籍資料
+
+        回傳:
+            bool: 是否應停止翻頁
+        """
+        self.pages_checked += 1
+        if self.count_changes(page_books) == 0:
+            self.unchanged_pages += 1
+        else:
+            self.unchanged_pages = 0
+
+        if self.unchanged_pages >= self.stop_after_pages:
+            print(f"增量模式：連續 {self.unchanged_pages} 頁沒有新書或異動，停止翻頁。")
+            return True
+        return False
+
+    def copy(self) -> 'EarlyStop':
+        """
+        建立設定相同、計數歸零的判斷器（同時爬取多個關鍵字時，每個關鍵字各用一個）。
+
+        回傳:
+            EarlyStop: 新的判斷器
+        """
+        return EarlyStop(self.count_changes, self.stop_after_pages)
+
+
+def needs_full_crawl(now: Optional[datetime] = None) -> bool:
+    """
+    判斷本次更新是否需要完整爬取所有頁面。
+
+    參數:
+        now: 目前時間（預設為現在）
+
+    回傳:
+        bool: 從未完整爬取過，或距離上次完整爬取已超過 FULL_CRAWL_INTERVAL 時回傳 True
+    """
+    last = database.get_state(LAST_FULL_CRAWL_KEY)
+    if last is None:
+        return True
+
+    try:
+        last_time = datetime.fromisoformat(last)
+    except ValueError:
+        return True
+
+    return (now or datetime.now()) - last_time >= FULL_CRAWL_INTERVAL
+
+
+def record_full_crawl(now: Optional[datetime] = None) -> None:
+    """
+    記錄完整爬取完成的時間。
+
+    參數:
+        now: 完成時間（預設為現在）
+    """
+    database.set_state(LAST_FULL_CRAWL_KEY, (now or datetime.now()).isoformat(timespec='seconds'))
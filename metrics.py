@@ -0,0 +1,257 @@
+"""
+指標模組
+
+以計數器（counter）與直方圖（histogram）記錄爬蟲與資料庫的執行狀況，例如：
+- scrape_phase_seconds：各階段（page_load、extract、db_write 等）耗時
+- extract_container_seconds：每個書籍區塊的擷取時間
+- webdriver_commands_total：發出的 WebDriver 指令數
+- selector_hits_total / selector_misses_total：分類與下一頁選擇器命中的是第幾個備援
+- selector_cache_stale_total：記住的選擇器失效的次數
+- parse_failures_total：無法解析的欄位或區塊
+- db_write_seconds：資料庫寫入延遲
+
+指標可透過 add_hook() 即時轉送到其他系統，也可輸出為 JSON 或 Prometheus 文字格式。
+"""
+
+import bisect
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# 直方圖預設的分組上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prometheus 輸出的說明文字
+DESCRIPTIONS = {
+    'scrape_phase_seconds': '爬蟲各階段耗時（秒）',
+    'extract_container_seconds': '每個書籍區塊的擷取時間（秒）',
+    'webdriver_commands_total': '發出的 WebDriver 指令數',
+    'selector_hits_total': '選擇器命中次數（selector 為備援清單中的索引）',
+    'selector_misses_total': '所有備援選擇器皆未命中的次數',
+    'selector_errors_total': '查詢選擇器時發生錯誤的次數',
+    'selector_cache_stale_total': '記住的選擇器失效、改用備援選擇器的次數',
+    'page_navigations_total': '瀏覽器換頁次數（method 為 url 直接開啟或 click 點擊下一頁）',
+    'parse_failures_total': '無法解析的欄位或書籍區塊數',
+    'pages_scraped_total': '已擷取的頁數',
+    'books_scraped_total': '已擷取的書籍數',
+    'db_write_seconds': '資料庫寫入延遲（秒）',
+    'page_cache_total': '頁面快取重新驗證結果（result 為 miss、changed、unchanged、not_modified 或 replay）',
+    'pages_skipped_total': '內容未變動且資料庫已是最新、略過寫入的頁數',
+    'enrichment_total': '書籍詳細頁擷取結果（result 為 enriched、not_found 或 failed）',
+    'service_requests_total': '查詢服務處理的請求數（route 為路徑，status 為 HTTP 狀態碼）',
+    'service_request_seconds': '查詢服務每個請求的處理時間（秒）',
+}
+
+# 指標事件的回呼：(種類 'counter' 或 'histogram', 名稱, 數值, 標籤)
+Hook = Callable[[str, str, float, Dict[str, str]], None]
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    """單一標籤組合的直方圖資料。"""
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+
+class Metrics:
+    """
+    指標登錄表（執行緒安全）。
+
+    使用方式：
+        metrics = Metrics()
+        metrics.inc('selector_hits_total', kind='next_page', selector='3')
+        metrics.observe('db_write_seconds', 0.004, operation='insert_books')
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        參數:
+            buckets: 直方圖的分組上限（遞增排序）
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[_LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[_LabelKey, _Histogram]] = {}
+        self._hooks: List[Hook] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """
+        計數器加上指定數值。
+
+        參數:
+            name: 指標名稱
+            value: 增加的數值
+            labels: 標籤（值會轉為字串）
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+            hooks = self._hooks
+        self._notify(hooks, 'counter', name, value, key)
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        在直方圖中記錄一筆觀測值。
+
+        參數:
+            name: 指標名稱
+            value: 觀測值（秒）
+            labels: 標籤（值會轉為字串）
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram.counts[index] += 1
+            histogram.count += 1
+            histogram.sum += value
+            hooks = self._hooks
+        self._notify(hooks, 'histogram', name, value, key)
+
+    def add_hook(self, hook: Hook) -> None:
+        """
+        註冊回呼，每次 inc() 或 observe() 時呼叫（在記錄指標的執行緒中執行）。
+
+        參數:
+            hook: 回呼函式 hook(kind, name, value, labels)
+        """
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook: Hook) -> None:
+        """取消註冊回呼。"""
+        with self._lock:
+            self._hooks = [registered for registered in self._hooks if registered is not hook]
+
+    def reset(self) -> None:
+        """清除所有指標（保留已註冊的回呼）。"""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        取得目前所有指標。
+
+        回傳:
+            Dict[str, Any]: 包含以下欄位
+            - counters: {名稱: [{'labels': {...}, 'value': 數值}]}
+            - histograms: {名稱: [{'labels': {...}, 'count', 'sum', 'buckets': {上限: 累計筆數}}]}
+        """
+        with self._lock:
+            counters = {
+                name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+            histograms = {}
+            for name, series in sorted(self._histograms.items()):
+                histograms[name] = []
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    buckets = {}
+                    for bound, count in zip(self.buckets, histogram.counts):
+                        cumulative += count
+                        buckets[_format_number(bound)] = cumulative
+                    histograms[name].append({
+                        'labels': dict(key),
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'buckets': buckets,
+                    })
+        return {'counters': counters, 'histograms': histograms}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """將所有指標輸出為 JSON 字串。"""
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self) -> str:
+        """將所有指標輸出為 Prometheus 文字格式（text exposition format 0.0.4）。"""
+        snapshot = self.snapshot()
+        lines = []
+
+        for name, series in snapshot['counters'].items():
+            lines.extend(_prometheus_header(name, 'counter'))
+            for sample in series:
+                lines.append(f"{name}{_format_labels(sample['labels'])} {_format_number(sample['value'])}")
+
+        for name, series in snapshot['histograms'].items():
+            lines.extend(_prometheus_header(name, 'histogram'))
+            for sample in series:
+                labels = sample['labels']
+                for bound, count in sample['buckets'].items():
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=bound))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {sample['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(sample['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str) -> None:
+        """
+        將所有指標寫入檔案；副檔名為 .prom 時使用 Prometheus 文字格式，其餘為 JSON。
+
+        參數:
+            path: 輸出檔案路徑
+        """
+        content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    @staticmethod
+    def _notify(hooks: List[Hook], kind: str, name: str, value: float, key: _LabelKey) -> None:
+        for hook in hooks:
+            try:
+                hook(kind, name, value, dict(key))
+            except Exception as e:
+                print(f"指標回呼發生錯誤：{e}")
+
+
+def _label_key(labels: Dict[str, Any]) -> _LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _prometheus_header(name: str, kind: str) -> List[str]:
+    lines = []
+    if name in DESCRIPTIONS:
+        lines.append(f'# HELP {name} {DESCRIPTIONS[name]}')
+    lines.append(f'# TYPE {name} {kind}')
+    return lines
+
+
+# 程式共用的指標登錄表
+REGISTRY = Metrics()
+
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+add_hook = REGISTRY.add_hook
+remove_hook = REGISTRY.remove_hook
+reset = REGISTRY.reset
+snapshot = REGISTRY.snapshot
+to_json = REGISTRY.to_json
+to_prometheus = REGISTRY.to_prometheus
+dump = REGISTRY.dump
@@ -0,0 +1,396 @@
+"""
+資料庫結構遷移模組
+
+以 PRAGMA user_version 記錄資料庫目前的結構版本，啟動時依序套用尚未套用的遷移：
+- 每個遷移的結構變更（建立資料表、索引、觸發器等）在單一交易中執行
+- 需要以既有資料填入的遷移（例如建立全文檢索索引）分段回填，每段各自提交，
+  回填期間其他連線仍可查詢與寫入；回填進度記錄在 scrape_state，中斷後從原位置繼續
+- 結構變更與回填都完成後，才在同一個交易中更新 user_version
+
+資料庫已是最新版本時只讀取一次 user_version，不執行任何其他敘述。
+新增遷移時，在 MIGRATIONS 最後加上版本號遞增的 Migration，已發布的遷移不可修改。
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from field_parser import parse_product_id
+
+
+# 全文檢索索引：trigram 分詞同時適用於中文與英文，查詢字串至少需 3 個字元
+FTS_TABLE = 'llm_books_fts'
+
+# 每段回填處理的資料列數
+BACKFILL_CHUNK_SIZE = 2000
+
+# 每段回填之間的暫停秒數，讓等待寫入鎖的其他連線有機會取得鎖
+BACKFILL_PAUSE = 0.01
+
+# 回填進度在 scrape_state 中的鍵（{version} 為遷移版本）
+BACKFILL_STATE_KEY = 'migration_{version}_backfill'
+
+# 書籍詳細頁的欄位：(欄位名稱, 資料型別)
+DETAIL_COLUMNS: List[Tuple[str, str]] = [
+    ('product_id', 'TEXT'),
+    ('isbn', 'TEXT'),
+    ('publisher', 'TEXT'),
+    ('publish_date', 'TEXT'),
+    ('pages', 'INTEGER'),
+    ('enriched_at', 'TEXT'),
+]
+
+# 建立全文檢索觸發器時的最大書籍 id；之後新增的書籍已由觸發器編入索引，不需回填
+FTS_BACKFILL_END_KEY = 'migration_fts_backfill_end'
+
+
+class Migration:
+    """
+    單一結構遷移。
+
+    參數:
+        version: 遷移後的結構版本（從 1 開始遞增）
+        description: 遷移說明
+        upgrade: 結構變更，在交易中以 upgrade(conn) 執行，需可重複執行（IF NOT EXISTS 等）
+        backfill: 分段回填，backfill(conn, position, chunk_size) 處理 position 之後的一段資料，
+            回傳新的位置，沒有剩餘資料時回傳 None
+    """
+
+    def __init__(self, version: int, description: str,
+                 upgrade: Callable[[sqlite3.Connection], None],
+                 backfill: Optional[Callable[[sqlite3.Connection, int, int], Optional[int]]] = None) -> None:
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.backfill = backfill
+
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS llm_books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL UNIQUE,
+            author TEXT,
+            price INTEGER,
+            link TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+
+def _create_book_keywords(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_keywords (
+            book_id INTEGER NOT NULL REFERENCES llm_books(id) ON DELETE CASCADE,
+            keyword TEXT NOT NULL,
+            PRIMARY KEY (keyword, book_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_book_keywords_book_id ON book_keywords (book_id)')
+
+
+def _create_fts(conn: sqlite3.Connection) -> None:
+    """
+    建立全文檢索索引與同步觸發器（既有的觸發器會重建）。
+
+    回填期間尚未編入索引的書籍也可能被更新或刪除，因此刪除舊內容前
+    先以 llm_books_fts_docsize 確認該書籍已在索引中，避免對不存在的內容下 'delete' 而破壞索引。
+    SQLite 不支援 FTS5 trigram 時略過，搜尋改用 LIKE 比對。
+    """
+    try:
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                title, author,
+                content='llm_books', content_rowid='id',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"無法建立全文檢索索引，改用 LIKE 查詢：{e}")
+        return
+
+    indexed = f'EXISTS (SELECT 1 FROM {FTS_TABLE}_docsize WHERE id = old.id)'
+    for name in ('insert', 'delete', 'update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS llm_books_fts_{name}')
+    conn.execute(f'''
+        CREATE TRIGGER llm_books_fts_insert AFTER INSERT ON llm_books BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER llm_books_fts_delete AFTER DELETE ON llm_books BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author)
+            SELECT 'delete', old.id, old.title, old.author WHERE {indexed};
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER llm_books_fts_update AFTER UPDATE OF title, author ON llm_books BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author)
+            SELECT 'delete', old.id, old.title, old.author WHERE {indexed};
+            INSERT INTO {FTS_TABLE}(rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute('''
+        INSERT INTO scrape_state (key, value) SELECT ?, coalesce(max(id), 0) FROM llm_books WHERE true
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    ''', (FTS_BACKFILL_END_KEY,))
+
+
+def _backfill_fts(conn: sqlite3.Connection, position: int, chunk_size: int) -> Optional[int]:
+    """
+    將 id 在 position 之後的一段書籍編入全文檢索索引。
+
+    只處理建立觸發器前已存在的書籍（id 不超過 FTS_BACKFILL_END_KEY），
+    並略過已由觸發器編入的書籍。
+    """
+    if not has_table(conn, FTS_TABLE):
+        return None
+
+    end = conn.execute('SELECT value FROM scrape_state WHERE key = ?', (FTS_BACKFILL_END_KEY,)).fetchone()
+    last_id = conn.execute(
+        'SELECT max(id) FROM (SELECT id FROM llm_books WHERE id > ? AND id <= ? ORDER BY id LIMIT ?)',
+        (position, int(end[0]) if end else 0, chunk_size)
+    ).fetchone()[0]
+    if last_id is None:
+        conn.execute('DELETE FROM scrape_state WHERE key = ?', (FTS_BACKFILL_END_KEY,))
+        return None
+
+    conn.execute(f'''
+        INSERT INTO {FTS_TABLE}(rowid, title, author)
+        SELECT b.id, b.title, b.author FROM llm_books b
+        WHERE b.id > ? AND b.id <= ?
+          AND NOT EXISTS (SELECT 1 FROM {FTS_TABLE}_docsize d WHERE d.id = b.id)
+    ''', (position, last_id))
+    return last_id
+
+
+def _create_search_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_books_author ON llm_books (author)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_books_price ON llm_books (price)')
+
+
+def _create_price_history(conn: sqlite3.Connection) -> None:
+    """
+    建立價格歷史資料表：每本書只在價格變動的日期記錄一筆（同一天多次變動保留最後的價格）。
+
+    主鍵 (book_id, changed_on) 讓單本書的歷史與「某日的價格」只需範圍搜尋；
+    idx_price_history_changed_on 用於找出最近 N 天內有變動的書籍。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_history (
+            book_id INTEGER NOT NULL REFERENCES llm_books(id) ON DELETE CASCADE,
+            changed_on TEXT NOT NULL,
+            price INTEGER NOT NULL,
+            PRIMARY KEY (book_id, changed_on)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_price_history_changed_on ON price_history (changed_on, book_id)')
+
+
+def _backfill_price_history(conn: sqlite3.Connection, position: int, chunk_size: int) -> Optional[int]:
+    """
+    以書籍目前的價格作為 id 在 position 之後的一段書籍的第一筆價格歷史（日期為今天）。
+
+    價格 0 表示無法解析價格，與 database.RECORD_PRICE_SQL 相同不記錄。
+    """
+    last_id = conn.execute(
+        'SELECT max(id) FROM (SELECT id FROM llm_books WHERE id > ? ORDER BY id LIMIT ?)',
+        (position, chunk_size)
+    ).fetchone()[0]
+    if last_id is None:
+        return None
+
+    conn.execute('''
+        INSERT OR IGNORE INTO price_history (book_id, changed_on, price)
+        SELECT id, date('now', 'localtime'), price FROM llm_books
+        WHERE id > ? AND id <= ? AND price > 0
+    ''', (position, last_id))
+    return last_id
+
+
+def _add_detail_columns(conn: sqlite3.Connection) -> None:
+    """
+    新增書籍詳細頁的欄位：商品編號、ISBN、出版社、出版日期、頁數與擷取時間。
+
+    enriched_at 為 NULL 表示尚未擷取詳細頁（或作者、商品編號變動後需要重新擷取），
+    部分索引 idx_llm_books_unenriched 只包含這些書籍，找出待擷取的書籍不需掃描整個資料表。
+    """
+    for column, column_type in DETAIL_COLUMNS:
+        if not has_column(conn, 'llm_books', column):
+            conn.execute(f'ALTER TABLE llm_books ADD COLUMN {column} {column_type}')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_books_unenriched ON llm_books (id) WHERE enriched_at IS NULL')
+
+
+def _backfill_product_ids(conn: sqlite3.Connection, position: int, chunk_size: int) -> Optional[int]:
+    """由連結取得 id 在 position 之後的一段書籍的商品編號。"""
+    rows = conn.execute(
+        'SELECT id, link FROM llm_books WHERE id > ? ORDER BY id LIMIT ?', (position, chunk_size)
+    ).fetchall()
+    if not rows:
+        return None
+
+    conn.executemany('UPDATE llm_books SET product_id = ? WHERE id = ? AND product_id IS NULL',
+                     [(parse_product_id(link), book_id) for book_id, link in rows])
+    return rows[-1][0]
+
+
+def _delete_unparsed_prices(conn: sqlite3.Connection) -> None:
+    """刪除價格歷史中價格為 0（無法解析）的紀錄；第 5 版的回填與舊版程式曾將其記錄為價格變動。"""
+    conn.execute('DELETE FROM price_history WHERE price <= 0')
+
+
+# 依版本排序的所有遷移；未使用遷移前建立的資料庫（user_version 為 0）會從第 1 版重新套用，
+# 因為每個 upgrade 都可重複執行，既有的資料表與索引不受影響
+MIGRATIONS: List[Migration] = [
+    Migration(1, '建立 llm_books 與 scrape_state 資料表', _create_base_tables),
+    Migration(2, '建立 book_keywords 關聯表', _create_book_keywords),
+    Migration(3, '建立 llm_books_fts 全文檢索索引', _create_fts, _backfill_fts),
+    Migration(4, '建立 author 與 price 索引', _create_search_indexes),
+    Migration(5, '建立 price_history 價格歷史資料表', _create_price_history, _backfill_price_history),
+    Migration(6, '新增書籍詳細資料欄位（ISBN、出版社、出版日期、頁數）', _add_detail_columns, _backfill_product_ids),
+    Migration(7, '刪除價格歷史中無法解析的價格', _delete_unparsed_prices),
+]
+
+# 全文檢索索引完成回填的版本；低於此版本時搜尋改用 LIKE 比對
+FTS_VERSION = 3
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """
+    取得資料庫目前的結構版本。
+
+    參數:
+        conn: 資料庫連線
+
+    回傳:
+        int: PRAGMA user_version
+    """
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def has_table(conn: sqlite3.Connection, name: str) -> bool:
+    """檢查資料庫中是否有指定名稱的資料表。"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """檢查資料表是否有指定名稱的欄位。"""
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_info({table})'))
+
+
+def migrate(conn: sqlite3.Connection, migrations: Optional[List[Migration]] = None,
+            chunk_size: int = BACKFILL_CHUNK_SIZE, pause: float = BACKFILL_PAUSE) -> int:
+    """
+    依序套用尚未套用的遷移。
+
+    參數:
+        conn: autocommit 模式的資料庫連線（isolation_level=None）
+        migrations: 要套用的遷移列表，預設為 MIGRATIONS
+        chunk_size: 每段回填處理的資料列數
+        pause: 每段回填之間的暫停秒數
+
+    回傳:
+        int: 遷移後的結構版本
+
+    例外:
+        RuntimeError: 資料庫版本比程式支援的版本新
+        sqlite3.Error: 遷移失敗（失敗的遷移已回復，之前的遷移仍保留）
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    latest = migrations[-1].version if migrations else 0
+    version = get_version(conn)
+    if version == latest:
+        return version
+    if version > latest:
+        print(f"資料庫結構版本 {version} 比程式支援的版本 {latest} 新，請更新程式。")
+        raise RuntimeError(f"不支援的資料庫結構版本：{version}")
+
+    # 新資料庫只輸出一行，既有資料庫逐一列出套用的遷移
+    verbose = version > 0 or has_table(conn, 'llm_books')
+    if not verbose:
+        print(f"建立資料庫結構（版本 {latest}）")
+
+    for migration in migrations:
+        if migration.version <= version:
+            continue
+
+        if verbose:
+            print(f"套用資料庫遷移 {migration.version}：{migration.description}")
+        start = time.perf_counter()
+        try:
+            if migration.backfill is None:
+                with _transaction(conn):
+                    migration.upgrade(conn)
+                    _set_version(conn, migration.version)
+            else:
+                with _transaction(conn):
+                    migration.upgrade(conn)
+                _run_backfill(conn, migration, chunk_size, pause)
+                with _transaction(conn):
+                    _clear_progress(conn, migration.version)
+                    _set_version(conn, migration.version)
+        except sqlite3.Error as e:
+            print(f"資料庫遷移 {migration.version} 失敗：{e}")
+            raise
+        if verbose:
+            print(f"資料庫遷移 {migration.version} 完成（{time.perf_counter() - start:.2f} 秒）")
+        version = migration.version
+
+    return version
+
+
+def _run_backfill(conn: sqlite3.Connection, migration: Migration, chunk_size: int, pause: float) -> None:
+    """分段執行回填，每段與回填進度在同一個交易中提交。"""
+    key = BACKFILL_STATE_KEY.format(version=migration.version)
+    row = conn.execute('SELECT value FROM scrape_state WHERE key = ?', (key,)).fetchone()
+    position = int(row[0]) if row else 0
+    chunks = 0
+
+    while True:
+        with _transaction(conn):
+            next_position = migration.backfill(conn, position, chunk_size)
+            if next_position is not None:
+                conn.execute('''
+                    INSERT INTO scrape_state (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                ''', (key, str(next_position)))
+        if next_position is None:
+            break
+        position = next_position
+        chunks += 1
+        if pause:
+            time.sleep(pause)
+
+    if chunks > 1:
+        print(f"  已分 {chunks} 段回填")
+
+
+def _clear_progress(conn: sqlite3.Connection, version: int) -> None:
+    conn.execute('DELETE FROM scrape_state WHERE key = ?', (BACKFILL_STATE_KEY.format(version=version),))
+
+
+def _set_version(conn: sqlite3.Connection, version: int) -> None:
+    conn.execute(f'PRAGMA user_version = {int(version)}')
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """以 BEGIN IMMEDIATE 開始交易，正常結束時提交，發生例外時回復。"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    else:
+        conn.execute('COMMIT')
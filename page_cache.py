@@ -0,0 +1,326 @@
+"""
+頁面快取模組
+
+將下載的搜尋結果頁以 zlib 壓縮後存入本機的 SQLite 檔案，依網址索引：
+- 內容以 SHA-256 定址（objects 資料表），內容相同的頁面只存一份
+- 快取總大小超過 max_bytes 時，淘汰最久未使用的網址（LRU），不再被參照的內容一併刪除
+- 每個網址記錄 ETag / Last-Modified（供條件式請求重新驗證）、div.table-searchbox 片段的雜湊
+  與上次擷取的書籍資料，內容未變動的頁面不需重新擷取
+
+快取也可離線重播：不連線，直接從快取取出頁面重新擷取（例如修改擷取程式後重新處理）。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set
+
+from html_extractor import extract_searchbox_fragment
+
+
+# 快取檔案路徑，可用環境變數 PAGE_CACHE_PATH 指定
+PAGE_CACHE_PATH = os.environ.get(
+    'PAGE_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'books_scraper', 'pages.sqlite3')
+)
+
+# 快取大小上限（位元組，壓縮後），可用環境變數 PAGE_CACHE_MAX_MB 指定
+DEFAULT_MAX_BYTES = int(float(os.environ.get('PAGE_CACHE_MAX_MB', '200')) * 1024 * 1024)
+
+COMPRESSION_LEVEL = 6
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS objects (
+        digest TEXT PRIMARY KEY,
+        data BLOB NOT NULL,
+        size INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS pages (
+        url TEXT PRIMARY KEY,
+        digest TEXT NOT NULL,
+        fragment_hash TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        books BLOB,
+        size INTEGER NOT NULL,
+        fetched_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_pages_accessed_at ON pages(accessed_at);
+    CREATE INDEX IF NOT EXISTS idx_pages_digest ON pages(digest);
+'''
+
+
+class CachedPage:
+    """快取中單一網址的紀錄（不含頁面內容，內容以 PageCache.load() 取得）。"""
+
+    def __init__(self, url: str, digest: str, fragment_hash: Optional[str], etag: Optional[str],
+                 last_modified: Optional[str], books: Optional[List[Dict[str, Any]]]) -> None:
+        self.url = url
+        self.digest = digest
+        self.fragment_hash = fragment_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.books = books
+
+    def revalidation_headers(self) -> Dict[str, str]:
+        """條件式請求的標頭（If-None-Match / If-Modified-Since），伺服器未提供驗證資訊時為空。"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    以網址為鍵、內容定址的壓縮頁面快取（執行緒安全）。
+
+    使用方式：
+        entry = cache.lookup(url)
+        response = client.get(url, entry.revalidation_headers() if entry else None)
+        if response.status == 304:
+            cache.refresh(url)
+        else:
+            cache.store(url, response.text, books, fragment_hash(response.text))
+
+    本次執行中重新驗證為未變動的網址記錄在 was_unchanged()，
+    讓呼叫端決定是否略過該頁的寫入。
+    """
+
+    def __init__(self, path: Optional[str] = PAGE_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        參數:
+            path: 快取檔案路徑，None 表示只保存在記憶體中
+            max_bytes: 快取大小上限（壓縮後的頁面與書籍資料合計）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path or ':memory:', isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._unchanged: Set[str] = set()
+
+    def __enter__(self) -> 'PageCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        """
+        取得網址的快取紀錄，並更新最近使用時間。
+
+        參數:
+            url: 頁面網址
+
+        回傳:
+            Optional[CachedPage]: 快取紀錄，不存在時回傳 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT digest, fragment_hash, etag, last_modified, books FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+
+        digest, fragment_hash, etag, last_modified, books = row
+        return CachedPage(url, digest, fragment_hash, etag, last_modified, _decode_books(books))
+
+    def load(self, url: str) -> Optional[str]:
+        """
+        取得網址快取的頁面 HTML。
+
+        參數:
+            url: 頁面網址
+
+        回傳:
+            Optional[str]: 解壓縮後的 HTML，不存在時回傳 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT objects.data FROM pages JOIN objects ON objects.digest = pages.digest WHERE pages.url = ?',
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def store(self, url: str, html: str, books: Optional[List[Dict[str, Any]]] = None,
+              fragment_hash: Optional[str] = None, etag: Optional[str] = None,
+              last_modified: Optional[str] = None, unchanged: bool = False) -> None:
+        """
+        存入下載的頁面，超過大小上限時淘汰最久未使用的網址。
+
+        參數:
+            url: 頁面網址
+            html: 頁面 HTML
+            books: 由此頁擷取的書籍資料
+            fragment_hash: div.table-searchbox 片段的雜湊（見 fragment_hash()）
+            etag: 回應的 ETag 標頭
+            last_modified: 回應的 Last-Modified 標頭
+            unchanged: 內容是否與快取中的上一版相同（記錄於 was_unchanged()）
+        """
+        content = html.encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()
+        books_blob = _encode_books(books)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self._conn.execute('SELECT 1 FROM objects WHERE digest = ?', (digest,)).fetchone() is None:
+                    data = zlib.compress(content, COMPRESSION_LEVEL)
+                    self._conn.execute('INSERT INTO objects (digest, data, size) VALUES (?, ?, ?)',
+                                       (digest, data, len(data)))
+                previous = self._conn.execute('SELECT digest FROM pages WHERE url = ?', (url,)).fetchone()
+                self._conn.execute('''
+                    INSERT OR REPLACE INTO pages
+                        (url, digest, fragment_hash, etag, last_modified, books, size, fetched_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (url, digest, fragment_hash, etag, last_modified, books_blob,
+                      len(books_blob or b''), now, now))
+                if previous is not None and previous[0] != digest:
+                    self._delete_unreferenced(previous[0])
+                self._evict(keep_url=url)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._mark(url, unchanged)
+
+    def refresh(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                books: Optional[List[Dict[str, Any]]] = None, unchanged: bool = True) -> None:
+        """
+        更新已快取網址的驗證資訊或書籍資料（例如收到 304 Not Modified、或重播時重新擷取）。
+
+        參數:
+            url: 頁面網址
+            etag: 新的 ETag，None 表示不變
+            last_modified: 新的 Last-Modified，None 表示不變
+            books: 新的書籍資料，None 表示不變
+            unchanged: 內容是否與快取中的上一版相同（記錄於 was_unchanged()）
+        """
+        books_blob = _encode_books(books)
+        with self._lock:
+            self._conn.execute('''
+                UPDATE pages SET
+                    etag = COALESCE(?, etag),
+                    last_modified = COALESCE(?, last_modified),
+                    books = COALESCE(?, books),
+                    size = COALESCE(?, size),
+                    fetched_at = ?,
+                    accessed_at = ?
+                WHERE url = ?
+            ''', (etag, last_modified, books_blob, len(books_blob) if books_blob is not None else None,
+                  time.time(), time.time(), url))
+            self._mark(url, unchanged)
+
+    def was_unchanged(self, url: str) -> bool:
+        """
+        本次執行中，網址最近一次重新驗證的結果是否為內容未變動。
+
+        參數:
+            url: 頁面網址
+
+        回傳:
+            bool: 收到 304 或片段雜湊與快取相同時回傳 True
+        """
+        with self._lock:
+            return url in self._unchanged
+
+    def total_bytes(self) -> int:
+        """
+        目前快取的大小（壓縮後的頁面內容與書籍資料合計）。
+
+        回傳:
+            int: 位元組數
+        """
+        with self._lock:
+            return self._total_bytes()
+
+    def clear(self) -> None:
+        """清空快取。"""
+        with self._lock:
+            self._conn.execute('DELETE FROM pages')
+            self._conn.execute('DELETE FROM objects')
+            self._unchanged.clear()
+
+    def close(self) -> None:
+        """關閉快取檔案。"""
+        with self._lock:
+            self._conn.close()
+
+    def _mark(self, url: str, unchanged: bool) -> None:
+        if unchanged:
+            self._unchanged.add(url)
+        else:
+            self._unchanged.discard(url)
+
+    def _total_bytes(self) -> int:
+        objects = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+        pages = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        return objects + pages
+
+    def _evict(self, keep_url: str) -> None:
+        """淘汰最久未使用的網址，直到快取大小不超過上限（剛存入的網址除外）。"""
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        for url, digest, size in self._conn.execute(
+            'SELECT url, digest, size FROM pages WHERE url != ? ORDER BY accessed_at', (keep_url,)
+        ).fetchall():
+            self._conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+            total -= size + self._delete_unreferenced(digest)
+            self._unchanged.discard(url)
+            if total <= self.max_bytes:
+                break
+
+    def _delete_unreferenced(self, digest: str) -> int:
+        """刪除已沒有網址參照的內容，回傳釋放的位元組數。"""
+        if self._conn.execute('SELECT 1 FROM pages WHERE digest = ? LIMIT 1', (digest,)).fetchone():
+            return 0
+        row = self._conn.execute('SELECT size FROM objects WHERE digest = ?', (digest,)).fetchone()
+        if row is None:
+            return 0
+        self._conn.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+        return row[0]
+
+
+def fragment_hash(html: str) -> str:
+    """
+    計算頁面中 div.table-searchbox 片段（搜尋結果區塊）的雜湊。
+
+    頁首、廣告等其他部分變動不影響雜湊；找不到搜尋結果區塊時以整頁計算。
+
+    參數:
+        html: 頁面 HTML
+
+    回傳:
+        str: SHA-256 十六進位字串
+    """
+    fragment = extract_searchbox_fragment(html)
+    return hashlib.sha256((fragment if fragment is not None else html).encode('utf-8')).hexdigest()
+
+
+def _encode_books(books: Optional[List[Dict[str, Any]]]) -> Optional[bytes]:
+    if books is None:
+        return None
+    return zlib.compress(json.dumps(books, ensure_ascii=False).encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def _decode_books(blob: Optional[bytes]) -> Optional[List[Dict[str, Any]]]:
+    if blob is None:
+        return None
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
@@ -0,0 +1,260 @@
+"""
+爬取寫入管線模組
+
+以生產者／消費者佇列串接爬蟲與資料庫：背景執行緒逐頁爬取各關鍵字並放入佇列，
+主執行緒每收到一頁就寫入 SQLite，讓資料庫寫入與下一頁的載入同時進行。
+每頁寫入時一併記錄各關鍵字的檢查點，中斷後再次執行可從最後一個已提交的頁面之後續跑。
+"""
+
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import database
+import http_scraper
+import scraper
+from field_parser import book_key
+from incremental import EarlyStop
+from page_cache import PageCache
+from timing import PhaseTimer
+
+
+# 佇列中最多暫存的頁數（爬蟲領先寫入的頁數上限）
+DEFAULT_QUEUE_SIZE = 4
+
+CHECKPOINT_KEY = 'pipeline_checkpoint'
+
+# 超過此時間的檢查點視為過期，不再續跑
+CHECKPOINT_MAX_AGE = timedelta(hours=12)
+
+# 生產者結束的標記
+_DONE = object()
+
+
+class _ProducerError:
+    """包裝生產者執行緒中發生的例外，交由消費者重新拋出。"""
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def load_checkpoint() -> Optional[Dict[str, Any]]:
+    """
+    讀取尚未完成的爬取進度。
+
+    回傳:
+        Optional[Dict[str, Any]]: 檢查點，包含 keywords（各關鍵字的 page 與 done）、
+        full_crawl 與 updated_at；不存在、格式不符或已過期時回傳 None
+    """
+    value = database.get_state(CHECKPOINT_KEY)
+    if value is None:
+        return None
+
+    try:
+        checkpoint = json.loads(value)
+        updated_at = datetime.fromisoformat(checkpoint['updated_at'])
+        if not isinstance(checkpoint['keywords'], dict):
+            return None
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    if datetime.now() - updated_at > CHECKPOINT_MAX_AGE:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(progress: Dict[str, Dict[str, Any]], full_crawl: bool) -> None:
+    """
+    記錄各關鍵字最後一個已寫入資料庫的頁碼。
+
+    參數:
+        progress: 各關鍵字的進度，{關鍵字: {'page': 已寫入的頁碼, 'done': 是否已爬完}}
+        full_crawl: 本次是否為完整爬取
+    """
+    database.set_state(CHECKPOINT_KEY, json.dumps({
+        'keywords': progress,
+        'full_crawl': full_crawl,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }, ensure_ascii=False))
+
+
+def clear_checkpoint() -> None:
+    """清除爬取進度（爬取完成時呼叫）。"""
+    database.set_state(CHECKPOINT_KEY, None)
+
+
+def run_pipeline(engine: str = scraper.ENGINE_AUTO,
+                 timer: Optional[PhaseTimer] = None,
+                 early_stop: Optional[EarlyStop] = None,
+                 full_crawl: bool = True,
+                 resume: bool = True,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 keywords: Optional[List[str]] = None,
+                 max_keyword_workers: int = scraper.DEFAULT_KEYWORD_WORKERS,
+                 page_cache: Optional[PageCache] = None,
+                 url_template: str = http_scraper.SEARCH_URL_TEMPLATE) -> Dict[str, int]:
+    """
+    邊爬取邊寫入資料庫。
+
+    背景執行緒以 scraper.iter_scrape_pages 逐頁爬取各關鍵字（最多同時 max_keyword_workers 個，
+    共用 HTTP 用戶端與瀏覽器工作階段池）並放入有上限的佇列；
+    目前執行緒逐頁取出，在同一個交易中寫入書籍、關鍵字關聯與檢查點。
+
+    同一次執行中已寫入過的書籍（依商品編號比較，不看連結中的排名參數）不再重複寫入，
+    只在 book_keywords 記錄新的關鍵字。
+    全部關鍵字處理完後清除檢查點；中途失敗時保留檢查點，下次執行各關鍵字從下一頁續跑，
+    已爬完的關鍵字不再重爬。
+
+    提供 page_cache 時，內容與快取相同且資料庫已有相同資料的頁面（爬蟲產出空列表）不寫入資料庫，
+    只推進記憶體中的進度，下一個寫入的頁面或關鍵字完成時一併記錄於檢查點。
+
+    參數:
+        engine: 爬蟲引擎（'auto'、'http'、'selenium' 或 'cache'）
+        timer: 各階段耗時紀錄器
+        early_stop: 增量模式的提前停止判斷（每個關鍵字使用各自的複本）
+        full_crawl: 本次是否為完整爬取（記錄於檢查點）
+        resume: 是否從未完成的檢查點續跑
+        queue_size: 佇列中最多暫存的頁數
+        keywords: 搜尋關鍵字列表，預設為 ['LLM']
+        max_keyword_workers: 同時爬取的關鍵字數上限
+        page_cache: 頁面快取（http 引擎重新驗證頁面；cache 引擎從快取重播時必須提供）
+        url_template: http 與 cache 引擎的搜尋結果頁網址樣板（測試時可指向本機伺服器）
+
+    回傳:
+        Dict[str, int]: 執行結果，包含 full_crawl（續跑時以檢查點為準）、keywords（本次爬取的關鍵字數）、
+        pages、scraped、duplicates（跨關鍵字重複的連結數）、inserted、updated、unchanged、
+        skipped_pages（內容未變動而略過寫入的頁數）
+    """
+    timer = timer or PhaseTimer()
+    keywords = scraper.normalize_keywords(keywords)
+    progress = {keyword: {'page': 0, 'done': False} for keyword in keywords}
+
+    checkpoint = load_checkpoint() if resume else None
+    if checkpoint is not None:
+        full_crawl = checkpoint.get('full_crawl', full_crawl)
+        if full_crawl:
+            early_stop = None
+        for keyword in keywords:
+            saved = checkpoint['keywords'].get(keyword)
+            if saved:
+                progress[keyword] = {'page': int(saved.get('page', 0)), 'done': bool(saved.get('done'))}
+                state = '已完成' if progress[keyword]['done'] else f"自第 {progress[keyword]['page'] + 1} 頁開始"
+                print(f"從上次中斷的進度續跑「{keyword}」：{state}。")
+
+    pending = [keyword for keyword in keywords if not progress[keyword]['done']]
+    summary = {'full_crawl': full_crawl, 'keywords': len(pending), 'pages': 0, 'scraped': 0,
+               'duplicates': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped_pages': 0}
+
+    pages: queue.Queue = queue.Queue(maxsize=max(queue_size, 1))
+    stop = threading.Event()
+    workers = max(1, min(max_keyword_workers, len(pending)))
+
+    with scraper.shared_http_client(engine, http_scraper.DEFAULT_MAX_WORKERS,
+                                    http_scraper.DEFAULT_REQUESTS_PER_SECOND, workers) as client:
+
+        def produce(keyword: str) -> None:
+            page_iter = scraper.iter_scrape_pages(
+                engine=engine, timer=timer,
+                early_stop=early_stop.copy() if early_stop is not None else None,
+                start_page=progress[keyword]['page'] + 1,
+                keyword=keyword, client=client, page_cache=page_cache,
+                count_changes=database.count_new_or_changed if page_cache is not None else None,
+                url_template=url_template
+            )
+            try:
+                for page_num, page_books in page_iter:
+                    if not _put(pages, (keyword, page_num, page_books), stop):
+                        return
+                _put(pages, (keyword, _DONE, None), stop)
+            except BaseException as e:
+                _put(pages, _ProducerError(e), stop)
+            finally:
+                page_iter.close()
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scrape-producer')
+        for keyword in pending:
+            executor.submit(produce, keyword)
+
+        try:
+            seen_links: Dict[str, str] = {}
+            remaining = len(pending)
+            while remaining:
+                item = pages.get()
+                if isinstance(item, _ProducerError):
+                    raise item.error
+
+                keyword, page_num, page_books = item
+                if page_num is _DONE:
+                    remaining -= 1
+                    progress[keyword]['done'] = True
+                    if remaining:
+                        save_checkpoint(progress, full_crawl)
+                    continue
+
+                progress[keyword]['page'] = page_num
+                if not page_books:
+                    summary['skipped_pages'] += 1
+                    continue
+
+                new_books, duplicates = _split_duplicates(keyword, page_books, seen_links)
+                with timer.phase('db_write', page_num):
+                    with database.transaction():
+                        result = database.insert_books(new_books)
+                        database.add_book_keywords(duplicates)
+                        save_checkpoint(progress, full_crawl)
+
+                summary['pages'] += 1
+                summary['scraped'] += len(page_books)
+                summary['duplicates'] += len(duplicates)
+                for key in ('inserted', 'updated', 'unchanged'):
+                    summary[key] += result[key]
+
+            clear_checkpoint()
+
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    return summary
+
+
+def _split_duplicates(keyword: str, page_books: List[Dict[str, Any]],
+                      seen_links: Dict[str, str]) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+    """
+    依商品編號（field_parser.book_key）區分本次執行中第一次出現的書籍與重複的書籍；
+    各關鍵字的搜尋結果中同一本書的連結排名參數不同，因此不以連結比較。
+
+    參數:
+        keyword: 搜尋到這些書籍的關鍵字
+        page_books: 該頁書籍資料
+        seen_links: 本次執行中已寫入的 {book_key: 書名}，會被更新
+
+    回傳:
+        Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+        (需寫入的書籍（含 keywords 欄位）, 重複書籍的 (書名, 關鍵字) 列表)
+    """
+    new_books = []
+    duplicates = []
+    for book in page_books:
+        key = book_key(book['link'])
+        title = seen_links.get(key)
+        if title is None:
+            seen_links[key] = book['title']
+            new_books.append(dict(book, keywords=[keyword]))
+        else:
+            duplicates.append((title, keyword))
+    return new_books, duplicates
+
+
+def _put(pages: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """放入佇列；消費者已停止時放棄並回傳 False。"""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
@@ -0,0 +1,91 @@
+"""
+效能分析模組
+
+以 cProfile（CPU 時間）與 tracemalloc（記憶體配置）包住一段程式，
+結束後輸出最耗時的函式與配置最多記憶體的程式行，並將 cProfile 結果存檔，
+可用 python -m pstats 或 snakeviz 等工具進一步檢視。
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+
+# cProfile 結果的輸出目錄
+PROFILE_DIR = 'profiles'
+
+# 報告中列出的項目數
+DEFAULT_TOP = 20
+
+
+@contextmanager
+def profiled(name: str = 'profile', cpu: bool = True, memory: bool = False,
+             output_dir: Optional[str] = PROFILE_DIR, top: int = DEFAULT_TOP) -> Iterator[None]:
+    """
+    分析 with 區塊內的 CPU 時間與記憶體配置；cpu 與 memory 皆為 False 時不做任何事。
+
+    參數:
+        name: 輸出檔名的前綴
+        cpu: 是否以 cProfile 分析 CPU 時間
+        memory: 是否以 tracemalloc 分析記憶體配置
+        output_dir: cProfile 結果（.prof）的輸出目錄，None 表示不存檔
+        top: 報告中列出的項目數
+    """
+    if not cpu and not memory:
+        yield
+        return
+
+    profiler = cProfile.Profile() if cpu else None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    memory_before = None
+    if memory:
+        memory_before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        # 先取記憶體快照，避免計入產生 CPU 報告時的配置
+        if memory:
+            _report_memory(memory_before, top)
+            if started_tracing:
+                tracemalloc.stop()
+        if profiler is not None:
+            _report_cpu(profiler, name, output_dir, top)
+
+
+def _report_cpu(profiler: cProfile.Profile, name: str, output_dir: Optional[str], top: int) -> None:
+    """輸出累計耗時最多的函式，並將結果存檔。"""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    print(f"CPU 分析（依累計時間排序，前 {top} 項）：")
+    print(stream.getvalue())
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(output_dir, f'{name}-{stamp}.prof')
+        stats.dump_stats(path)
+        print(f"cProfile 結果已寫入 {path}")
+
+
+def _report_memory(before: tracemalloc.Snapshot, top: int) -> None:
+    """輸出與開始時相比，配置記憶體增加最多的程式行與峰值。"""
+    after = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    print(f"記憶體分析：目前 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB；"
+          f"增加最多的前 {top} 行：")
+    for stat in after.compare_to(before, 'lineno')[:top]:
+        print(f"  {stat}")
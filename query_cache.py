@@ -0,0 +1,127 @@
+"""
+查詢結果快取模組
+
+在程式內以 LRU 保存最近的查詢結果，並以筆數上限與存活時間（TTL）限制。
+快取以「世代」判斷是否過期：資料庫每次寫入後呼叫 invalidate() 讓世代遞增，
+舊世代的結果全部作廢，查詢期間發生寫入時該次結果也不會被存入。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+# 預設最多保存的查詢結果數
+DEFAULT_MAX_SIZE = 128
+
+# 預設每筆結果的存活時間（秒）
+DEFAULT_TTL = 300.0
+
+
+class QueryCache:
+    """
+    具筆數上限與 TTL 的 LRU 快取（執行緒安全）。
+
+    使用方式：
+        generation = cache.generation
+        hit, value = cache.get(key)
+        if not hit:
+            value = run_query()
+            cache.put(key, value, generation)
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL) -> None:
+        """
+        參數:
+            max_size: 最多保存的結果數（0 表示停用快取）
+            ttl: 每筆結果的存活時間（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Optional[Any]]:
+        """
+        讀取快取的結果。
+
+        參數:
+            key: 快取鍵
+
+        回傳:
+            Tuple[bool, Optional[Any]]: (是否命中, 快取的結果)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """
+        存入查詢結果。
+
+        若查詢開始後資料庫已有寫入（世代已改變），結果可能是舊資料，不會被存入。
+
+        參數:
+            key: 快取鍵
+            value: 查詢結果
+            generation: 查詢開始前讀取的 generation
+        """
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            if generation != self.generation:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """作廢所有快取的結果（資料庫寫入後呼叫）。"""
+        with self._lock:
+            self.generation += 1
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        回傳快取統計，用於調整快取大小與 TTL。
+
+        回傳:
+            Dict[str, int]: 包含 size、max_size、hits、misses、evictions（超過上限被淘汰）、
+            expirations（超過 TTL）、invalidations（因寫入而清空的次數）
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
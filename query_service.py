@@ -0,0 +1,365 @@
+"""
+唯讀查詢服務模組
+
+以標準函式庫 asyncio 提供本機 HTTP/JSON 查詢服務，其他程式不需透過互動式選單即可查詢書目：
+- GET /books?title=&author=&min_price=&max_price=&sort=&desc=&limit=&offset=：條件查詢（database.query_books）
+- GET /search/title?q=...、/search/author?q=...：依相關度排序的書名／作者搜尋
+- GET /history?title=...：書籍的價格歷史與最高／最低價
+- GET /health：服務狀態；GET /stats：指標與查詢結果快取的統計
+
+事件迴圈只負責解析請求與寫出回應，查詢交給固定數量的工作執行緒，
+每個執行緒保留一條以 mode=ro URI 開啟的唯讀連線（database.configure(read_only=True)），
+因此服務不會寫入資料庫，也不會阻擋爬蟲更新；其他程序寫入後查詢結果快取自動作廢。
+同時處理中的請求達到 max_in_flight 時立即回應 503（不排隊），
+查詢超過 timeout 秒時回應 504 並中斷該查詢。
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http import HTTPStatus
+from itertools import count
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import database
+import metrics
+import migrations
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+
+# 執行查詢的工作執行緒數（每個執行緒一條唯讀連線）
+DEFAULT_WORKERS = 4
+
+# 同時處理中（執行或等待工作執行緒）的請求數上限，超過時回應 503
+DEFAULT_MAX_IN_FLIGHT = 64
+
+# 單一查詢的逾時秒數，超過時回應 504 並中斷查詢
+DEFAULT_TIMEOUT = 5.0
+
+# keep-alive 連線閒置多久後關閉（秒）
+KEEP_ALIVE_TIMEOUT = 30.0
+
+# /books 與 /search 未指定 limit 時回傳的筆數，以及 limit 的上限
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# 請求標頭的大小上限（位元組）
+MAX_HEADER_SIZE = 16 * 1024
+
+Handler = Callable[[Dict[str, str]], Any]
+
+
+def query_books(params: Dict[str, str]) -> Dict[str, Any]:
+    """GET /books：依書名、作者與價格範圍查詢，可排序與分頁。"""
+    limit = _int_param(params, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    offset = _int_param(params, 'offset', 0, 0)
+    rows = database.query_books(
+        title=params.get('title') or None,
+        author=params.get('author') or None,
+        min_price=_int_param(params, 'min_price'),
+        max_price=_int_param(params, 'max_price'),
+        sort=params.get('sort', 'title'),
+        descending=params.get('desc', '0') in ('1', 'true'),
+        limit=limit,
+        offset=offset,
+    )
+    return {'count': len(rows), 'offset': offset, 'books': [dict(row) for row in rows]}
+
+
+def search_title(params: Dict[str, str]) -> Dict[str, Any]:
+    """GET /search/title：依書名關鍵字搜尋，結果依相關度排序。"""
+    return _search(database.search_by_title, params)
+
+
+def search_author(params: Dict[str, str]) -> Dict[str, Any]:
+    """GET /search/author：依作者關鍵字搜尋，結果依相關度排序。"""
+    return _search(database.search_by_author, params)
+
+
+def price_history(params: Dict[str, str]) -> Dict[str, Any]:
+    """GET /history：書籍的價格歷史與最高／最低價（書名需完全相同）。"""
+    title = _required_param(params, 'title')
+    return {
+        'title': title,
+        'range': database.get_price_range(title),
+        'history': [dict(row) for row in database.get_price_history(title)],
+    }
+
+
+# 路徑與對應的查詢函式（在工作執行緒中執行）
+ROUTES: Dict[str, Handler] = {
+    '/books': query_books,
+    '/search/title': search_title,
+    '/search/author': search_author,
+    '/history': price_history,
+}
+
+
+def _search(search: Callable[[str], Any], params: Dict[str, str]) -> Dict[str, Any]:
+    keyword = _required_param(params, 'q')
+    limit = _int_param(params, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    rows = search(keyword)
+    return {'total': len(rows), 'books': [dict(row) for row in rows[:limit]]}
+
+
+def _required_param(params: Dict[str, str], name: str) -> str:
+    value = params.get(name, '').strip()
+    if not value:
+        raise ValueError(f"缺少參數 {name}")
+    return value
+
+
+def _int_param(params: Dict[str, str], name: str, default: Optional[int] = None,
+               minimum: Optional[int] = None, maximum: Optional[int] = None) -> Optional[int]:
+    value = params.get(name, '')
+    if value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"參數 {name} 必須是整數：{value}") from None
+    if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+        raise ValueError(f"參數 {name} 必須介於 {minimum} 與 {maximum} 之間：{number}")
+    return number
+
+
+class QueryService:
+    """
+    唯讀 HTTP/JSON 查詢服務。
+
+    使用方式：
+        service = QueryService('books.db', port=8080)
+        await service.start()
+        await service.serve_forever()
+    """
+
+    def __init__(self, db_path: Optional[str] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 workers: int = DEFAULT_WORKERS, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 timeout: float = DEFAULT_TIMEOUT) -> None:
+        """
+        參數:
+            db_path: 資料庫檔案路徑，未指定時使用 database.DB_PATH
+            host: 監聽的位址
+            port: 監聽的連接埠（0 表示由系統指定，啟動後可由 port 屬性取得）
+            workers: 執行查詢的工作執行緒數（每個執行緒一條唯讀連線）
+            max_in_flight: 同時處理中的請求數上限
+            timeout: 單一查詢的逾時秒數
+        """
+        self.db_path = db_path or database.DB_PATH
+        self.host = host
+        self.port = port
+        self.workers = max(workers, 1)
+        self.max_in_flight = max(max_in_flight, 1)
+        self.timeout = timeout
+        self.in_flight = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_config: Optional[Tuple[str, bool]] = None
+        self._tokens = count()
+        self._running: Dict[int, sqlite3.Connection] = {}  # 執行中的請求與其使用的連線，逾時時用來中斷查詢
+        self._running_lock = threading.Lock()
+
+    async def start(self) -> None:
+        """
+        以唯讀模式開啟資料庫並開始監聽。
+
+        例外:
+            sqlite3.Error: 資料庫不存在或無法開啟
+            RuntimeError: 資料庫結構不是最新版本（請先以 python app.py 初始化或更新資料庫）
+        """
+        self._loop = asyncio.get_running_loop()
+        self._previous_config = (database.DB_PATH, database.READ_ONLY)
+        database.configure(self.db_path, read_only=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='query')
+        try:
+            version = await self._loop.run_in_executor(self._executor, self._schema_version)
+            if version < migrations.LATEST_VERSION:
+                raise RuntimeError(f"資料庫結構版本 {version} 早於 {migrations.LATEST_VERSION}，"
+                                   f"請先執行 python app.py 初始化資料庫")
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                      limit=MAX_HEADER_SIZE)
+        except (sqlite3.Error, RuntimeError, OSError) as e:
+            print(f"查詢服務啟動失敗：{e}")
+            await self.close()
+            raise
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """持續處理請求，直到被取消。"""
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """停止監聽、等待執行中的查詢結束並關閉唯讀連線，恢復原本的資料庫設定。"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._previous_config is not None:
+            database.configure(*self._previous_config)
+            self._previous_config = None
+
+    async def handle(self, method: str, target: str) -> Tuple[int, Dict[str, Any]]:
+        """
+        處理單一請求。
+
+        參數:
+            method: HTTP 方法
+            target: 請求的路徑與查詢字串，例如 /books?title=LLM&limit=10
+
+        回傳:
+            Tuple[int, Dict[str, Any]]: (HTTP 狀態碼, 回應的 JSON 物件)
+        """
+        url = urlsplit(target)
+        if url.path == '/health':
+            return HTTPStatus.OK, {'status': 'ok', 'in_flight': self.in_flight,
+                                   'max_in_flight': self.max_in_flight, 'workers': self.workers}
+        if url.path == '/stats':
+            return HTTPStatus.OK, {'metrics': metrics.snapshot(), 'query_cache': database.get_query_cache_stats()}
+
+        handler = ROUTES.get(url.path)
+        if handler is None:
+            return HTTPStatus.NOT_FOUND, {'error': f"找不到路徑：{url.path}"}
+        if method not in ('GET', 'HEAD'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"不支援的方法：{method}"}
+        if self.in_flight >= self.max_in_flight:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': '同時處理的請求過多，請稍後再試'}
+
+        # 計數在工作執行緒真正結束（或排隊中被取消）時才減少，逾時但仍在執行的查詢也佔用名額
+        self.in_flight += 1
+        token = next(self._tokens)
+        future = self._executor.submit(self._run, handler, dict(parse_qsl(url.query)), token)
+        future.add_done_callback(self._release)
+        try:
+            return HTTPStatus.OK, await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._interrupt(token)
+            return HTTPStatus.GATEWAY_TIMEOUT, {'error': f"查詢超過 {self.timeout:g} 秒"}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"查詢失敗：{e}"}
+
+    def _run(self, handler: Handler, params: Dict[str, str], token: int) -> Any:
+        """在工作執行緒中以該執行緒的唯讀連線執行查詢。"""
+        with self._running_lock:
+            self._running[token] = database.get_connection()
+        try:
+            return handler(params)
+        finally:
+            with self._running_lock:
+                del self._running[token]
+
+    def _interrupt(self, token: int) -> None:
+        with self._running_lock:
+            conn = self._running.get(token)
+            if conn is not None:
+                conn.interrupt()
+
+    def _release(self, future: Future) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            pass  # 事件迴圈已關閉
+
+    def _decrement(self) -> None:
+        self.in_flight -= 1
+
+    @staticmethod
+    def _schema_version() -> int:
+        return migrations.get_version(database.get_connection())
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """處理一條連線上的請求（HTTP/1.1 keep-alive，依序回應）。"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                    break
+
+                start = time.perf_counter()
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.split(' ')
+                if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+                    status, body = HTTPStatus.BAD_REQUEST, {'error': '無法解析的請求'}
+                    method, target, version = 'GET', '/', 'HTTP/1.0'
+                else:
+                    method, target, version = parts
+                    length = int(headers.get('content-length') or 0)
+                    if length:
+                        await reader.readexactly(length)  # 查詢不使用請求內容
+                    status, body = await self.handle(method, target)
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                writer.write(_build_response(status, body, keep_alive, include_body=method != 'HEAD'))
+                await writer.drain()
+
+                route = urlsplit(target).path
+                route = route if route in ROUTES or route in ('/health', '/stats') else 'other'
+                metrics.inc('service_requests_total', route=route, status=int(status))
+                metrics.observe('service_request_seconds', time.perf_counter() - start, route=route)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def _build_response(status: int, body: Any, keep_alive: bool, include_body: bool = True) -> bytes:
+    status = HTTPStatus(status)
+    content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    headers = [
+        f'HTTP/1.1 {status.value} {status.phrase}',
+        'Content-Type: application/json; charset=utf-8',
+        f'Content-Length: {len(content)}',
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if status == HTTPStatus.SERVICE_UNAVAILABLE:
+        headers.append('Retry-After: 1')
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + (content if include_body else b'')
+
+
+def serve(db_path: Optional[str] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          workers: int = DEFAULT_WORKERS, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+          timeout: float = DEFAULT_TIMEOUT) -> None:
+    """
+    啟動查詢服務並持續執行，直到按下 Ctrl+C。
+
+    參數與 QueryService 相同。
+
+    例外:
+        sqlite3.Error: 資料庫不存在或無法開啟
+        RuntimeError: 資料庫結構不是最新版本
+        OSError: 無法監聽指定的位址或連接埠
+    """
+    async def run() -> None:
+        service = QueryService(db_path, host, port, workers, max_in_flight, timeout)
+        await service.start()
+        print(f"查詢服務已啟動：http://{host}:{service.port}/（{service.workers} 個工作執行緒，"
+              f"同時處理上限 {service.max_in_flight}，逾時 {service.timeout:g} 秒）", flush=True)
+        try:
+            await service.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n查詢服務已停止。")
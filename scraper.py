@@ -1,361 +1,266 @@
 """
 網頁爬蟲模組
+
+依爬蟲引擎分派到 http_scraper（HTTP）或 selenium_scraper（瀏覽器）。
+selenium_scraper 與 selenium 只在實際以瀏覽器爬取時才載入，
+只查詢資料庫或只使用 HTTP 引擎時不需付出載入 selenium 的時間。
 """
 
-import re
-import time
-from typing import List, Dict, Any
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from http_client import HttpClient
+from page_cache import PageCache
+from incremental import EarlyStop
+from field_parser import book_key
+from timing import PhaseTimer
+import http_scraper
+
+
+# 頁面解析模式：html 為一次取回 HTML 後在本機解析，dom 為逐一查詢 WebDriver 元素
+PARSE_MODE_HTML = 'html'
+PARSE_MODE_DOM = 'dom'
 
+# 爬蟲引擎：http 直接下載頁面，selenium 以瀏覽器操作，auto 先用 http 失敗時改用 selenium，
+# cache 不連線，從頁面快取重播已下載的頁面
+ENGINE_AUTO = 'auto'
+ENGINE_HTTP = 'http'
+ENGINE_SELENIUM = 'selenium'
+ENGINE_CACHE = 'cache'
+ENGINES = (ENGINE_AUTO, ENGINE_HTTP, ENGINE_SELENIUM, ENGINE_CACHE)
 
-def scrape_books() -> List[Dict[str, Any]]:
+# 同時爬取的關鍵字數上限
+DEFAULT_KEYWORD_WORKERS = 2
+
+
+def scrape_books(parse_mode: str = PARSE_MODE_HTML, engine: str = ENGINE_AUTO,
+                 max_workers: int = http_scraper.DEFAULT_MAX_WORKERS,
+                 requests_per_second: float = http_scraper.DEFAULT_REQUESTS_PER_SECOND,
+                 timer: Optional[PhaseTimer] = None,
+                 early_stop: Optional[EarlyStop] = None,
+                 keywords: Optional[List[str]] = None,
+                 max_keyword_workers: int = DEFAULT_KEYWORD_WORKERS,
+                 page_cache: Optional[PageCache] = None,
+                 url_template: str = http_scraper.SEARCH_URL_TEMPLATE) -> List[Dict[str, Any]]:
     """
-    從博客來網站爬取搜尋關鍵字「LLM」的所有書籍資料。
+    從博客來網站爬取一個或多個搜尋關鍵字的所有書籍資料。
+    
+    爬蟲引擎：
+    - http：直接組出搜尋結果頁網址，以 keep-alive 連線下載並解析 HTML，不需啟動瀏覽器
+    - selenium：以 headless Chrome 模擬使用者操作
+    - auto（預設）：先使用 http，發生錯誤或沒有取得任何書籍時改用 selenium
+    - cache：不連線，從 page_cache 重播已下載的頁面並重新擷取
     
-    操作流程：
-    1. 開啟博客來首頁
-    2. 在搜尋框輸入 "LLM"
-    3. 提交搜尋
-    4. 點選「圖書」分類
-    5. 爬取所有分頁的書籍資料
+    多個關鍵字同時爬取（最多 max_keyword_workers 個），共用同一個 HTTP 用戶端
+    （連線池與請求頻率限制）與瀏覽器工作階段池；結果依連結去除重複。
     
     爬取資料包含：
     - title: 書名
     - author: 作者
-    - price: 價格（整數）
+    - price: 價格（整數，與 sale_price 相同，無法解析時為 0）
+    - list_price / discount / sale_price: 定價、折扣（79 折為 79）與售價，無法解析時為 None
     - link: 書籍連結
+    - keywords: 搜尋到此書的關鍵字列表
+    
+    需要逐頁處理（例如邊爬邊寫入資料庫）時，請改用 iter_scrape_pages()。
+    
+    參數:
+        parse_mode: selenium 引擎的頁面解析模式，'html'（預設）或 'dom'
+        engine: 爬蟲引擎，'auto'（預設）、'http'、'selenium' 或 'cache'
+        max_workers: http 引擎每個關鍵字同時下載的頁面數上限
+        requests_per_second: http 引擎對同一主機每秒最多發出的請求數（所有關鍵字合計）
+        timer: 各階段耗時紀錄器；傳入後可在爬取結束時以 timer.report() 取得耗時報告
+            （回傳值維持書籍列表以相容既有呼叫端，耗時報告不放在回傳值中；
+            app.py 的 update 將報告放在輸出摘要的 timing 欄位）
+        early_stop: 增量模式的提前停止判斷，連續數頁沒有新書或異動時停止翻頁
+            （多個關鍵字時，每個關鍵字使用各自的複本）
+        keywords: 搜尋關鍵字列表，預設為 ['LLM']
+        max_keyword_workers: 同時爬取的關鍵字數上限
+        page_cache: 頁面快取；http 引擎以它重新驗證頁面，內容未變動時沿用快取的書籍資料，cache 引擎必須提供
+        url_template: http 與 cache 引擎的搜尋結果頁網址樣板（包含 {keyword} 與 {page}，測試時可指向本機伺服器）；
+            selenium 引擎從首頁操作搜尋，不使用此樣板
     
     回傳:
         List[Dict[str, Any]]: 書籍資料列表
     """
-    # 博客來首頁
-    homepage_url = 'https://www.books.com.tw/'
+    keywords = normalize_keywords(keywords)
     
-    # 設定 Chrome 選項
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')  # 無頭模式
-    options.add_argument('--disable-gpu')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--window-size=1920,1080')
+    def scrape_keyword(keyword: str, client: Optional[HttpClient]) -> List[Dict[str, Any]]:
+        books = []
+        keyword_stop = early_stop.copy() if early_stop is not None and len(keywords) > 1 else early_stop
+        for _, page_books in iter_scrape_pages(parse_mode, engine, max_workers, requests_per_second,
+                                               timer, keyword_stop, keyword=keyword, client=client,
+                                               page_cache=page_cache, url_template=url_template):
+            books.extend(page_books)
+        return books
     
-    books = []
+    with shared_http_client(engine, max_workers, requests_per_second,
+                            min(max_keyword_workers, len(keywords))) as client:
+        if len(keywords) == 1:
+            results = [scrape_keyword(keywords[0], client)]
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_keyword_workers, len(keywords)))) as executor:
+                results = list(executor.map(lambda keyword: scrape_keyword(keyword, client), keywords))
     
+    return dedupe_books(zip(keywords, results))
+
+
+def iter_scrape_pages(parse_mode: str = PARSE_MODE_HTML, engine: str = ENGINE_AUTO,
+                      max_workers: int = http_scraper.DEFAULT_MAX_WORKERS,
+                      requests_per_second: float = http_scraper.DEFAULT_REQUESTS_PER_SECOND,
+                      timer: Optional[PhaseTimer] = None,
+                      early_stop: Optional[EarlyStop] = None,
+                      start_page: int = 1,
+                      keyword: str = http_scraper.DEFAULT_KEYWORD,
+                      client: Optional[HttpClient] = None,
+                      page_cache: Optional[PageCache] = None,
+                      count_changes: Optional[Callable[[List[Dict[str, Any]]], int]] = None,
+                      url_template: str = http_scraper.SEARCH_URL_TEMPLATE
+                      ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    逐頁爬取單一搜尋關鍵字的書籍資料，每擷取完一頁就產出該頁結果。
+    
+    參數與 scrape_books 相同。auto 引擎只有在 http 尚未產出任何頁面前失敗時，
+    才會改用 selenium；已產出部分頁面後的錯誤會直接拋出，
+    呼叫端可依已處理的頁碼以 start_page 續跑。
+    
+    參數:
+        start_page: 從第幾頁開始產出（用於中斷後續跑）
+        keyword: 搜尋關鍵字
+        client: 共用的 HTTP 用戶端（見 shared_http_client），未提供時自行建立
+        page_cache: 頁面快取（http 與 cache 引擎使用）
+        count_changes: 與 page_cache 一起提供時，內容未變動且資料庫已有相同資料的頁面產出空列表
+            （見 http_scraper.iter_pages_http）
+        url_template: http 與 cache 引擎的搜尋結果頁網址樣板（見 scrape_books）
+    
+    回傳:
+        Iterator[Tuple[int, List[Dict[str, Any]]]]: (頁碼, 該頁書籍資料)
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"不支援的爬蟲引擎：{engine}")
+    
+    if engine == ENGINE_CACHE:
+        if page_cache is None:
+            raise ValueError("cache 引擎需要提供 page_cache")
+        yield from http_scraper.iter_pages_cached(page_cache, keyword, url_template, timer=timer,
+                                                  early_stop=early_stop, start_page=start_page)
+        return
+    
+    if engine == ENGINE_SELENIUM:
+        yield from _iter_pages_selenium(parse_mode, timer, early_stop, start_page, keyword)
+        return
+    
+    produced = False
     try:
-        driver = webdriver.Chrome(options=options)
-        
-        driver.get(homepage_url)
-        time.sleep(2)
-        
-        try:
-            search_box = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.ID, "key"))
-            )
-            search_box.clear()
-            search_box.send_keys("LLM")
-            search_box.send_keys(Keys.RETURN)
-            time.sleep(3)
-            
-        except TimeoutException:
-            search_box = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'input[name="key"]'))
-            )
-            search_box.clear()
-            search_box.send_keys('LLM')
-            search_box.submit()
-            time.sleep(3)
-        
-        # 點選「圖書」分類
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.mod_b, div.searchbook, div.mod"))
-        )
-        
-        book_category = None
-        category_selectors = [
-            "//label[contains(text(), '圖書') and (contains(text(), '(') or contains(text(), ')'))]",
-            "//span[contains(text(), '圖書') and (contains(text(), '(') or contains(text(), ')'))]",
-            "//a[contains(text(), '圖書') and (contains(text(), '(') or contains(text(), ')'))]",
-            "//input[@value='BKA']/../label",
-            "//input[@name='cat' and @value='BKA']/../label",
-            "//*[contains(text(), '圖書') and contains(text(), '(')]"
-        ]
-        
-        for selector in category_selectors:
-            try:
-                elements = driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed() and element.is_enabled():
-                        text = element.text.strip()
-                        if '圖書' in text and ('(' in text or ')' in text):
-                            book_category = element
-                            break
-                if book_category:
-                    break
-            except Exception:
-                continue
-        
-        if book_category:
-            try:
-                driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", book_category)
-                time.sleep(1)
-                
-                try:
-                    book_category.click()
-                except Exception:
-                    driver.execute_script("arguments[0].click();", book_category)
-                
-                time.sleep(3)
-                
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.table-searchbox"))
-                )
-                
-            except Exception:
-                pass
-        
-        # 偵測總頁數
-        page_count = 1
-        try:
-            pagination = driver.find_elements(By.CSS_SELECTOR, 'div.mod_pagination a, div.cnt_page a, ul.pagination a, .page_bar a')
-            
-            if pagination:
-                page_numbers = []
-                for elem in pagination:
-                    text = elem.text.strip()
-                    if text.isdigit():
-                        page_numbers.append(int(text))
-                if page_numbers:
-                    page_count = max(page_numbers)
-            
-            if page_count == 1:
-                page_text_elements = driver.find_elements(By.XPATH, "//*[contains(text(), '共') and contains(text(), '頁')]")
-                for elem in page_text_elements:
-                    match = re.search(r'共\s*(\d+)\s*頁', elem.text)
-                    if match:
-                        page_count = int(match.group(1))
-                        break
-            
-            if page_count == 1:
-                result_text = driver.find_elements(By.XPATH, "//*[contains(text(), '搜尋結果共')]")
-                for elem in result_text:
-                    match = re.search(r'頁數\s*\d+\s*/\s*(\d+)', elem.text)
-                    if match:
-                        page_count = int(match.group(1))
-                        break
-                        
-        except Exception:
-            page_count = 1
-        
-        print(f"偵測到總共有 {page_count} 頁。")
-        
-        page_num = 1
-        
-        while page_num <= page_count:
-            print(f"正在爬取第 {page_num} / {page_count} 頁...")
-            
-            try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div.table-searchbox'))
-                )
-            except TimeoutException:
-                print(f"第 {page_num} 頁載入逾時，跳過。")
-                break
-            
-            page_books = extract_books_from_page(driver)
-            books.extend(page_books)
-            
-            if len(page_books) == 0:
-                print("當前頁面沒有書籍資料，停止爬取。")
-                break
-            
-            if page_num >= page_count:
-                break
-            
-            # 嘗試點擊下一頁
-            next_button_found = False
-            
-            next_button_selectors = [
-                ("LINK_TEXT", "下一頁"),
-                ("PARTIAL_LINK_TEXT", "下一頁"),
-                ("XPATH", "//a[text()='下一頁']"),
-                ("XPATH", "//a[contains(text(), '下一頁') and not(contains(@class, 'gray'))]"),
-                ("XPATH", "//a[contains(@class, 'nxt') and not(contains(@class, 'gray'))]"),
-                ("XPATH", "//div[@class='cnt_page']//a[contains(@class, 'nxt')]"),
-                ("XPATH", "//ul[@class='pagination']//a[contains(text(), '下一頁')]"),
-                ("CSS", "a.nxt:not(.gray)"),
-                ("CSS", "div.mod_pagination a:not(.gray)"),
-                ("XPATH", "//a[@rel='next']"),
-                ("XPATH", f"//a[text()='{page_num + 1}']")
-            ]
-            
-            for selector_type, selector_value in next_button_selectors:
-                try:
-                    if selector_type == "LINK_TEXT":
-                        by_type = By.LINK_TEXT
-                    elif selector_type == "PARTIAL_LINK_TEXT":
-                        by_type = By.PARTIAL_LINK_TEXT
-                    elif selector_type == "XPATH":
-                        by_type = By.XPATH
-                    elif selector_type == "CSS":
-                        by_type = By.CSS_SELECTOR
-                    else:
-                        continue
-                    
-                    elements = driver.find_elements(by_type, selector_value)
-                    if not elements:
-                        continue
-                    
-                    for next_button in elements:
-                        try:
-                            if not next_button.is_displayed() or not next_button.is_enabled():
-                                continue
-                            
-                            button_class = next_button.get_attribute('class') or ''
-                            if 'gray' in button_class.lower() or 'disabled' in button_class.lower():
-                                continue
-                            
-                            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", next_button)
-                            time.sleep(1)
-                            
-                            old_url = driver.current_url
-                            
-                            driver.execute_script("arguments[0].click();", next_button)
-                            
-                            time.sleep(3)
-                            new_url = driver.current_url
-                            
-                            if old_url != new_url:
-                                next_button_found = True
-                                time.sleep(2)
-                                page_num += 1
-                                break
-                                
-                        except Exception:
-                            continue
-                    
-                    if next_button_found:
-                        break
-                    
-                except Exception:
-                    continue
-            
-            if not next_button_found:
-                break
-        
-        print("爬取完成。")
-        
+        for page in http_scraper.iter_pages_http(
+            keyword,
+            url_template=url_template,
+            client=client,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            timer=timer,
+            early_stop=early_stop,
+            start_page=start_page,
+            page_cache=page_cache,
+            count_changes=count_changes
+        ):
+            produced = True
+            yield page
     except Exception as e:
-        print(f"爬蟲錯誤：{e}")
-        raise
+        if engine == ENGINE_HTTP or produced:
+            print(f"爬蟲錯誤：{e}")
+            raise
+        print(f"HTTP 爬蟲失敗（{e}），改用瀏覽器爬取「{keyword}」。")
+        yield from _iter_pages_selenium(parse_mode, timer, early_stop, start_page, keyword)
+        return
     
-    finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
-    
-    return books
+    if not produced and engine == ENGINE_AUTO:
+        print(f"HTTP 爬蟲未取得「{keyword}」的任何書籍，改用瀏覽器爬取。")
+        yield from _iter_pages_selenium(parse_mode, timer, early_stop, start_page, keyword)
 
 
-def extract_books_from_page(driver: webdriver.Chrome) -> List[Dict[str, Any]]:
+def normalize_keywords(keywords: Optional[Iterable[str]]) -> List[str]:
     """
-    從當前頁面擷取所有書籍資料。
+    整理搜尋關鍵字列表：去除前後空白、空字串與重複（保留原順序）。
     
-    技術細節：
-    1. 資料擷取：程式需能正確抓取每一本書的上述四個欄位
-    2. 提示 1：所有書籍資訊都包含在 div.table-searchbox 區域中，
-              每一本書是一個 div.table-td 元素
-    3. 提示 2：書名和連結在 <h4> 標籤內的 <a> 標籤中，
-              作者資訊在 <p class="author"> 下的 <a> 標籤中，
-              可能有多位作者，請將所有作者名稱合併成一個字串
-    4. 資料清理：價格欄位可能包含非數字字元，如「優惠價：<b>79</b> 折，<b>513</b> 元」。
-              您必須從中僅擷取出數字 513 並轉換為整數
-    5. 強固處理：若書籍缺少作者或價格資訊，爬蟲應能優雅地處理這種情況（例如，存入 N/A 或預設值 0），
-              而不是直接崩潰
+    參數:
+        keywords: 搜尋關鍵字，None 或空列表時使用預設關鍵字
+    
+    回傳:
+        List[str]: 整理後的關鍵字列表
+    """
+    result = []
+    for keyword in keywords or []:
+        keyword = keyword.strip()
+        if keyword and keyword not in result:
+            result.append(keyword)
+    return result or [http_scraper.DEFAULT_KEYWORD]
+
+
+@contextmanager
+def shared_http_client(engine: str, max_workers: int, requests_per_second: float,
+                       keyword_workers: int = 1) -> Iterator[Optional[HttpClient]]:
+    """
+    建立多個關鍵字共用的 HTTP 用戶端，with 區塊結束時關閉。
     
     參數:
-        driver: Selenium WebDriver 實例
+        engine: 爬蟲引擎；selenium 與 cache 引擎不需要 HTTP 用戶端，產出 None
+        max_workers: 每個關鍵字同時下載的頁面數上限
+        requests_per_second: 對同一主機每秒最多發出的請求數（所有關鍵字合計）
+        keyword_workers: 同時爬取的關鍵字數
     
     回傳:
-        List[Dict[str, Any]]: 當前頁面的書籍資料列表
+        Iterator[Optional[HttpClient]]: HTTP 用戶端
     """
-    books = []
+    if engine in (ENGINE_SELENIUM, ENGINE_CACHE):
+        yield None
+        return
     
+    client = http_scraper.create_client(max_workers * max(keyword_workers, 1), requests_per_second)
     try:
-        book_containers = driver.find_elements(By.CSS_SELECTOR, 'div.table-searchbox div.table-td')
-        
-        for container in book_containers:
-            try:
-                title_elems = container.find_elements(By.CSS_SELECTOR, 'h4 a')
-                if not title_elems:
-                    continue
-                
-                title_elem = title_elems[0]
-                title = title_elem.text.strip()
-                link = title_elem.get_attribute('href')
-                
-                # 擷取作者
-                author = 'N/A'
-                try:
-                    author_elems = container.find_elements(By.CSS_SELECTOR, 'p.author a')
-                    if author_elems:
-                        authors = [elem.text.strip() for elem in author_elems if elem.text.strip()]
-                        if authors:
-                            author = ', '.join(authors)
-                except NoSuchElementException:
-                    pass
-                except Exception:
-                    pass
-                
-                # 擷取價格
-                price = 0
-                try:
-                    price_container = container.find_elements(By.CSS_SELECTOR, 'p.price, li.price_a, div.price')
-                    
-                    if price_container:
-                        price_text = price_container[0].text
-                        match = re.search(r'(\d+)\s*元', price_text)
-                        if match:
-                            price = int(match.group(1))
-                        else:
-                            numbers = re.findall(r'\d+', price_text)
-                            if numbers:
-                                large_numbers = [int(n) for n in numbers if int(n) >= 100]
-                                if large_numbers:
-                                    price = max(large_numbers)
-                    
-                    if price == 0:
-                        full_text = container.text
-                        match = re.search(r'(\d+)\s*元', full_text)
-                        if match:
-                            price = int(match.group(1))
-                    
-                except (NoSuchElementException, ValueError):
-                    pass
-                except Exception:
-                    pass
-                
-                if title and link:
-                    book = {
-                        'title': title,
-                        'author': author,
-                        'price': price,
-                        'link': link
-                    }
-                    books.append(book)
-                    
-            except Exception:
-                continue
+        yield client
+    finally:
+        client.close()
+
+
+def dedupe_books(keyword_books: Iterable[Tuple[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    合併多個關鍵字的爬取結果，依商品編號（field_parser.book_key）去除重複。
     
-    except Exception as e:
-        print(f"擷取頁面資料時發生錯誤：{e}")
+    同一本書以第一次出現的資料為準，並在 keywords 欄位記錄所有搜尋到此書的關鍵字；
+    各關鍵字的搜尋結果中同一本書的連結排名參數不同，因此不以連結比較。
     
-    return books
+    參數:
+        keyword_books: (關鍵字, 書籍資料列表) 的序列
+    
+    回傳:
+        List[Dict[str, Any]]: 去除重複後的書籍資料列表
+    """
+    books: Dict[str, Dict[str, Any]] = {}
+    for keyword, page_books in keyword_books:
+        for book in page_books:
+            key = book_key(book['link'])
+            merged = books.get(key)
+            if merged is None:
+                merged = books[key] = dict(book, keywords=[])
+            if keyword not in merged['keywords']:
+                merged['keywords'].append(keyword)
+    return list(books.values())
+
+
+def _iter_pages_selenium(parse_mode: str, timer: Optional[PhaseTimer], early_stop: Optional[EarlyStop],
+                         start_page: int, keyword: str) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """以瀏覽器逐頁爬取；第一次呼叫時才載入 selenium_scraper 與 selenium。"""
+    import selenium_scraper
+    yield from selenium_scraper.iter_pages_selenium(parse_mode, timer, early_stop, start_page, keyword)
+
+
+def shutdown_driver_pool() -> None:
+    """關閉共用瀏覽器工作階段池中的所有瀏覽器（程式結束時呼叫）；從未使用瀏覽器時不載入 selenium。"""
+    selenium_scraper = sys.modules.get('selenium_scraper')
+    if selenium_scraper is not None:
+        selenium_scraper.shutdown_driver_pool()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+"""
+選擇器快取模組
+
+記住上次成功找到「圖書」分類與「下一頁」按鈕的選擇器，並存到小型 JSON 檔案，
+下次執行時優先嘗試，只有失效時才依序嘗試其他備援選擇器。
+記住的選擇器失效時即從快取移除，下次成功的選擇器會取而代之。
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# 快取檔案路徑，可用環境變數 SELECTOR_CACHE_PATH 指定
+SELECTOR_CACHE_PATH = os.environ.get(
+    'SELECTOR_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'books_scraper', 'selectors.json')
+)
+
+
+class SelectorCache:
+    """
+    依種類（例如 'category'、'next_page'）記住成功的選擇器（執行緒安全）。
+
+    使用方式：
+        remembered = cache.lookup('next_page', SELECTORS)
+        for index, selector in cache.ordered('next_page', SELECTORS):
+            if try_selector(selector):
+                cache.remember('next_page', selector)
+                break
+            if index == remembered:
+                cache.forget('next_page')
+    """
+
+    def __init__(self, path: Optional[str] = SELECTOR_CACHE_PATH) -> None:
+        """
+        參數:
+            path: 快取檔案路徑，None 表示只保存在記憶體中
+        """
+        self.path = path
+        self._entries: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def lookup(self, kind: str, selectors: Sequence[Any]) -> Optional[int]:
+        """
+        取得記住的選擇器在 selectors 中的索引。
+
+        參數:
+            kind: 選擇器種類
+            selectors: 備援選擇器清單
+
+        回傳:
+            Optional[int]: 索引；沒有記住或清單中已沒有該選擇器時回傳 None
+        """
+        with self._lock:
+            stored = self._load().get(kind)
+        if stored is None:
+            return None
+        for index, selector in enumerate(selectors):
+            if _to_json(selector) == stored:
+                return index
+        return None
+
+    def ordered(self, kind: str, selectors: Sequence[Any]) -> List[Tuple[int, Any]]:
+        """
+        依嘗試順序排列選擇器：記住的選擇器在最前面，其餘維持原順序。
+
+        參數:
+            kind: 選擇器種類
+            selectors: 備援選擇器清單
+
+        回傳:
+            List[Tuple[int, Any]]: (原清單中的索引, 選擇器)
+        """
+        order = list(enumerate(selectors))
+        remembered = self.lookup(kind, selectors)
+        if remembered is not None:
+            order.insert(0, order.pop(remembered))
+        return order
+
+    def remember(self, kind: str, selector: Any) -> None:
+        """
+        記住成功的選擇器；與目前記住的相同時不寫入檔案。
+
+        參數:
+            kind: 選擇器種類
+            selector: 成功的選擇器（字串或字串組成的 tuple）
+        """
+        value = _to_json(selector)
+        with self._lock:
+            entries = self._load()
+            if entries.get(kind) == value:
+                return
+            entries[kind] = value
+            self._save(entries)
+
+    def forget(self, kind: str) -> None:
+        """
+        移除已失效的選擇器。
+
+        參數:
+            kind: 選擇器種類
+        """
+        with self._lock:
+            entries = self._load()
+            if entries.pop(kind, None) is not None:
+                self._save(entries)
+
+    def _load(self) -> Dict[str, Any]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None:
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._entries = data
+                except (OSError, ValueError):
+                    pass
+        return self._entries
+
+    def _save(self, entries: Dict[str, Any]) -> None:
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"無法寫入選擇器快取：{e}")
+
+
+def _to_json(selector: Any) -> Any:
+    """tuple 存成 JSON 後會變成 list，比較前統一轉換。"""
+    return list(selector) if isinstance(selector, tuple) else selector
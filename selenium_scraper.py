@@ -0,0 +1,626 @@
+"""
+Selenium 爬蟲模組
+
+以 headless Chrome 模擬使用者操作爬取搜尋結果：開啟首頁、送出搜尋、點選「圖書」分類後逐頁擷取。
+HTTP 引擎無法使用時才會用到；由 scraper 在需要時才匯入，避免未使用瀏覽器時載入 selenium。
+"""
+
+import re
+import threading
+import time
+from contextlib import ExitStack
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from driver_pool import DriverPool
+from selector_cache import SelectorCache
+import browser_profile
+from field_parser import join_authors, parse_authors, parse_fallback_price, parse_price
+from html_extractor import extract_books_from_html
+from incremental import EarlyStop
+from scraper import PARSE_MODE_HTML
+from timing import PhaseTimer
+import http_scraper
+import metrics
+
+
+# 博客來首頁
+HOMEPAGE_URL = 'https://www.books.com.tw/'
+
+# 等待換頁或結果區塊出現的最長秒數
+PAGE_LOAD_TIMEOUT = 15
+
+# 分頁列中的頁碼連結
+PAGINATION_LINKS_SELECTOR = 'div.mod_pagination a, div.cnt_page a, ul.pagination a, .page_bar a'
+
+# 以單次 WebDriver 請求同時取回目前網址與搜尋結果區塊的 HTML
+SEARCHBOX_HTML_SCRIPT = '''
+    var box = document.querySelector('div.table-searchbox');
+    return [window.location.href, box ? box.outerHTML : ''];
+'''
+
+# dom 模式一次取回書籍區塊中所有作者連結的文字（textContent 與 html 模式解析原始碼取得的文字相同）
+AUTHOR_LINKS_SCRIPT = '''
+    return Array.from(arguments[0].querySelectorAll('p.author a'), function (a) { return a.textContent; });
+'''
+
+# 「圖書」分類的備援選擇器（XPath），依序嘗試
+CATEGORY_SELECTORS = [
+    "//label[contains(text(), '圖書') and (contains(text(), '(') or contains(text(), ')'))]",
+    "//span[contains(text(), '圖書') and (contains(text(), '(') or contains(text(), ')'))]",
+    "//a[contains(text(), '圖書') and (contains(text(), '(') or contains(text(), ')'))]",
+    "//input[@value='BKA']/../label",
+    "//input[@name='cat' and @value='BKA']/../label",
+    "//*[contains(text(), '圖書') and contains(text(), '(')]"
+]
+
+# 「下一頁」按鈕的備援選擇器 (類型, 選擇器)，依序嘗試；{next_page} 會替換為下一頁的頁碼
+NEXT_PAGE_SELECTORS = [
+    ("LINK_TEXT", "下一頁"),
+    ("PARTIAL_LINK_TEXT", "下一頁"),
+    ("XPATH", "//a[text()='下一頁']"),
+    ("XPATH", "//a[contains(text(), '下一頁') and not(contains(@class, 'gray'))]"),
+    ("XPATH", "//a[contains(@class, 'nxt') and not(contains(@class, 'gray'))]"),
+    ("XPATH", "//div[@class='cnt_page']//a[contains(@class, 'nxt')]"),
+    ("XPATH", "//ul[@class='pagination']//a[contains(text(), '下一頁')]"),
+    ("CSS", "a.nxt:not(.gray)"),
+    ("CSS", "div.mod_pagination a:not(.gray)"),
+    ("XPATH", "//a[@rel='next']"),
+    ("XPATH", "//a[text()='{next_page}']")
+]
+
+SELECTOR_BY = {
+    "LINK_TEXT": By.LINK_TEXT,
+    "PARTIAL_LINK_TEXT": By.PARTIAL_LINK_TEXT,
+    "XPATH": By.XPATH,
+    "CSS": By.CSS_SELECTOR,
+}
+
+# 記住上次成功的分類與下一頁選擇器，跨執行優先使用
+_selector_cache = SelectorCache()
+
+# 跨多次爬取共用的瀏覽器工作階段池（第一次使用 selenium 引擎時建立）
+_driver_pool: Optional[DriverPool] = None
+_driver_pool_lock = threading.Lock()
+
+
+def iter_pages_selenium(parse_mode: str = PARSE_MODE_HTML,
+                        timer: Optional[PhaseTimer] = None,
+                        early_stop: Optional[EarlyStop] = None,
+                        start_page: int = 1,
+                        keyword: str = http_scraper.DEFAULT_KEYWORD,
+                        pool: Optional[DriverPool] = None) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    以 Selenium 操作 headless Chrome 逐頁爬取搜尋關鍵字的書籍資料。
+    
+    操作流程：
+    1. 開啟博客來首頁
+    2. 在搜尋框輸入關鍵字
+    3. 提交搜尋
+    4. 點選「圖書」分類
+    5. 逐頁擷取書籍資料並產出
+    
+    能從第 1 頁的網址或分頁連結推得頁碼樣板時，直接開啟第 k 頁的網址換頁，
+    續跑時也直接跳到 start_page；推不出樣板時才改為點擊「下一頁」。
+    
+    每個步驟都以明確的頁面條件等待（元素可點擊、舊結果區塊失效、網址改變），
+    不使用固定秒數的 time.sleep。瀏覽器從工作階段池借出，
+    在迭代結束或呼叫端關閉產生器時重設並歸還，供下次爬取重複使用。
+    
+    參數:
+        parse_mode: 頁面解析模式，'html'（預設）或 'dom'
+        timer: 各階段耗時紀錄器
+        early_stop: 增量模式的提前停止判斷
+        start_page: 從第幾頁開始產出；有頁碼樣板時直接開啟該頁，否則之前的頁面只翻頁不擷取
+        keyword: 搜尋關鍵字
+        pool: 瀏覽器工作階段池，未提供時使用 get_driver_pool()
+    
+    回傳:
+        Iterator[Tuple[int, List[Dict[str, Any]]]]: (頁碼, 該頁書籍資料)
+    """
+    timer = timer or PhaseTimer()
+    pool = pool or get_driver_pool()
+    
+    with ExitStack() as stack:
+        with timer.phase('startup'):
+            driver = stack.enter_context(pool.acquire())
+        
+        try:
+            with timer.phase('search'):
+                _submit_search(driver, keyword)
+            
+            with timer.phase('category'):
+                _select_book_category(driver)
+                page_count = _detect_page_count(driver)
+            
+            print(f"「{keyword}」偵測到總共有 {page_count} 頁。")
+            
+            page_template = _infer_page_template(driver)
+            if page_template is None:
+                print("無法從網址推得頁碼樣板，改為點擊「下一頁」換頁。")
+            
+            page_num = 1
+            
+            if page_template is not None and 1 < start_page <= page_count:
+                with timer.phase('page_load', start_page):
+                    _open_page(driver, page_template, start_page)
+                page_num = start_page
+            
+            while page_num <= page_count:
+                try:
+                    with timer.phase('page_load', page_num):
+                        WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, 'div.table-searchbox'))
+                        )
+                except TimeoutException:
+                    print(f"第 {page_num} 頁載入逾時，跳過。")
+                    break
+                
+                if page_num >= start_page:
+                    print(f"正在爬取「{keyword}」第 {page_num} / {page_count} 頁...")
+                    
+                    with timer.phase('extract', page_num):
+                        page_books = extract_books_from_page(driver, parse_mode)
+                    
+                    if len(page_books) == 0:
+                        print("當前頁面沒有書籍資料，停止爬取。")
+                        break
+                    
+                    metrics.inc('pages_scraped_total', engine='selenium')
+                    metrics.inc('books_scraped_total', len(page_books), engine='selenium')
+                    
+                    # 在產出前檢查：呼叫端可能在取得這頁後立即寫入資料庫
+                    stop = early_stop is not None and early_stop.should_stop(page_books)
+                    yield page_num, page_books
+                    
+                    if stop:
+                        break
+                
+                if page_num >= page_count:
+                    break
+                
+                # 開啟或點擊下一頁並等待新頁面載入，計入下一頁的載入時間
+                with timer.phase('page_load', page_num + 1):
+                    if page_template is not None:
+                        _open_page(driver, page_template, page_num + 1)
+                    elif not _click_next_page(driver, page_num):
+                        break
+                
+                page_num += 1
+            
+            print(f"「{keyword}」爬取完成。")
+        
+        except Exception as e:
+            print(f"爬蟲錯誤：{e}")
+            raise
+
+
+def get_driver_pool() -> DriverPool:
+    """
+    取得共用的瀏覽器工作階段池，第一次呼叫時建立。
+    
+    回傳:
+        DriverPool: 以 browser_profile.create_driver 建立瀏覽器的工作階段池
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool(browser_profile.create_driver)
+        return _driver_pool
+
+
+def shutdown_driver_pool() -> None:
+    """關閉共用工作階段池中的所有瀏覽器（程式結束時呼叫）。"""
+    global _driver_pool
+    with _driver_pool_lock:
+        pool, _driver_pool = _driver_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _submit_search(driver: webdriver.Chrome, keyword: str) -> None:
+    """
+    開啟博客來首頁並送出搜尋關鍵字。
+    
+    送出後等待原本的搜尋框失效（頁面已換頁），再等待搜尋結果區塊出現。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+        keyword: 搜尋關鍵字
+    """
+    driver.get(HOMEPAGE_URL)
+    
+    try:
+        search_box = WebDriverWait(driver, 15).until(
+            EC.element_to_be_clickable((By.ID, "key"))
+        )
+        search_box.clear()
+        search_box.send_keys(keyword)
+        search_box.send_keys(Keys.RETURN)
+        
+    except TimeoutException:
+        search_box = WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'input[name="key"]'))
+        )
+        search_box.clear()
+        search_box.send_keys(keyword)
+        search_box.submit()
+    
+    try:
+        WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(EC.staleness_of(search_box))
+    except TimeoutException:
+        pass
+    
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "div.mod_b, div.searchbook, div.mod"))
+    )
+
+
+def _select_book_category(driver: webdriver.Chrome) -> None:
+    """
+    點選搜尋結果中的「圖書」分類，並等待分類後的結果載入。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+    """
+    book_category = None
+    remembered = _selector_cache.lookup('category', CATEGORY_SELECTORS)
+    
+    for index, selector in _selector_cache.ordered('category', CATEGORY_SELECTORS):
+        try:
+            elements = driver.find_elements(By.XPATH, selector)
+            for element in elements:
+                if element.is_displayed() and element.is_enabled():
+                    text = element.text.strip()
+                    if '圖書' in text and ('(' in text or ')' in text):
+                        book_category = element
+                        break
+            if book_category:
+                metrics.inc('selector_hits_total', kind='category', selector=index)
+                _selector_cache.remember('category', selector)
+                break
+        except Exception:
+            metrics.inc('selector_errors_total', kind='category', selector=index)
+        
+        if index == remembered:
+            metrics.inc('selector_cache_stale_total', kind='category')
+            _selector_cache.forget('category')
+    
+    if not book_category:
+        metrics.inc('selector_misses_total', kind='category')
+        return
+    
+    try:
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", book_category)
+        WebDriverWait(driver, 5).until(EC.element_to_be_clickable(book_category))
+        
+        old_url = driver.current_url
+        old_results = driver.find_elements(By.CSS_SELECTOR, 'div.table-searchbox')
+        
+        try:
+            book_category.click()
+        except Exception:
+            driver.execute_script("arguments[0].click();", book_category)
+        
+        _wait_for_results_update(driver, old_url, old_results[0] if old_results else None)
+        
+    except Exception:
+        pass
+
+
+def _detect_page_count(driver: webdriver.Chrome) -> int:
+    """
+    偵測搜尋結果的總頁數。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+    
+    回傳:
+        int: 總頁數，無法偵測時回傳 1
+    """
+    page_count = 1
+    try:
+        pagination = driver.find_elements(By.CSS_SELECTOR, PAGINATION_LINKS_SELECTOR)
+        
+        if pagination:
+            page_numbers = []
+            for elem in pagination:
+                text = elem.text.strip()
+                if text.isdigit():
+                    page_numbers.append(int(text))
+            if page_numbers:
+                page_count = max(page_numbers)
+        
+        if page_count == 1:
+            page_text_elements = driver.find_elements(By.XPATH, "//*[contains(text(), '共') and contains(text(), '頁')]")
+            for elem in page_text_elements:
+                match = re.search(r'共\s*(\d+)\s*頁', elem.text)
+                if match:
+                    page_count = int(match.group(1))
+                    break
+        
+        if page_count == 1:
+            result_text = driver.find_elements(By.XPATH, "//*[contains(text(), '搜尋結果共')]")
+            for elem in result_text:
+                match = re.search(r'頁數\s*\d+\s*/\s*(\d+)', elem.text)
+                if match:
+                    page_count = int(match.group(1))
+                    break
+                    
+    except Exception:
+        page_count = 1
+    
+    return page_count
+
+
+def _infer_page_template(driver: webdriver.Chrome) -> Optional[str]:
+    """
+    推得搜尋結果各頁共用的網址樣板。
+    
+    先從目前（第 1 頁）的網址尋找頁碼；第 1 頁的網址常不含頁碼，
+    此時改由分頁列中「2」的連結推得。
+    
+    參數:
+        driver: Selenium WebDriver 實例（位於搜尋結果第 1 頁）
+    
+    回傳:
+        Optional[str]: 包含 {page} 的網址樣板，推不出來時回傳 None
+    """
+    template = http_scraper.infer_page_url_template(driver.current_url, 1)
+    if template is not None:
+        return template
+    
+    try:
+        for link in driver.find_elements(By.CSS_SELECTOR, PAGINATION_LINKS_SELECTOR):
+            if link.text.strip() != '2':
+                continue
+            template = http_scraper.infer_page_url_template(link.get_attribute('href') or '', 2)
+            if template is not None:
+                return template
+    except Exception:
+        pass
+    
+    return None
+
+
+def _open_page(driver: webdriver.Chrome, page_template: str, page_num: int) -> None:
+    """
+    直接開啟指定頁碼的搜尋結果頁（結果區塊的等待由呼叫端處理）。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+        page_template: 包含 {page} 的網址樣板
+        page_num: 頁碼
+    """
+    driver.get(http_scraper.build_page_url(page_template, page_num))
+    metrics.inc('page_navigations_total', method='url')
+
+
+def _click_next_page(driver: webdriver.Chrome, page_num: int) -> bool:
+    """
+    找到並點擊「下一頁」，等待新頁面的結果區塊載入。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+        page_num: 目前頁碼
+    
+    回傳:
+        bool: 是否成功換到下一頁
+    """
+    remembered = _selector_cache.lookup('next_page', NEXT_PAGE_SELECTORS)
+    
+    for index, (selector_type, selector_template) in _selector_cache.ordered('next_page', NEXT_PAGE_SELECTORS):
+        if _try_next_page_selector(driver, SELECTOR_BY[selector_type],
+                                   selector_template.replace('{next_page}', str(page_num + 1)), index):
+            metrics.inc('selector_hits_total', kind='next_page', selector=index)
+            metrics.inc('page_navigations_total', method='click')
+            _selector_cache.remember('next_page', (selector_type, selector_template))
+            return True
+        
+        if index == remembered:
+            metrics.inc('selector_cache_stale_total', kind='next_page')
+            _selector_cache.forget('next_page')
+    
+    metrics.inc('selector_misses_total', kind='next_page')
+    return False
+
+
+def _try_next_page_selector(driver: webdriver.Chrome, by_type: str, selector: str, index: int) -> bool:
+    """
+    以單一選擇器尋找可點擊的「下一頁」按鈕並點擊，等待新頁面的結果區塊載入。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+        by_type: 選擇器類型（By.XPATH 等）
+        selector: 選擇器
+        index: 選擇器在 NEXT_PAGE_SELECTORS 中的索引（用於指標）
+    
+    回傳:
+        bool: 是否成功換到下一頁
+    """
+    try:
+        elements = driver.find_elements(by_type, selector)
+    except Exception:
+        metrics.inc('selector_errors_total', kind='next_page', selector=index)
+        return False
+    
+    for next_button in elements:
+        try:
+            if not next_button.is_displayed() or not next_button.is_enabled():
+                continue
+            
+            button_class = next_button.get_attribute('class') or ''
+            if 'gray' in button_class.lower() or 'disabled' in button_class.lower():
+                continue
+            
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_button)
+            
+            old_url = driver.current_url
+            old_results = driver.find_elements(By.CSS_SELECTOR, 'div.table-searchbox')
+            
+            driver.execute_script("arguments[0].click();", next_button)
+            
+            if _wait_for_results_update(driver, old_url, old_results[0] if old_results else None):
+                return True
+                
+        except Exception:
+            metrics.inc('selector_errors_total', kind='next_page', selector=index)
+            continue
+    
+    return False
+
+
+def _wait_for_results_update(driver: webdriver.Chrome, old_url: str,
+                             old_results: Optional[WebElement],
+                             timeout: float = PAGE_LOAD_TIMEOUT) -> bool:
+    """
+    等待點擊後的搜尋結果更新。
+    
+    以網址改變或舊的 div.table-searchbox 失效（staleness）判斷已換頁，
+    再等待新的結果區塊出現。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+        old_url: 點擊前的網址
+        old_results: 點擊前的結果區塊，頁面沒有結果區塊時為 None
+        timeout: 最長等待秒數
+    
+    回傳:
+        bool: 結果是否已更新
+    """
+    def results_changed(d: webdriver.Chrome) -> bool:
+        if d.current_url != old_url:
+            return True
+        return old_results is not None and EC.staleness_of(old_results)(d)
+    
+    try:
+        WebDriverWait(driver, timeout).until(results_changed)
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'div.table-searchbox'))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def extract_books_from_page(driver: webdriver.Chrome, parse_mode: str = PARSE_MODE_HTML) -> List[Dict[str, Any]]:
+    """
+    從當前頁面擷取所有書籍資料。
+    
+    技術細節：
+    1. 資料擷取：程式需能正確抓取每一本書的上述四個欄位
+    2. 提示 1：所有書籍資訊都包含在 div.table-searchbox 區域中，
+              每一本書是一個 div.table-td 元素
+    3. 提示 2：書名和連結在 <h4> 標籤內的 <a> 標籤中，
+              作者資訊在 <p class="author"> 下的 <a> 標籤中，
+              可能有多位作者，請將所有作者名稱合併成一個字串
+    4. 資料清理：價格欄位可能包含非數字字元，如「優惠價：<b>79</b> 折，<b>513</b> 元」。
+              您必須從中僅擷取出數字 513 並轉換為整數
+    5. 強固處理：若書籍缺少作者或價格資訊，爬蟲應能優雅地處理這種情況（例如，存入 N/A 或預設值 0），
+              而不是直接崩潰
+    
+    解析模式：
+    - html：以一次 WebDriver 請求取回 div.table-searchbox 的 HTML，在本機解析整頁
+    - dom：對每個書籍區塊及其子元素逐一查詢 WebDriver（每本書需多次往返）
+    
+    參數:
+        driver: Selenium WebDriver 實例
+        parse_mode: 頁面解析模式，'html'（預設）或 'dom'
+    
+    回傳:
+        List[Dict[str, Any]]: 當前頁面的書籍資料列表
+    """
+    if parse_mode == PARSE_MODE_HTML:
+        try:
+            page_url, html = driver.execute_script(SEARCHBOX_HTML_SCRIPT)
+            return extract_books_from_html(html or '', page_url)
+        except Exception as e:
+            metrics.inc('parse_failures_total', field='page', mode='html')
+            print(f"擷取頁面資料時發生錯誤：{e}")
+            return []
+    
+    return _extract_books_from_dom(driver)
+
+
+def _extract_books_from_dom(driver: webdriver.Chrome) -> List[Dict[str, Any]]:
+    """
+    逐一查詢 WebDriver 元素擷取當前頁面的書籍資料。
+    
+    參數:
+        driver: Selenium WebDriver 實例
+    
+    回傳:
+        List[Dict[str, Any]]: 當前頁面的書籍資料列表
+    """
+    books = []
+    
+    try:
+        book_containers = driver.find_elements(By.CSS_SELECTOR, 'div.table-searchbox div.table-td')
+        
+        for container in book_containers:
+            start = time.perf_counter()
+            try:
+                title_elems = container.find_elements(By.CSS_SELECTOR, 'h4 a')
+                if not title_elems:
+                    metrics.inc('parse_failures_total', field='title', mode='dom')
+                    continue
+                
+                title_elem = title_elems[0]
+                title = title_elem.text.strip()
+                link = title_elem.get_attribute('href')
+                
+                # 擷取作者：一次取回所有 p.author a 的文字，與 html 模式以相同方式整理
+                author = 'N/A'
+                try:
+                    author = join_authors(parse_authors(driver.execute_script(AUTHOR_LINKS_SCRIPT, container) or []))
+                except Exception:
+                    metrics.inc('parse_failures_total', field='author', mode='dom')
+                
+                # 擷取價格：價格區塊解析失敗時才取整個書籍區塊的文字
+                prices = parse_price('')
+                try:
+                    price_container = container.find_elements(By.CSS_SELECTOR, 'p.price, li.price_a, div.price')
+                    
+                    if price_container:
+                        prices = parse_price(price_container[0].text)
+                    
+                    if not prices['sale_price']:
+                        prices['sale_price'] = parse_fallback_price(container.text)
+                    
+                except NoSuchElementException:
+                    pass
+                except Exception:
+                    pass
+                price = prices['sale_price'] or 0
+                
+                if title and link:
+                    if price == 0:
+                        metrics.inc('parse_failures_total', field='price', mode='dom')
+                    book = {
+                        'title': title,
+                        'author': author,
+                        'price': price,
+                        'link': link,
+                        **prices
+                    }
+                    books.append(book)
+                else:
+                    metrics.inc('parse_failures_total', field='title' if not title else 'link', mode='dom')
+                    
+            except Exception:
+                metrics.inc('parse_failures_total', field='container', mode='dom')
+                continue
+            
+            finally:
+                metrics.observe('extract_container_seconds', time.perf_counter() - start, mode='dom')
+    
+    except Exception as e:
+        metrics.inc('parse_failures_total', field='page', mode='dom')
+        print(f"擷取頁面資料時發生錯誤：{e}")
+    
+    return books
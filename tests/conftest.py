@@ -0,0 +1,30 @@
+"""
+pytest 共用設定
+
+測試直接匯入專案根目錄的模組與 benchmarks/ 中的 fixture 伺服器；
+資料庫一律使用暫存檔（temp_db），不會動到 books.db。
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+import database
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """切換到暫存資料庫並建立結構，測試結束後關閉連線並恢復原本的資料庫路徑。"""
+    previous = (database.DB_PATH, database.READ_ONLY)
+    database.configure(str(tmp_path / 'books.db'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_database()
+    yield database
+    database.configure(*previous)
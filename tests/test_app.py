@@ -0,0 +1,85 @@
+"""
+app.py 非互動子命令的測試
+"""
+
+import functools
+import json
+
+import pytest
+
+import app
+import pipeline
+from fixture_server import serve_fixtures
+
+
+BOOKS = [
+    {'title': 'LLM 入門', 'author': '王小明', 'price': 450, 'link': 'https://www.books.com.tw/products/0000000001'},
+    {'title': 'LLM 實戰', 'author': '李大華', 'price': 480, 'link': 'https://www.books.com.tw/products/0000000002'},
+    {'title': 'LLM 進階', 'author': '王小明', 'price': 620, 'link': 'https://www.books.com.tw/products/0000000003'},
+    {'title': 'RAG 系統', 'author': '王小明', 'price': 380, 'link': 'https://www.books.com.tw/products/0000000004'},
+]
+
+
+@pytest.fixture
+def keywords_file(temp_db, tmp_path):
+    temp_db.insert_books(BOOKS)
+    path = tmp_path / 'keywords.txt'
+    path.write_text('LLM\nRAG\n', encoding='utf-8')
+    return str(path)
+
+
+def search(capsys, *argv) -> list:
+    assert app.main(['search', *argv]) == 0
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_keywords_file_applies_other_filters(capsys, keywords_file):
+    results = search(capsys, '--keywords-file', keywords_file, '--author', '王小明', '--max-price', '500')
+    assert [(result['keyword'], [book['title'] for book in result['books']]) for result in results] == [
+        ('LLM', ['LLM 入門']), ('RAG', ['RAG 系統'])]
+
+
+def test_keywords_file_by_author_applies_title(capsys, keywords_file, tmp_path):
+    path = tmp_path / 'authors.txt'
+    path.write_text('王小明\n李大華\n', encoding='utf-8')
+    results = search(capsys, '--keywords-file', str(path), '--by', 'author', '--title', 'LLM', '--sort', 'price')
+    assert [(result['keyword'], [book['title'] for book in result['books']]) for result in results] == [
+        ('王小明', ['LLM 入門', 'LLM 進階']), ('李大華', ['LLM 實戰'])]
+
+
+@pytest.mark.parametrize('argv', [['--title', 'LLM'], ['--by', 'author', '--author', '王小明']])
+def test_keywords_file_rejects_filter_on_same_field(capsys, keywords_file, argv):
+    with pytest.raises(SystemExit) as exc_info:
+        app.main(['search', '--keywords-file', keywords_file, *argv])
+    assert exc_info.value.code == 2
+    assert '--keywords-file' in capsys.readouterr().err
+
+
+@pytest.fixture
+def fixture_pipeline(temp_db, monkeypatch):
+    """update 改從本機 fixture 伺服器爬取搜尋結果頁。"""
+    with serve_fixtures() as url_template:
+        run_pipeline = functools.partial(pipeline.run_pipeline, url_template=url_template)
+        monkeypatch.setattr(pipeline, 'run_pipeline', run_pipeline)
+        yield temp_db
+
+
+def test_update_prints_summary_json(capsys, fixture_pipeline):
+    assert app.main(['update', '--engine', 'http', '--no-page-cache', '--full']) == 0
+    captured = capsys.readouterr()
+    summary = json.loads(captured.out)
+    assert (summary['pages'], summary['inserted'], summary['updated'], summary['unchanged']) == (3, 47, 0, 0)
+    assert '資料庫更新完成' in captured.err
+
+    assert app.main(['update', '--engine', 'http', '--no-page-cache', '--full']) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert (summary['inserted'], summary['updated'], summary['unchanged']) == (0, 0, 47)
+
+
+def test_update_summary_includes_timing_report(capsys, fixture_pipeline):
+    assert app.main(['update', '--engine', 'http', '--no-page-cache', '--full']) == 0
+    timing = json.loads(capsys.readouterr().out)['timing']
+    assert {'search', 'page_load', 'extract', 'db_write'} <= set(timing['phases'])
+    assert [page['page'] for page in timing['pages']] == [1, 2, 3]
+    assert all(page['db_write'] >= 0 for page in timing['pages'])
+    assert timing['total'] > 0
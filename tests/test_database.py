@@ -0,0 +1,128 @@
+"""
+database 寫入與變動判斷的測試
+"""
+
+import json
+import re
+
+import migrations
+from fixture_server import FIXTURES_DIR
+from incremental import EarlyStop
+
+
+def load_page(name: str = 'search_page_1.html') -> list:
+    """記錄的擷取結果（連結帶有排名參數 ?loc=P_0005_001 ...）。"""
+    return json.loads((FIXTURES_DIR / 'expected_books.json').read_text(encoding='utf-8'))[name]
+
+
+def shift_rank(link: str, offset: int = 1) -> str:
+    """將連結中的排名參數往後移 offset 名，如同搜尋結果前面多了 offset 本書。"""
+    return re.sub(r'_(\d{3})$', lambda m: f'_{int(m.group(1)) + offset:03d}', link)
+
+
+def test_shifted_rank_counts_as_unchanged(temp_db):
+    books = load_page()
+    temp_db.insert_books(books)
+
+    shifted = [dict(book, link=shift_rank(book['link'])) for book in books]
+    assert all(new['link'] != old['link'] for new, old in zip(shifted, books))
+    assert temp_db.count_new_or_changed(shifted) == 0
+    assert EarlyStop(temp_db.count_new_or_changed, stop_after_pages=1).should_stop(shifted)
+
+    result = temp_db.insert_books(shifted)
+    assert (result['updated'], result['unchanged'], result['price_changes']) == (0, len(books), 0)
+
+
+def test_new_book_on_top_only_counts_itself(temp_db):
+    books = load_page()
+    temp_db.insert_books(books)
+
+    new_book = {'title': '新書：LLM 應用開發', 'author': '王小明', 'price': 480,
+                'link': 'https://www.books.com.tw/products/0010999999?loc=P_0005_001'}
+    page = [new_book] + [dict(book, link=shift_rank(book['link'])) for book in books[:-1]]
+    assert temp_db.count_new_or_changed(page) == 1
+
+    result = temp_db.insert_books(page)
+    assert (result['inserted'], result['updated'], result['unchanged']) == (1, 0, len(books) - 1)
+
+
+def test_different_product_counts_as_changed(temp_db):
+    books = load_page()
+    temp_db.insert_books(books)
+
+    moved = [dict(books[0], link='https://www.books.com.tw/products/0010999998?loc=P_0005_001')] + books[1:]
+    assert temp_db.count_new_or_changed(moved) == 1
+    assert temp_db.insert_books(moved)['updated'] == 1
+
+
+def test_unparsed_price_is_not_recorded(temp_db):
+    """價格 0 表示無法解析：夾在兩個實際價格之間時不寫入價格歷史，也不影響降價與價格範圍。"""
+    book = load_page()[0]
+    temp_db.insert_books([dict(book, price=500)], changed_on='2024-01-01')
+    assert temp_db.insert_books([dict(book, price=0)], changed_on='2024-01-10')['price_changes'] == 0
+    temp_db.insert_books([dict(book, price=480)], changed_on='2024-01-20')
+
+    history = [tuple(row) for row in temp_db.get_price_history(book['title'])]
+    assert history == [('2024-01-01', 500), ('2024-01-20', 480)]
+    assert temp_db.get_price_on(book['title'], '2024-01-15') == 500
+
+    price_range = temp_db.get_price_range(book['title'])
+    assert (price_range['min_price'], price_range['max_price'], price_range['changes']) == (480, 500, 2)
+
+    drops = temp_db.get_price_drops(20, as_of='2024-01-25')
+    assert [(row['old_price'], row['new_price'], row['drop_percent']) for row in drops] == [(500, 480, 4.0)]
+    assert temp_db.get_price_drops(10, as_of='2024-01-15') == []
+
+
+def test_price_history_backfill_skips_unparsed_prices(temp_db):
+    books = load_page()[:2]
+    temp_db.insert_books([dict(books[0], price=0), books[1]])
+    with temp_db.transaction() as conn:
+        conn.execute('DELETE FROM price_history')
+        assert migrations._backfill_price_history(conn, 0, 100) is not None
+        assert [row[0] for row in conn.execute('SELECT price FROM price_history')] == [books[1]['price']]
+
+
+def test_migration_deletes_recorded_unparsed_prices(temp_db):
+    book = load_page()[0]
+    temp_db.insert_books([book], changed_on='2024-01-01')
+    with temp_db.transaction() as conn:
+        conn.execute("INSERT INTO price_history (book_id, changed_on, price) SELECT id, '2024-01-10', 0 FROM llm_books")
+        conn.execute('PRAGMA user_version = 6')
+    migrations.migrate(temp_db.get_connection())
+    assert [tuple(row) for row in temp_db.get_price_history(book['title'])] == [('2024-01-01', book['price'])]
+    assert migrations.get_version(temp_db.get_connection()) == migrations.LATEST_VERSION
+
+
+def test_insert_books_counts(temp_db):
+    books = load_page()
+    priced = sum(1 for book in books if book['price'] > 0)
+    assert temp_db.insert_books(books, changed_on='2024-01-01') == {
+        'inserted': len(books), 'updated': 0, 'unchanged': 0, 'price_changes': priced}
+
+    # 再次寫入相同資料：沒有更新，也不查詢價格歷史
+    assert temp_db.insert_books(books, changed_on='2024-01-02') == {
+        'inserted': 0, 'updated': 0, 'unchanged': len(books), 'price_changes': 0}
+
+    # 作者變動與價格變動各一本，另有一本新書；同一批次中書名重複時以最後一筆為準
+    changed = [dict(book) for book in books]
+    changed[0]['author'] += '（修訂）'
+    changed[1]['price'] += 10
+    new_book = {'title': '新書：LLM 應用開發', 'author': '王小明', 'price': 480,
+                'link': 'https://www.books.com.tw/products/0010999999?loc=P_0005_001'}
+    changed += [dict(new_book, price=400), new_book]
+    assert temp_db.insert_books(changed, changed_on='2024-01-03') == {
+        'inserted': 1, 'updated': 2, 'unchanged': len(books) - 2, 'price_changes': 2}
+    assert [tuple(row) for row in temp_db.get_price_history(new_book['title'])] == [('2024-01-03', 480)]
+    history = [row['price'] for row in temp_db.get_price_history(books[1]['title'])]
+    assert history == [books[1]['price'], books[1]['price'] + 10]
+
+
+def test_insert_books_counts_after_delete(temp_db):
+    """新增筆數以寫入前的最大 id 計算：刪除最後一本書後，重新寫入時只有它算新增。"""
+    books = load_page()
+    temp_db.insert_books(books)
+    with temp_db.transaction() as conn:
+        conn.execute('DELETE FROM llm_books WHERE title = ?', (books[-1]['title'],))
+    result = temp_db.insert_books(books)
+    assert (result['inserted'], result['updated'], result['unchanged']) == (1, 0, len(books) - 1)
@@ -0,0 +1,124 @@
+"""
+書籍詳細頁擷取的測試（enrichment、detail_extractor）
+
+以本機 fixture 伺服器提供 benchmarks/fixtures/products/ 中的詳細頁；
+沒有 fixture 的商品回應 404，另以 statuses 指定已下架（410）與暫時性錯誤（503）的商品。
+"""
+
+import json
+
+import pytest
+
+import enrichment
+from bench_enrichment import EXPECTED_FIXTURES
+from detail_extractor import extract_book_details, parse_isbn, parse_pages, parse_publish_date
+from fixture_server import FIXTURES_DIR, detail_url_template, serve_fixtures
+
+
+GONE_PRODUCT = '0010960111'
+UNAVAILABLE_PRODUCT = '0010960148'
+
+
+def load_books() -> list:
+    return json.loads((FIXTURES_DIR / 'expected_books.json').read_text(encoding='utf-8'))['search_page_1.html']
+
+
+def stored_details(db) -> dict:
+    rows = db.get_connection().execute(
+        'SELECT product_id, isbn, publisher, publish_date, pages, enriched_at FROM llm_books'
+    ).fetchall()
+    return {row['product_id']: dict(row) for row in rows}
+
+
+@pytest.fixture
+def detail_template():
+    statuses = {f'/products/{GONE_PRODUCT}': 410, f'/products/{UNAVAILABLE_PRODUCT}': 503}
+    with serve_fixtures(statuses=statuses) as url_template:
+        yield detail_url_template(url_template)
+
+
+@pytest.fixture
+def books_db(temp_db):
+    books = load_books()
+    temp_db.insert_books(books)
+    assert {GONE_PRODUCT, UNAVAILABLE_PRODUCT} <= set(stored_details(temp_db))
+    return temp_db
+
+
+def enrich(url_template: str, **options) -> dict:
+    return enrichment.enrich_books(url_template=url_template, requests_per_second=0, max_workers=4, batch_size=7,
+                                   **options)
+
+
+@pytest.mark.parametrize('product_id', sorted(EXPECTED_FIXTURES))
+def test_extract_book_details(product_id):
+    html = (FIXTURES_DIR / 'products' / f'{product_id}.html').read_text(encoding='utf-8')
+    assert extract_book_details(html) == EXPECTED_FIXTURES[product_id]
+
+
+def test_parse_detail_fields():
+    assert parse_isbn('978-626-324-542-6') == '9786263245426'
+    assert parse_isbn('986312797X') == '986312797X'
+    assert parse_isbn('無') is None
+    assert parse_publish_date('2024/5/30') == '2024-05-30'
+    assert parse_publish_date('2024年11月') == '2024-11'
+    assert parse_pages('平裝 / 432頁 / 17 x 23 cm') == 432
+    assert parse_pages(None) is None
+
+
+def test_enrich_books_writes_details(books_db, detail_template):
+    total = len(load_books())
+    summary = enrich(detail_template)
+    assert summary == {'pending': total, 'enriched': len(EXPECTED_FIXTURES), 'not_found': total - 4,
+                       'failed': 1, 'written': total - 1}
+
+    stored = stored_details(books_db)
+    for product_id, expected in EXPECTED_FIXTURES.items():
+        assert {field: stored[product_id][field] for field in expected} == expected
+        assert stored[product_id]['enriched_at'] is not None
+
+
+@pytest.mark.parametrize('product_id', [GONE_PRODUCT, '0010960185'], ids=['410', '404'])
+def test_missing_page_is_recorded_as_not_found(books_db, detail_template, product_id):
+    enrich(detail_template)
+    stored = stored_details(books_db)[product_id]
+    assert stored['enriched_at'] is not None
+    assert (stored['isbn'], stored['publisher'], stored['publish_date'], stored['pages']) == (None, None, None, None)
+
+
+def test_transient_error_is_retried(books_db, detail_template):
+    enrich(detail_template)
+    assert stored_details(books_db)[UNAVAILABLE_PRODUCT]['enriched_at'] is None
+    assert books_db.count_books_to_enrich() == 1
+
+    with serve_fixtures() as url_template:
+        summary = enrich(detail_url_template(url_template))
+    assert (summary['pending'], summary['not_found'], summary['written']) == (1, 1, 1)
+    assert books_db.count_books_to_enrich() == 0
+
+
+def test_enriched_books_are_skipped_unless_forced(books_db, detail_template):
+    total = len(load_books())
+    enrich(detail_template)
+    enriched_at = {product_id: row['enriched_at'] for product_id, row in stored_details(books_db).items()}
+
+    summary = enrich(detail_template)
+    assert summary == {'pending': 1, 'enriched': 0, 'not_found': 0, 'failed': 1, 'written': 0}
+    assert {product_id: row['enriched_at'] for product_id, row in stored_details(books_db).items()} == enriched_at
+
+    summary = enrich(detail_template, force=True)
+    assert (summary['pending'], summary['enriched'], summary['written']) == (total, len(EXPECTED_FIXTURES), total - 1)
+
+
+def test_listing_changes_that_require_enrichment(books_db, detail_template):
+    books = load_books()
+    with serve_fixtures() as url_template:
+        enrich(detail_url_template(url_template))
+    assert books_db.count_books_to_enrich() == 0
+
+    changed = [dict(book) for book in books[:3]]
+    changed[0]['author'] += '（修訂）'
+    changed[1]['price'] += 10
+    changed[2]['link'] = changed[2]['link'].replace('loc=P_0005_003', 'loc=P_0009_009')
+    books_db.insert_books(changed)
+    assert [row['title'] for row in books_db.get_books_to_enrich()] == [books[0]['title']]
@@ -0,0 +1,99 @@
+"""
+html_extractor 對保存的搜尋結果頁的擷取結果
+
+不需瀏覽器：直接以 extract_books_from_html 解析 benchmarks/fixtures/search_page_{1,2,3}.html，
+與記錄的預期結果（benchmarks/fixtures/expected_books.json）比對。
+以瀏覽器比對 dom 與 html 兩種模式的結果見 benchmarks/compare_extractors.py（需要 selenium 與 Chrome）。
+"""
+
+import json
+
+import pytest
+
+from field_parser import join_authors, parse_authors
+from fixture_server import FIXTURES_DIR
+from html_extractor import extract_books_from_html, parse_page_count
+
+
+PAGE_URL = 'https://search.books.com.tw/search/query/cat/BKA/key/LLM/sort/1/page/1/v/0/'
+
+EXPECTED_COUNTS = {'search_page_1.html': 20, 'search_page_2.html': 20, 'search_page_3.html': 7}
+
+
+def load_page(name: str) -> str:
+    return (FIXTURES_DIR / name).read_text(encoding='utf-8')
+
+
+def extract(name: str) -> list:
+    return extract_books_from_html(load_page(name), PAGE_URL)
+
+
+def find(books: list, title: str) -> dict:
+    return next(book for book in books if book['title'] == title)
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_COUNTS))
+def test_matches_recorded_output(name):
+    expected = json.loads((FIXTURES_DIR / 'expected_books.json').read_text(encoding='utf-8'))
+    books = extract(name)
+    assert len(books) == EXPECTED_COUNTS[name]
+    assert books == expected[name]
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_COUNTS))
+def test_page_count(name):
+    assert parse_page_count(load_page(name)) == 3
+
+
+def test_discount_and_sale_price():
+    book = find(extract('search_page_1.html'), 'Hands-On Large Language Models')
+    assert (book['list_price'], book['discount'], book['sale_price'], book['price']) == (None, 66, 302, 302)
+
+
+def test_list_price_only():
+    book = find(extract('search_page_1.html'), '打造你的 RAG 系統：LangChain & LlamaIndex')
+    assert (book['list_price'], book['discount'], book['sale_price'], book['price']) == (512, None, 512, 512)
+
+
+def test_ebook_price_without_discount():
+    book = find(extract('search_page_1.html'), 'LLM 微調技術：LoRA、QLoRA 與 PEFT')
+    assert (book['list_price'], book['discount'], book['sale_price'], book['price']) == (None, None, 530, 530)
+
+
+def test_not_for_sale_price():
+    book = find(extract('search_page_2.html'), '本地端 LLM 部署實戰')
+    assert (book['list_price'], book['discount'], book['sale_price'], book['price']) == (None, None, None, 0)
+
+
+def test_missing_author():
+    books = extract('search_page_1.html')
+    assert find(books, 'Hands-On Large Language Models')['author'] == 'N/A'
+    assert [book['author'] for book in books].count('N/A') == 3
+
+
+def test_multiple_authors():
+    book = find(extract('search_page_1.html'), 'LLM 微調技術：LoRA、QLoRA 與 PEFT')
+    assert book['author'] == '王小明, 李大華'
+
+
+def test_links_are_absolute():
+    for name in EXPECTED_COUNTS:
+        for book in extract(name):
+            assert book['link'].startswith('https://www.books.com.tw/products/')
+
+
+@pytest.mark.parametrize('title, author', [
+    ('作者標籤與頓號分隔', '王小明, 李大華'),
+    ('含譯者的作者區塊', 'Jay Alammar, Maarten Grootendorst, 張志強'),
+    ('沒有連結的作者文字', 'N/A'),
+    ('連結中的換行與空白', 'Sebastian Raschka'),
+    ('連結以外的作者文字', '吳佩珊'),
+])
+def test_author_markup(title, author):
+    """作者只取 p.author 下各個 <a> 的文字；dom 模式以相同的 parse_authors 整理（見 compare_extractors.py）。"""
+    assert find(extract('author_markup.html'), title)['author'] == author
+
+
+def test_parse_authors():
+    assert parse_authors(['王小明', '\n  Sebastian\n  Raschka ', '  ', '']) == ['王小明', 'Sebastian Raschka']
+    assert join_authors(parse_authors([])) == 'N/A'
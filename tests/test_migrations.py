@@ -0,0 +1,178 @@
+"""
+資料庫結構遷移的測試（migrations）
+
+涵蓋：既有資料的舊資料庫（user_version 0）升級到最新版本、分段回填中斷後續跑，
+以及已是最新版本時只讀取 user_version。
+"""
+
+import contextlib
+import io
+import sqlite3
+
+import pytest
+
+import database
+import migrations
+
+
+BOOKS = 45
+
+
+def legacy_database(path) -> None:
+    """建立使用結構遷移之前的資料庫：只有 llm_books 與 scrape_state，user_version 為 0。"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE llm_books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL UNIQUE,
+            author TEXT,
+            price INTEGER,
+            link TEXT
+        );
+        CREATE TABLE scrape_state (key TEXT PRIMARY KEY, value TEXT);
+    ''')
+    conn.executemany('INSERT INTO llm_books (title, author, price, link) VALUES (?, ?, ?, ?)', [
+        (f'LLM 實戰 第 {i} 版', '王小明' if i % 3 == 0 else '李大華', 0 if i == 7 else 300 + i,
+         f'https://www.books.com.tw/products/{i:010d}?loc=P_0005_{i % 20 + 1:03d}')
+        for i in range(1, BOOKS + 1)
+    ])
+    conn.commit()
+    conn.close()
+
+
+def connect(path) -> sqlite3.Connection:
+    return sqlite3.connect(path, isolation_level=None)
+
+
+def migrate(conn: sqlite3.Connection, **options) -> int:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return migrations.migrate(conn, chunk_size=10, pause=0, **options)
+
+
+def interrupted(version: int, after_chunks: int) -> list:
+    """回傳 MIGRATIONS 的複本，其中指定版本的回填在處理 after_chunks 段之後失敗。"""
+    calls = []
+
+    def backfill(conn, position, chunk_size):
+        if len(calls) == after_chunks:
+            raise sqlite3.OperationalError('interrupted')
+        calls.append(position)
+        return original.backfill(conn, position, chunk_size)
+
+    original = next(migration for migration in migrations.MIGRATIONS if migration.version == version)
+    return [migrations.Migration(m.version, m.description, m.upgrade, backfill) if m is original else m
+            for m in migrations.MIGRATIONS]
+
+
+def fts_titles(conn: sqlite3.Connection, keyword: str) -> set:
+    return {row[0] for row in conn.execute(
+        f'SELECT b.title FROM {migrations.FTS_TABLE} f JOIN llm_books b ON b.id = f.rowid '
+        f'WHERE {migrations.FTS_TABLE} MATCH ?', (f'title : "{keyword}"',))}
+
+
+def like_titles(conn: sqlite3.Connection, keyword: str) -> set:
+    return {row[0] for row in conn.execute('SELECT title FROM llm_books WHERE title LIKE ?', (f'%{keyword}%',))}
+
+
+def test_legacy_database_keeps_rows(tmp_path):
+    path = tmp_path / 'books.db'
+    legacy_database(path)
+    conn = connect(path)
+    assert migrations.get_version(conn) == 0
+
+    assert migrate(conn) == migrations.LATEST_VERSION
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    assert conn.execute('SELECT COUNT(*) FROM llm_books').fetchone()[0] == BOOKS
+
+    # 全文檢索索引包含既有書籍
+    assert conn.execute(f'SELECT COUNT(*) FROM {migrations.FTS_TABLE}_docsize').fetchone()[0] == BOOKS
+    assert fts_titles(conn, '第 1') == like_titles(conn, '第 1')
+
+    # 既有價格作為第一筆價格歷史（價格 0 表示無法解析，不記錄）
+    assert conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0] == BOOKS - 1
+
+    # 商品編號由連結取得，排名參數不影響
+    assert conn.execute('SELECT product_id FROM llm_books WHERE id = 12').fetchone()[0] == '0000000012'
+    assert conn.execute('SELECT COUNT(*) FROM llm_books WHERE product_id IS NULL').fetchone()[0] == 0
+
+    assert migrations.has_table(conn, 'book_keywords')
+    assert conn.execute("SELECT COUNT(*) FROM scrape_state WHERE key LIKE 'migration_%'").fetchone()[0] == 0
+
+
+def test_resume_interrupted_fts_backfill(tmp_path):
+    path = tmp_path / 'books.db'
+    legacy_database(path)
+    conn = connect(path)
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn, migrations=interrupted(migrations.FTS_VERSION, after_chunks=2))
+    assert migrations.get_version(conn) == migrations.FTS_VERSION - 1
+    key = migrations.BACKFILL_STATE_KEY.format(version=migrations.FTS_VERSION)
+    assert conn.execute('SELECT value FROM scrape_state WHERE key = ?', (key,)).fetchone()[0] == '20'
+    assert conn.execute(f'SELECT COUNT(*) FROM {migrations.FTS_TABLE}_docsize').fetchone()[0] == 20
+
+    # 中斷期間的寫入：新書由觸發器編入索引，尚未回填的書籍被改名或刪除時不破壞索引
+    conn.execute("INSERT INTO llm_books (title, author, price, link) VALUES ('中斷期間的新書 LLM', 'A', 500, NULL)")
+    conn.execute("UPDATE llm_books SET title = '改名的書 LLM' WHERE id = 30")
+    conn.execute('DELETE FROM llm_books WHERE id = 31')
+
+    assert migrate(conn) == migrations.LATEST_VERSION
+    books = conn.execute('SELECT COUNT(*) FROM llm_books').fetchone()[0]
+    assert conn.execute(f'SELECT COUNT(*) FROM {migrations.FTS_TABLE}_docsize').fetchone()[0] == books
+    # 索引內容與 llm_books 不一致時 integrity-check 會引發 sqlite3.DatabaseError
+    conn.execute(f"INSERT INTO {migrations.FTS_TABLE}({migrations.FTS_TABLE}) VALUES ('integrity-check')")
+    for keyword in ('LLM', '改名的書', '期間的新書', '第 31 版'):
+        assert fts_titles(conn, keyword) == like_titles(conn, keyword)
+    assert conn.execute('SELECT value FROM scrape_state WHERE key = ?', (key,)).fetchone() is None
+    assert conn.execute('SELECT value FROM scrape_state WHERE key = ?',
+                        (migrations.FTS_BACKFILL_END_KEY,)).fetchone() is None
+
+
+def test_resume_interrupted_price_history_backfill(tmp_path):
+    path = tmp_path / 'books.db'
+    legacy_database(path)
+    conn = connect(path)
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn, migrations=interrupted(5, after_chunks=3))
+    assert migrations.get_version(conn) == 4
+    assert conn.execute('SELECT MAX(book_id) FROM price_history').fetchone()[0] == 30
+
+    assert migrate(conn) == migrations.LATEST_VERSION
+    rows = conn.execute('SELECT book_id, COUNT(*) FROM price_history GROUP BY book_id').fetchall()
+    assert len(rows) == BOOKS - 1
+    assert all(count == 1 for _, count in rows)
+
+
+def test_latest_database_only_reads_version(tmp_path):
+    path = tmp_path / 'books.db'
+    legacy_database(path)
+    conn = connect(path)
+    migrate(conn)
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert migrate(conn) == migrations.LATEST_VERSION
+    assert statements == ['PRAGMA user_version']
+
+
+def test_newer_database_is_rejected(tmp_path):
+    conn = connect(tmp_path / 'books.db')
+    conn.execute(f'PRAGMA user_version = {migrations.LATEST_VERSION + 1}')
+    with pytest.raises(RuntimeError):
+        migrate(conn)
+
+
+def test_init_database_on_legacy_file(tmp_path):
+    path = tmp_path / 'books.db'
+    legacy_database(path)
+    previous = (database.DB_PATH, database.READ_ONLY)
+    database.configure(str(path))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.init_database()
+        assert {row['title'] for row in database.search_by_title('第 12 版')} == {'LLM 實戰 第 12 版'}
+        assert database.get_price_range('LLM 實戰 第 12 版')['changes'] == 1
+    finally:
+        database.close_connections()
+        database.configure(*previous)
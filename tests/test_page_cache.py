@@ -0,0 +1,176 @@
+"""
+頁面快取的測試（page_cache，以及 http 與 cache 引擎的重新驗證與重播）
+
+以本機 fixture 伺服器提供暫存目錄中的搜尋結果頁，測試中可修改頁面內容；
+伺服器預設提供 ETag / Last-Modified，validators=False 時只能以片段雜湊判斷未變動。
+"""
+
+import shutil
+
+import pytest
+
+import metrics
+import scraper
+from fixture_server import FIXTURES_DIR, serve_fixtures
+from http_scraper import build_search_url
+from page_cache import PageCache, fragment_hash
+
+
+PAGES = (1, 2, 3)
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    """可修改的搜尋結果頁複本。"""
+    path = tmp_path / 'fixtures'
+    path.mkdir()
+    for page in PAGES:
+        shutil.copy(FIXTURES_DIR / f'search_page_{page}.html', path / f'search_page_{page}.html')
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with PageCache(str(tmp_path / 'pages.sqlite3')) as page_cache:
+        yield page_cache
+
+
+def update(cache: PageCache, url_template: str, count_changes=None) -> list:
+    """以 http 引擎爬取一次，回傳各頁的書籍數量（略過的未變動頁面為 0）。"""
+    pages = scraper.iter_scrape_pages(engine=scraper.ENGINE_HTTP, requests_per_second=0, page_cache=cache,
+                                      count_changes=count_changes, url_template=url_template)
+    return [len(page_books) for _, page_books in pages]
+
+
+def replay(cache: PageCache, url_template: str) -> list:
+    pages = scraper.iter_scrape_pages(engine=scraper.ENGINE_CACHE, page_cache=cache, url_template=url_template)
+    return [(page_num, len(page_books)) for page_num, page_books in pages]
+
+
+def cache_results() -> dict:
+    series = metrics.snapshot()['counters'].get('page_cache_total', [])
+    return {item['labels']['result']: int(item['value']) for item in series}
+
+
+def page_urls(url_template: str) -> list:
+    return [build_search_url('LLM', page, url_template) for page in PAGES]
+
+
+def test_store_and_lookup(cache):
+    books = [{'title': 'LLM 入門', 'price': 450}]
+    cache.store('https://example.com/1', '<html>1</html>', books, 'hash', etag='"v1"',
+                last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    entry = cache.lookup('https://example.com/1')
+    assert (entry.books, entry.fragment_hash) == (books, 'hash')
+    assert entry.revalidation_headers() == {'If-None-Match': '"v1"',
+                                            'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert cache.load('https://example.com/1') == '<html>1</html>'
+    assert cache.lookup('https://example.com/2') is None
+
+
+def test_same_content_is_stored_once(cache):
+    html = (FIXTURES_DIR / 'search_page_1.html').read_text(encoding='utf-8')
+    cache.store('https://example.com/a', html)
+    size = cache.total_bytes()
+    cache.store('https://example.com/b', html)
+    assert cache.total_bytes() == size
+    assert cache.load('https://example.com/b') == html
+
+
+def test_lru_eviction_keeps_size_under_limit():
+    pages = [(f'page-{page}', (FIXTURES_DIR / f'search_page_{page}.html').read_text(encoding='utf-8'))
+             for page in PAGES]
+    with PageCache(None) as full:
+        for url, html in pages[:2]:
+            full.store(url, html)
+        limit = full.total_bytes()
+
+    with PageCache(None, max_bytes=limit) as small:
+        for url, html in pages[:2]:
+            small.store(url, html)
+        # 讀取 page-1 後它成為最近使用的網址，存入 page-3 時淘汰 page-2
+        assert small.lookup('page-1') is not None
+        small.store(*pages[2])
+        assert small.total_bytes() <= limit
+        assert [url for url, _ in pages if small.load(url) is not None] == ['page-1', 'page-3']
+        assert small.lookup('page-2') is None
+
+
+def test_newly_stored_page_is_kept_over_limit():
+    html = (FIXTURES_DIR / 'search_page_1.html').read_text(encoding='utf-8')
+    with PageCache(None, max_bytes=1) as small:
+        small.store('page-1', html)
+        small.store('page-2', html + ' ')
+        assert small.load('page-1') is None
+        assert small.load('page-2') == html + ' '
+
+
+def test_not_modified_reuses_cached_books(temp_db, cache, fixtures):
+    with serve_fixtures(fixtures_dir=fixtures) as url_template:
+        first = update(cache, url_template)
+        for _, page_books in scraper.iter_scrape_pages(engine=scraper.ENGINE_HTTP, requests_per_second=0,
+                                                       url_template=url_template):
+            temp_db.insert_books(page_books)
+
+        metrics.reset()
+        assert update(cache, url_template) == first
+        assert cache_results() == {'not_modified': len(PAGES)}
+        assert all(cache.was_unchanged(url) for url in page_urls(url_template))
+
+        # 資料庫已有相同資料時，未變動的頁面產出空列表，呼叫端不需再寫入
+        assert update(cache, url_template, temp_db.count_new_or_changed) == [0] * len(PAGES)
+
+
+def test_fragment_hash_ignores_page_chrome(cache, fixtures):
+    with serve_fixtures(fixtures_dir=fixtures, validators=False) as url_template:
+        first = update(cache, url_template)
+
+        page_2 = fixtures / 'search_page_2.html'
+        html = page_2.read_text(encoding='utf-8')
+        chrome = html.replace('<title>', '<title>（新版頁首）', 1)
+        assert chrome != html and fragment_hash(chrome) == fragment_hash(html)
+        page_2.write_text(chrome, encoding='utf-8')
+
+        metrics.reset()
+        assert update(cache, url_template) == first
+        assert cache_results() == {'unchanged': len(PAGES)}
+        url_2 = page_urls(url_template)[1]
+        assert cache.was_unchanged(url_2)
+        assert cache.load(url_2) == chrome
+
+        # 搜尋結果區塊內的變動才重新擷取
+        page_2.write_text(chrome.replace('</b>', '1</b>', 1), encoding='utf-8')
+        metrics.reset()
+        update(cache, url_template)
+        assert cache_results() == {'unchanged': len(PAGES) - 1, 'changed': 1}
+        assert not cache.was_unchanged(url_2)
+
+
+def test_replay_stops_at_missing_page(tmp_path, cache, fixtures):
+    with serve_fixtures(fixtures_dir=fixtures) as url_template:
+        update(cache, url_template)
+    urls = page_urls(url_template)
+
+    # 只有第 1 與第 3 頁的快取：重播第 1 頁後停止，不跳過缺少的頁面
+    with PageCache(str(tmp_path / 'partial.sqlite3')) as partial:
+        for url in (urls[0], urls[2]):
+            partial.store(url, cache.load(url))
+        metrics.reset()
+        assert replay(partial, url_template) == [(1, 20)]
+        assert cache_results() == {'replay': 1}
+
+    # 沒有第 1 頁（無法得知總頁數）時不產出任何頁面
+    with PageCache(str(tmp_path / 'no-first-page.sqlite3')) as partial:
+        partial.store(urls[1], cache.load(urls[1]))
+        assert replay(partial, url_template) == []
+
+
+def test_replay_reextracts_and_refreshes_books(cache, fixtures):
+    with serve_fixtures(fixtures_dir=fixtures) as url_template:
+        update(cache, url_template)
+    url = page_urls(url_template)[0]
+    cache.refresh(url, books=[], unchanged=False)
+
+    assert replay(cache, url_template) == [(1, 20), (2, 20), (3, 7)]
+    assert len(cache.lookup(url).books) == 20
+    assert not cache.was_unchanged(url)
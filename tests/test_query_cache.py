@@ -0,0 +1,114 @@
+"""
+查詢結果快取的測試（query_cache 與 database 的作廢機制）
+
+本程序經由 insert_books 寫入時在提交時作廢快取；其他連線或其他程序的寫入
+由下一次查詢時 PRAGMA data_version 的變化偵測（唯讀的查詢服務依賴此機制）。
+"""
+
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from query_cache import QueryCache
+
+
+BOOKS = [
+    {'title': 'LLM 入門', 'author': '王小明', 'price': 450, 'link': 'https://www.books.com.tw/products/0000000001'},
+    {'title': 'LLM 實戰', 'author': '李大華', 'price': 480, 'link': 'https://www.books.com.tw/products/0000000002'},
+]
+
+NEW_BOOK = {'title': 'LLM 進階', 'author': '王小明', 'price': 620, 'link': 'https://www.books.com.tw/products/0000000003'}
+
+INSERT_SQL = "INSERT INTO llm_books (title, author, price, link) VALUES ('LLM 進階', '王小明', 620, NULL)"
+
+
+@pytest.fixture
+def cached_db(temp_db):
+    temp_db.insert_books(BOOKS)
+    temp_db.configure_query_cache(max_size=128, ttl=300)
+    return temp_db
+
+
+def search_titles(db) -> list:
+    return sorted(row['title'] for row in db.search_by_title('LLM'))
+
+
+def cache_stats(db) -> tuple:
+    stats = db.get_query_cache_stats()
+    return stats['hits'], stats['misses']
+
+
+def test_repeated_search_hits_cache(cached_db):
+    hits, misses = cache_stats(cached_db)
+    assert search_titles(cached_db) == ['LLM 入門', 'LLM 實戰']
+    assert search_titles(cached_db) == ['LLM 入門', 'LLM 實戰']
+    assert cache_stats(cached_db) == (hits + 1, misses + 1)
+
+
+def test_insert_books_invalidates(cached_db):
+    search_titles(cached_db)
+    cached_db.insert_books([NEW_BOOK])
+
+    hits, misses = cache_stats(cached_db)
+    assert search_titles(cached_db) == ['LLM 入門', 'LLM 實戰', 'LLM 進階']
+    assert cache_stats(cached_db) == (hits, misses + 1)
+
+
+def test_unchanged_write_keeps_results_correct(cached_db):
+    """提交後一律作廢，即使整批都未變動也不會回傳寫入前的結果。"""
+    search_titles(cached_db)
+    cached_db.insert_books(BOOKS + [NEW_BOOK])
+    assert search_titles(cached_db) == ['LLM 入門', 'LLM 實戰', 'LLM 進階']
+
+
+def test_write_from_other_connection(cached_db):
+    search_titles(cached_db)
+    other = sqlite3.connect(cached_db.DB_PATH, isolation_level=None)
+    other.execute(INSERT_SQL)
+    other.close()
+
+    hits, misses = cache_stats(cached_db)
+    assert search_titles(cached_db) == ['LLM 入門', 'LLM 實戰', 'LLM 進階']
+    assert cache_stats(cached_db) == (hits, misses + 1)
+
+
+@pytest.mark.parametrize('read_only', [False, True], ids=['read-write', 'read-only'])
+def test_write_from_other_process(cached_db, read_only):
+    cached_db.configure(cached_db.DB_PATH, read_only=read_only)
+    search_titles(cached_db)
+    search_titles(cached_db)
+
+    script = f'import sqlite3; sqlite3.connect({cached_db.DB_PATH!r}, isolation_level=None).execute({INSERT_SQL!r})'
+    subprocess.run([sys.executable, '-c', script], check=True)
+
+    assert search_titles(cached_db) == ['LLM 入門', 'LLM 實戰', 'LLM 進階']
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_size=2)
+    for key in ('a', 'b'):
+        cache.put(key, key.upper(), cache.generation)
+    assert cache.get('a') == (True, 'A')
+    cache.put('c', 'C', cache.generation)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 'A')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expiration():
+    cache = QueryCache(ttl=0.01)
+    cache.put('a', 'A', cache.generation)
+    time.sleep(0.02)
+    assert cache.get('a') == (False, None)
+    assert cache.stats()['expirations'] == 1
+
+
+def test_result_from_before_write_is_not_stored():
+    cache = QueryCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.put('a', 'stale', generation)
+    assert cache.get('a') == (False, None)
@@ -0,0 +1,174 @@
+"""
+以 EXPLAIN QUERY PLAN 確認查詢有使用索引
+
+建立 20000 筆合成書目，檢查：
+書名 / 作者關鍵字至少 3 個字元時走全文檢索索引，較短時退回 LIKE 比對且結果一致；
+價格、作者、書名排序與 keyset 分頁使用對應的索引（SEARCH 而非 SCAN，且不需額外的暫存排序），
+分頁結果與一次查詢全部資料相同；
+價格歷史的查詢使用主鍵與 idx_price_history_changed_on。
+"""
+
+import contextlib
+import io
+
+import pytest
+
+import database
+from bench_search import make_books
+
+
+ROWS = 20_000
+
+FIRST_DAY = '2024-01-01'
+CHANGE_DAY = '2024-01-15'
+AS_OF = '2024-01-31'
+
+# 於 CHANGE_DAY 降價的書籍數與降價金額
+DROPPED_BOOKS = 100
+DROP = 50
+
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+# (查詢參數, 查詢計畫中必須出現的字串, 查詢計畫中不可出現的字串)
+PLAN_CHECKS = [
+    ({'sort': 'price', 'limit': 20},
+     ['USING INDEX idx_llm_books_price'], [TEMP_SORT]),
+    ({'sort': 'price', 'descending': True, 'limit': 20},
+     ['USING INDEX idx_llm_books_price'], [TEMP_SORT]),
+    ({'sort': 'price', 'limit': 20, 'after': (300, 1000)},
+     ['SEARCH llm_books USING INDEX idx_llm_books_price'], [TEMP_SORT]),
+    ({'sort': 'price', 'descending': True, 'limit': 20, 'after': (300, 1000)},
+     ['SEARCH llm_books USING INDEX idx_llm_books_price'], [TEMP_SORT]),
+    ({'min_price': 200, 'max_price': 300, 'sort': 'price', 'limit': 20},
+     ['SEARCH llm_books USING INDEX idx_llm_books_price (price>? AND price<?)'], [TEMP_SORT]),
+    ({'sort': 'author', 'limit': 20},
+     ['USING INDEX idx_llm_books_author'], [TEMP_SORT]),
+    ({'sort': 'author', 'limit': 20, 'after': ('王小明', 1000)},
+     ['SEARCH llm_books USING INDEX idx_llm_books_author'], [TEMP_SORT]),
+    ({'sort': 'title', 'limit': 20, 'after': ('LLM', 1000)},
+     ['SEARCH llm_books USING INDEX sqlite_autoindex_llm_books_1'], [TEMP_SORT]),
+    ({'sort': 'recency', 'descending': True, 'limit': 20, 'after': (1000, 1000)},
+     ['SEARCH llm_books USING INTEGER PRIMARY KEY'], [TEMP_SORT]),
+    ({'title': 'LLM', 'sort': 'price', 'limit': 20},
+     ['VIRTUAL TABLE'], []),
+    ({'author': '王小明', 'sort': 'price', 'limit': 20},
+     ['VIRTUAL TABLE'], []),
+]
+
+# 價格歷史的查詢：(名稱, SQL, 參數, 查詢計畫中必須出現的字串)
+PRICE_PLAN_CHECKS = [
+    ('get_price_history', database.PRICE_HISTORY_SQL, ('LLM',),
+     ['SEARCH h USING PRIMARY KEY (book_id=?)',
+      'SEARCH llm_books USING COVERING INDEX sqlite_autoindex_llm_books_1 (title=?)']),
+    ('get_price_on', database.PRICE_ON_SQL, ('LLM', AS_OF),
+     ['SEARCH h USING PRIMARY KEY (book_id=? AND changed_on<?)']),
+    ('get_price_drops', database.PRICE_DROPS_SQL, {'start': FIRST_DAY, 'end': AS_OF, 'limit': 20},
+     ['SEARCH price_history USING COVERING INDEX idx_price_history_changed_on (changed_on>? AND changed_on<?)',
+      'SEARCH h USING PRIMARY KEY (book_id=? AND changed_on<?)',
+      'SEARCH b USING INTEGER PRIMARY KEY (rowid=?)']),
+]
+
+
+@pytest.fixture(scope='module')
+def books_db(tmp_path_factory):
+    """建立合成書目與價格歷史（前 DROPPED_BOOKS 本於 CHANGE_DAY 降價），並以 ANALYZE 產生統計資訊。"""
+    previous = (database.DB_PATH, database.READ_ONLY)
+    database.configure(str(tmp_path_factory.mktemp('plans') / 'books.db'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_database()
+        for batch in make_books(ROWS):
+            database.insert_books(batch, changed_on=FIRST_DAY)
+        dropped = next(make_books(DROPPED_BOOKS))
+        database.insert_books([dict(book, price=book['price'] - DROP) for book in dropped],
+                              changed_on=CHANGE_DAY)
+    with database.transaction() as conn:
+        conn.execute('ANALYZE')
+    yield database
+    database.configure(*previous)
+
+
+def plan_text(plan) -> str:
+    return '\n'.join(plan)
+
+
+@pytest.mark.parametrize('filters, required, forbidden', PLAN_CHECKS)
+def test_query_books_plan(books_db, filters, required, forbidden):
+    plan = plan_text(books_db.explain_query_books(**filters))
+    for item in required:
+        assert item in plan
+    for item in forbidden:
+        assert item not in plan
+
+
+@pytest.mark.parametrize('field, keyword', [('title', 'LLM'), ('title', '深度學習'), ('author', '王小明')])
+def test_search_uses_fts(books_db, field, keyword):
+    plan = plan_text(books_db.explain_search_books(field, keyword))
+    assert 'VIRTUAL TABLE' in plan
+    assert 'SCAN llm_books' not in plan
+
+
+@pytest.mark.parametrize('field, keyword', [('title', 'AI'), ('author', '王')])
+def test_short_keyword_falls_back_to_like(books_db, field, keyword):
+    plan = plan_text(books_db.explain_search_books(field, keyword))
+    assert 'VIRTUAL TABLE' not in plan
+    assert 'SCAN llm_books' in plan
+
+    plan = plan_text(books_db.explain_query_books(**{field: keyword}))
+    assert 'VIRTUAL TABLE' not in plan
+
+
+@pytest.mark.parametrize('field, keyword', [
+    ('title', 'LLM'), ('title', 'llm'), ('title', 'AI'), ('title', '深度學習'), ('author', '王小明'), ('author', '王'),
+])
+def test_search_matches_like(books_db, field, keyword):
+    """全文檢索與 LIKE 比對的結果相同（僅排序不同）。"""
+    expected = {row['title'] for row in books_db.get_connection().execute(
+        f'SELECT title FROM llm_books WHERE {field} LIKE ?', (f'%{keyword}%',))}
+    found = books_db.search_by_title(keyword) if field == 'title' else books_db.search_by_author(keyword)
+    assert expected
+    assert {row['title'] for row in found} == expected
+    assert {row['title'] for row in books_db.query_books(**{field: keyword})} == expected
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('sort', sorted(database.SORT_COLUMNS))
+def test_pagination_matches_full_query(books_db, sort, descending):
+    expected = [row['id'] for row in books_db.query_books(sort=sort, descending=descending)]
+    assert len(expected) == ROWS
+
+    paged = []
+    after = None
+    while True:
+        rows = books_db.query_books(sort=sort, descending=descending, limit=997, after=after)
+        paged.extend(row['id'] for row in rows)
+        if len(rows) < 997:
+            break
+        after = books_db.book_cursor(rows[-1], sort)
+    assert paged == expected
+
+    streamed = [row['id'] for row in books_db.iter_books(sort=sort, descending=descending, batch_size=1009)]
+    assert streamed == expected
+
+    offset = [row['id'] for row in books_db.query_books(sort=sort, descending=descending, limit=50, offset=100)]
+    assert offset == expected[100:150]
+
+
+@pytest.mark.parametrize('name, sql, params, required', PRICE_PLAN_CHECKS, ids=[c[0] for c in PRICE_PLAN_CHECKS])
+def test_price_history_plan(books_db, name, sql, params, required):
+    conn = books_db.get_connection()
+    plan = plan_text(row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+    for item in required:
+        assert item in plan
+    assert 'SCAN price_history' not in plan
+
+
+def test_price_drops(books_db):
+    drops = books_db.get_price_drops(30, limit=DROPPED_BOOKS * 2, as_of=AS_OF)
+    assert len(drops) == DROPPED_BOOKS
+    assert all(row['price_drop'] == DROP for row in drops)
+
+    book = drops[0]
+    assert [tuple(row) for row in books_db.get_price_history(book['title'])] == [
+        (FIRST_DAY, book['old_price']), (CHANGE_DAY, book['new_price'])]
+    assert books_db.get_price_on(book['title'], AS_OF) == book['new_price']
+    assert books_db.get_price_drops(30, as_of='2024-01-10') == []
@@ -0,0 +1,183 @@
+"""
+唯讀查詢服務的測試（query_service）
+
+服務在背景執行緒的事件迴圈中啟動，監聽系統指定的連接埠（port=0），
+以 http.client 對暫存資料庫發出請求。
+"""
+
+import asyncio
+import contextlib
+import http.client
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import database
+import migrations
+import query_service
+from query_service import QueryService
+
+
+BOOKS = [
+    {'title': 'LLM 入門', 'author': '王小明', 'price': 450, 'link': 'https://www.books.com.tw/products/0000000001'},
+    {'title': 'LLM 實戰', 'author': '李大華', 'price': 480, 'link': 'https://www.books.com.tw/products/0000000002'},
+    {'title': 'LLM 進階', 'author': '王小明', 'price': 620, 'link': 'https://www.books.com.tw/products/0000000003'},
+    {'title': 'RAG 系統', 'author': '王小明', 'price': 380, 'link': 'https://www.books.com.tw/products/0000000004'},
+]
+
+# 不會自行結束的查詢；測試中以進度回呼在 ENDLESS_LIMIT 秒後終止，避免中斷失效時卡住
+ENDLESS_LIMIT = 10.0
+ENDLESS_SQL = 'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n'
+
+
+@contextlib.contextmanager
+def running_service(db_path: str, **options):
+    """在背景執行緒的事件迴圈中啟動服務，結束時關閉服務與事件迴圈。"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    service = QueryService(db_path, port=0, **options)
+    try:
+        asyncio.run_coroutine_threadsafe(service.start(), loop).result(10)
+        yield service
+    finally:
+        asyncio.run_coroutine_threadsafe(service.close(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def get(service: QueryService, target: str):
+    """發出 GET 請求，回傳 (狀態碼, JSON 內容, 回應標頭)。"""
+    conn = http.client.HTTPConnection(service.host, service.port, timeout=10)
+    try:
+        conn.request('GET', target)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read()), dict(response.getheaders())
+    finally:
+        conn.close()
+
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '等待逾時'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def books_db(temp_db):
+    temp_db.insert_books(BOOKS)
+    return temp_db
+
+
+@pytest.fixture
+def service(books_db):
+    with running_service(books_db.DB_PATH) as running:
+        yield running
+
+
+def titles(body: dict) -> list:
+    return [book['title'] for book in body['books']]
+
+
+def test_books_filters(service):
+    status, body, _ = get(service, '/books?author=%E7%8E%8B%E5%B0%8F%E6%98%8E&max_price=500&sort=price')
+    assert status == 200
+    assert titles(body) == ['RAG 系統', 'LLM 入門']
+
+    status, body, _ = get(service, '/books?title=LLM&min_price=460&sort=price&desc=1')
+    assert titles(body) == ['LLM 進階', 'LLM 實戰']
+
+    status, body, _ = get(service, '/books?sort=price&limit=2&offset=1')
+    assert (status, body['offset'], titles(body)) == (200, 1, ['LLM 入門', 'LLM 實戰'])
+
+
+@pytest.mark.parametrize('query', ['limit=abc', 'limit=0', f'limit={query_service.MAX_PAGE_SIZE + 1}',
+                                   'offset=1.5', 'offset=-1', 'min_price=abc'])
+def test_books_rejects_bad_integers(service, query):
+    status, body, _ = get(service, f'/books?{query}')
+    assert status == 400
+    assert query.split('=')[0] in body['error']
+
+
+def test_search_history_and_errors(service):
+    status, body, _ = get(service, '/search/title?q=LLM&limit=2')
+    assert (status, body['total'], len(body['books'])) == (200, 3, 2)
+
+    status, body, _ = get(service, '/history?title=LLM%20%E5%85%A5%E9%96%80')
+    assert (status, [row['price'] for row in body['history']]) == (200, [450])
+
+    assert get(service, '/history')[0] == 400
+    assert get(service, '/missing')[0] == 404
+
+
+def test_service_is_read_only(service):
+    assert database.READ_ONLY
+    with pytest.raises(sqlite3.OperationalError):
+        with database.transaction() as conn:
+            conn.execute("UPDATE llm_books SET price = 1")
+
+
+def test_rejects_requests_over_max_in_flight(books_db, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setitem(query_service.ROUTES, '/slow', lambda params: release.wait(10))
+
+    with running_service(books_db.DB_PATH, workers=2, max_in_flight=2) as service:
+        results = []
+        clients = [threading.Thread(target=lambda: results.append(get(service, '/slow')[0])) for _ in range(2)]
+        for client in clients:
+            client.start()
+        wait_until(lambda: service.in_flight == 2)
+
+        status, body, headers = get(service, '/books')
+        assert status == 503
+        assert headers['Retry-After'] == '1'
+
+        release.set()
+        for client in clients:
+            client.join()
+        assert results == [200, 200]
+        wait_until(lambda: service.in_flight == 0)
+        assert get(service, '/books')[0] == 200
+
+
+def test_timeout_interrupts_query(books_db, monkeypatch):
+    aborted_early = []
+
+    def endless(params):
+        conn = database.get_connection()
+        deadline = time.monotonic() + ENDLESS_LIMIT
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            return conn.execute(ENDLESS_SQL).fetchone()[0]
+        except sqlite3.OperationalError as e:
+            aborted_early.append(time.monotonic() < deadline)
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    monkeypatch.setitem(query_service.ROUTES, '/endless', endless)
+    with running_service(books_db.DB_PATH, workers=1, timeout=0.2) as service:
+        status, body, _ = get(service, '/endless')
+        assert status == 504
+
+        # 查詢被中斷後工作執行緒立即釋出，唯一的執行緒可以處理下一個請求
+        wait_until(lambda: service.in_flight == 0)
+        assert aborted_early == [True]
+        assert get(service, '/books')[0] == 200
+
+
+def test_outdated_schema_is_refused(books_db):
+    previous = (database.DB_PATH, database.READ_ONLY)
+    conn = sqlite3.connect(books_db.DB_PATH, isolation_level=None)
+    conn.execute(f'PRAGMA user_version = {migrations.LATEST_VERSION - 1}')
+    conn.close()
+
+    with pytest.raises(RuntimeError):
+        with running_service(books_db.DB_PATH):
+            pass
+    assert (database.DB_PATH, database.READ_ONLY) == previous
@@ -0,0 +1,127 @@
+"""
+以本機 fixture 伺服器測試爬蟲與寫入管線的公開介面（scraper、pipeline），不連線到博客來
+"""
+
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import http_scraper
+import pipeline
+import scraper
+from fixture_server import FIXTURES_DIR, serve_fixtures
+from incremental import EarlyStop
+from page_cache import PageCache
+
+
+@pytest.fixture
+def url_template():
+    with serve_fixtures() as template:
+        yield template
+
+
+@pytest.fixture
+def two_keyword_template(tmp_path):
+    """
+    LLM 與 GPT 兩個關鍵字搜尋到相同的書籍，但連結中的排名參數不同
+    （GPT 的搜尋結果頁放在 GPT/ 子目錄，loc=P_0005_... 改為 loc=P_0009_...）。
+    """
+    (tmp_path / 'GPT').mkdir()
+    for page in (1, 2, 3):
+        name = f'search_page_{page}.html'
+        shutil.copy(FIXTURES_DIR / name, tmp_path / name)
+        html = (FIXTURES_DIR / name).read_text(encoding='utf-8')
+        (tmp_path / 'GPT' / name).write_text(re.sub(r'loc=P_0005_', 'loc=P_0009_', html), encoding='utf-8')
+    with serve_fixtures(fixtures_dir=tmp_path) as template:
+        yield template
+
+
+def test_iter_scrape_pages_http(url_template):
+    pages = list(scraper.iter_scrape_pages(engine=scraper.ENGINE_HTTP, requests_per_second=0,
+                                           url_template=url_template))
+    assert [(page_num, len(page_books)) for page_num, page_books in pages] == [(1, 20), (2, 20), (3, 7)]
+
+
+def test_scrape_books_http(url_template):
+    books = scraper.scrape_books(engine=scraper.ENGINE_HTTP, requests_per_second=0, url_template=url_template)
+    assert len(books) == 47
+    assert all(book['keywords'] == ['LLM'] for book in books)
+
+
+def test_fetch_pages_keeps_one_window_in_flight(monkeypatch):
+    """送出但尚未產出的頁面不超過 max_workers；提前結束迭代時，不再送出視窗之後的頁面。"""
+    submitted = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[3])
+            return super().submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(http_scraper, 'ThreadPoolExecutor', CountingExecutor)
+    monkeypatch.setattr(http_scraper, 'fetch_page', lambda client, url, timer, page, page_cache: [page])
+    urls = [f'https://example.com/{page}' for page in range(2, 22)]
+
+    for consumed, page_books in enumerate(http_scraper.iter_fetch_pages(None, urls, max_workers=4, first_page=2)):
+        assert page_books == [consumed + 2]
+        assert len(submitted) - consumed <= 4
+    assert submitted == list(range(2, 22))
+
+    submitted.clear()
+    pages = http_scraper.iter_fetch_pages(None, urls, max_workers=4, first_page=2)
+    assert next(pages) == [2]
+    pages.close()
+    assert submitted == [2, 3, 4, 5]
+
+
+def test_cache_engine_replays_without_server(tmp_path):
+    with PageCache(str(tmp_path / 'pages.sqlite3')) as cache:
+        with serve_fixtures() as template:
+            fetched = list(scraper.iter_scrape_pages(engine=scraper.ENGINE_HTTP, requests_per_second=0,
+                                                     page_cache=cache, url_template=template))
+        replayed = list(scraper.iter_scrape_pages(engine=scraper.ENGINE_CACHE, page_cache=cache,
+                                                  url_template=template))
+    assert replayed == fetched
+
+
+def test_run_pipeline_writes_all_pages(temp_db, url_template):
+    summary = pipeline.run_pipeline(engine=scraper.ENGINE_HTTP, resume=False, url_template=url_template)
+    assert (summary['pages'], summary['inserted']) == (3, 47)
+    assert temp_db.get_connection().execute('SELECT COUNT(*) FROM llm_books').fetchone()[0] == 47
+    assert pipeline.load_checkpoint() is None
+
+
+@pytest.mark.parametrize('run', range(10))
+def test_early_stop_counts_changes_before_pages_are_written(temp_db, url_template, run):
+    """
+    提前停止的判斷需在該頁交給寫入端之前完成：否則消費者可能已寫入該頁，
+    count_new_or_changed 把剛寫入的新書當成未變動，在第 1 頁就停止翻頁。
+    """
+    early_stop = EarlyStop(temp_db.count_new_or_changed, stop_after_pages=1)
+    summary = pipeline.run_pipeline(engine=scraper.ENGINE_HTTP, early_stop=early_stop, full_crawl=False,
+                                    resume=False, url_template=url_template)
+    assert (summary['pages'], summary['inserted']) == (3, 47)
+
+    # 資料庫已是最新時，第 1 頁沒有變動即停止
+    summary = pipeline.run_pipeline(engine=scraper.ENGINE_HTTP, early_stop=early_stop, full_crawl=False,
+                                    resume=False, url_template=url_template)
+    assert (summary['pages'], summary['unchanged']) == (1, 20)
+
+
+def test_scrape_books_merges_keywords_across_rank_parameters(two_keyword_template):
+    books = scraper.scrape_books(engine=scraper.ENGINE_HTTP, requests_per_second=0, keywords=['LLM', 'GPT'],
+                                 url_template=two_keyword_template)
+    assert len(books) == 47
+    assert all(sorted(book['keywords']) == ['GPT', 'LLM'] for book in books)
+
+
+def test_run_pipeline_merges_keywords_across_rank_parameters(temp_db, two_keyword_template):
+    summary = pipeline.run_pipeline(engine=scraper.ENGINE_HTTP, keywords=['LLM', 'GPT'], resume=False,
+                                    url_template=two_keyword_template)
+    assert (summary['inserted'], summary['updated'], summary['duplicates']) == (47, 0, 47)
+    conn = temp_db.get_connection()
+    assert (conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0]
+            == conn.execute('SELECT COUNT(*) FROM llm_books WHERE price > 0').fetchone()[0])
+    title = conn.execute('SELECT title FROM llm_books LIMIT 1').fetchone()[0]
+    assert temp_db.get_book_keywords(title) == ['GPT', 'LLM']
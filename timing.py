@@ -0,0 +1,111 @@
+"""
+計時模組
+
+記錄爬蟲各階段（啟動、搜尋、分類、每頁載入、擷取）的耗時，
+供更新資料庫後輸出報告，方便從紀錄中發現效能退化。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+import metrics
+
+
+# 報告中的階段順序
+PHASE_ORDER = ['startup', 'search', 'category', 'page_load', 'extract', 'db_write']
+
+
+class PhaseTimer:
+    """
+    各階段耗時紀錄器（執行緒安全，可在同時下載頁面的工作執行緒中使用）。
+
+    使用方式：
+        timer = PhaseTimer()
+        with timer.phase('search'):
+            ...
+        with timer.phase('page_load', page=2):
+            ...
+        print(timer.format_report())
+    """
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str, page: Optional[int] = None) -> Iterator[None]:
+        """
+        計算 with 區塊內的耗時並記錄為指定階段。
+
+        參數:
+            name: 階段名稱
+            page: 頁碼（僅每頁的階段需要）
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, page)
+
+    def record(self, name: str, seconds: float, page: Optional[int] = None) -> None:
+        """
+        直接記錄一筆耗時，並記入 metrics 的 scrape_phase_seconds 直方圖。
+
+        參數:
+            name: 階段名稱
+            seconds: 耗時（秒）
+            page: 頁碼（僅每頁的階段需要）
+        """
+        with self._lock:
+            self.records.append({'phase': name, 'page': page, 'seconds': seconds})
+        metrics.observe('scrape_phase_seconds', seconds, phase=name)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        彙整耗時報告。
+
+        回傳:
+            Dict[str, Any]: 包含以下欄位
+            - phases: 各階段的總耗時（秒）
+            - pages: 每頁各階段的耗時，依頁碼排序
+            - total: 從建立計時器到目前的總耗時（秒）
+        """
+        with self._lock:
+            records = list(self.records)
+
+        phases: Dict[str, float] = {}
+        pages: Dict[int, Dict[str, float]] = {}
+        for record in records:
+            phases[record['phase']] = phases.get(record['phase'], 0.0) + record['seconds']
+            if record['page'] is not None:
+                page = pages.setdefault(record['page'], {})
+                page[record['phase']] = page.get(record['phase'], 0.0) + record['seconds']
+
+        ordered = {name: phases[name] for name in PHASE_ORDER if name in phases}
+        ordered.update((name, seconds) for name, seconds in phases.items() if name not in ordered)
+
+        return {
+            'phases': ordered,
+            'pages': [dict(page=page_num, **pages[page_num]) for page_num in sorted(pages)],
+            'total': time.perf_counter() - self._started,
+        }
+
+    def format_report(self) -> str:
+        """
+        將耗時報告格式化為可輸出到紀錄的文字。
+
+        回傳:
+            str: 多行文字報告
+        """
+        report = self.report()
+        lines = [f"爬蟲耗時報告（總計 {report['total']:.2f} 秒）"]
+        for name, seconds in report['phases'].items():
+            lines.append(f"  {name:<10} {seconds:8.3f} 秒")
+        for page in report['pages']:
+            detail = ', '.join(f"{name} {seconds:.3f}s"
+                               for name, seconds in page.items() if name != 'page')
+            lines.append(f"  第 {page['page']} 頁：{detail}")
+        return '\n'.join(lines)